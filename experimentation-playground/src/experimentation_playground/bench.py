@@ -0,0 +1,220 @@
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import chromadb
+import numpy as np
+
+from .run import Run
+from .telemetry import Telemetry
+from .fake_providers import FAKE_BEHAVIORS, configure_fake_providers
+from .embed.fake_embed import FAKE_EMBED_PROVIDER, FakeEmbed
+from .rerank_results.fake_rerank import FakeReranker
+from .rewrite_query.rewrite_mapping import get_rewriter, get_async_rewriter
+
+BENCH_SIZES = [1_000, 10_000]
+BENCH_CONCURRENCY = [1, 8, 32]
+DEFAULT_BENCH_QUERIES = 1_000
+DEFAULT_BENCH_DIR = "results/bench"
+# Relative drop in throughput (or rise in p95 latency) reported as a regression
+DEFAULT_REGRESSION_TOLERANCE = 0.2
+# p95 latencies below this are dominated by timer noise and are not compared
+MIN_COMPARED_LATENCY = 0.001
+
+BENCH_VOCABULARY_SIZE = 5_000
+CHUNK_WORDS = 60
+QUERY_WORDS = 8
+
+
+def synthetic_dataset(n_chunks: int, n_queries: int, seed: int = 0) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
+    """Corpus of random word chunks, and queries made of words of one chunk each, labelled with it.
+
+    Returns:
+        (id_to_chunk, id_to_query, query_to_chunk)
+    """
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"w{idx}" for idx in range(BENCH_VOCABULARY_SIZE)])
+    id_to_chunk = {}
+    # Generated in blocks, so a 1M chunk corpus never holds all of its word indices at once
+    for start in range(0, n_chunks, 10_000):
+        words = vocabulary[rng.integers(0, BENCH_VOCABULARY_SIZE, size=(min(10_000, n_chunks - start), CHUNK_WORDS))]
+        for offset, row in enumerate(words.tolist()):
+            id_to_chunk[f"chunk-{start + offset}"] = " ".join(row)
+
+    targets = rng.integers(0, n_chunks, size=n_queries)
+    id_to_query, query_to_chunk = {}, {}
+    for idx, target in enumerate(targets.tolist()):
+        chunk_id = f"chunk-{target}"
+        words = id_to_chunk[chunk_id].split()
+        id_to_query[f"query-{idx}"] = " ".join(words[position] for position in sorted(rng.choice(CHUNK_WORDS, QUERY_WORDS, replace=False)))
+        query_to_chunk[f"query-{idx}"] = chunk_id
+    return id_to_chunk, id_to_query, query_to_chunk
+
+
+def run_bench(
+    sizes: Sequence[int] = BENCH_SIZES,
+    concurrency: Sequence[int] = BENCH_CONCURRENCY,
+    pipelines: Sequence[str] = ("staged",),
+    n_queries: int = DEFAULT_BENCH_QUERIES,
+    n_results: int = 10,
+    rewrite: bool = True,
+    rerank: bool = True,
+    dimensions: int = 256,
+    fake_settings: Optional[Dict[str, Dict[str, Any]]] = None,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """Time ingestion and full runs against fake providers and an in-memory Chroma.
+
+    Every provider is local and deterministic, so the timings measure the
+    playground's own overhead plus whatever latency the fake providers are
+    configured with. For each corpus size, the corpus is ingested once into a
+    fresh collection of a chromadb.EphemeralClient, then Run.run is executed
+    once per pipeline and concurrency setting, with the result cache off.
+    The concurrency is applied to the rewrite and rerank stages.
+
+    Args:
+        sizes: Corpus sizes, in chunks
+        concurrency: Rewrite and rerank concurrency of each run
+        pipelines: Pipelines each run is executed with
+        n_queries: Queries of every run, the same number for each corpus size
+        n_results: Results retrieved per query
+        rewrite: Whether runs rewrite queries with the fake LLM
+        rerank: Whether runs rerank results with the fake reranker
+        dimensions: Dimensions of the fake embeddings
+        fake_settings: Fake provider behavior per kind, see configure_fake_providers()
+        seed: Seed of the synthetic datasets and of the failures drawn by the fake providers
+
+    Returns:
+        The settings, one ingestion record per size with its stage stats,
+        and one record per run with its wall time, queries per second and stage stats
+    """
+    # Each kind draws its failures from its own seed, so they are not correlated across stages
+    configure_fake_providers({
+        kind: {"seed": seed + idx, **(fake_settings or {}).get(kind, {})}
+        for idx, kind in enumerate(FAKE_BEHAVIORS)
+    })
+    client = chromadb.EphemeralClient()
+    rewriter_args = {"provider": "fake", "model_name": "fake-llm"}
+
+    report: Dict[str, Any] = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {
+            "sizes": list(sizes),
+            "concurrency": list(concurrency),
+            "pipelines": list(pipelines),
+            "n_queries": n_queries,
+            "n_results": n_results,
+            "rewrite": rewrite,
+            "rerank": rerank,
+            "dimensions": dimensions,
+            "seed": seed,
+            "fake_providers": {kind: behavior.settings() for kind, behavior in FAKE_BEHAVIORS.items()},
+        },
+        "ingest": [],
+        "runs": [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as work_dir:
+        for size in sizes:
+            print(f"Generating {size} chunks and {n_queries} queries")
+            id_to_chunk, id_to_query, query_to_chunk = synthetic_dataset(size, n_queries, seed)
+
+            collection_name = f"bench-{size}"
+            if collection_name in [collection.name for collection in client.list_collections()]:
+                client.delete_collection(collection_name)
+            embedder = FakeEmbed(client, collection_name, vector_store_root=os.path.join(work_dir, "vectors"), dimensions=dimensions)
+
+            telemetry = Telemetry()
+            start = time.perf_counter()
+            with telemetry.call("index", FAKE_EMBED_PROVIDER, items=size):
+                embedder.add_to_collection(id_to_chunk)
+            seconds = time.perf_counter() - start
+            report["ingest"].append({"size": size, "seconds": seconds, "chunks_per_second": size / seconds, **telemetry.summary()})
+
+            for pipeline in pipelines:
+                for workers in concurrency:
+                    run = Run(
+                        run_id=f"bench-{size}-{pipeline}-c{workers}",
+                        embedder=embedder,
+                        id_to_chunk=id_to_chunk,
+                        id_to_query=id_to_query,
+                        query_to_chunk=query_to_chunk,
+                        config={"bench": True, "size": size, "pipeline": pipeline, "concurrency": workers},
+                        rewriter=get_rewriter("expand") if rewrite else None,
+                        async_rewriter=get_async_rewriter("expand") if rewrite else None,
+                        rewriter_args=rewriter_args if rewrite else None,
+                        reranker=FakeReranker("fake-rerank") if rerank else None,
+                        pipeline=pipeline,
+                        rewrite_concurrency=workers,
+                        rerank_concurrency=workers,
+                        use_result_cache=False,
+                    )
+                    start = time.perf_counter()
+                    results = run.run(n_results=n_results, output_dir=os.path.join(work_dir, "runs"))
+                    seconds = time.perf_counter() - start
+                    report["runs"].append({
+                        "size": size,
+                        "pipeline": pipeline,
+                        "concurrency": workers,
+                        "seconds": seconds,
+                        "queries_per_second": n_queries / seconds,
+                        # The collection is already filled, so the run's own index stage is a no-op
+                        "stages": [stage for stage in results["timing"]["stages"] if stage["stage"] != "index"],
+                    })
+
+            client.delete_collection(collection_name)
+    return report
+
+
+def save_bench(report: Dict[str, Any], output_dir: str = DEFAULT_BENCH_DIR) -> str:
+    """Write a benchmark report to `{output_dir}/bench-{timestamp}.json`, returning its path."""
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=4)
+    return path
+
+
+def load_bench(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _bench_metrics(report: Dict[str, Any]) -> Dict[str, Tuple[float, bool]]:
+    """Every compared value of a report as name -> (value, whether higher is better)."""
+    metrics: Dict[str, Tuple[float, bool]] = {}
+    for ingest in report["ingest"]:
+        metrics[f"ingest size={ingest['size']}: chunks/s"] = (ingest["chunks_per_second"], True)
+    for run in report["runs"]:
+        name = f"run size={run['size']} pipeline={run['pipeline']} concurrency={run['concurrency']}"
+        metrics[f"{name}: queries/s"] = (run["queries_per_second"], True)
+        for stage in run["stages"]:
+            if not stage["calls"]:
+                continue
+            stage_name = f"{name} {stage['stage']} ({stage['provider']})"
+            metrics[f"{stage_name}: items/s"] = (stage["items_per_second"], True)
+            if stage["p95_seconds"] >= MIN_COMPARED_LATENCY:
+                metrics[f"{stage_name}: p95 seconds"] = (stage["p95_seconds"], False)
+    return metrics
+
+
+def compare_bench(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = DEFAULT_REGRESSION_TOLERANCE) -> List[Dict[str, Any]]:
+    """Throughputs that dropped, and p95 latencies that rose, by more than `tolerance` against a baseline report.
+
+    Only cases present in both reports are compared.
+
+    Returns:
+        One record per regression with its name, baseline and current value, and relative change
+    """
+    current = _bench_metrics(report)
+    regressions = []
+    for name, (baseline_value, higher_is_better) in _bench_metrics(baseline).items():
+        if name not in current or not baseline_value:
+            continue
+        value = current[name][0]
+        change = (value - baseline_value) / baseline_value
+        if (change < -tolerance) if higher_is_better else (change > tolerance):
+            regressions.append({"name": name, "baseline": baseline_value, "current": value, "change": change})
+    return regressions
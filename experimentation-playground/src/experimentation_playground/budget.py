@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+from .embed.config import PROVIDER_RATE_LIMITS
+from .embed.scheduler import TokenBucket
+
+# Calls in flight per provider across every run in the process, None is unbounded
+PROVIDER_CONCURRENCY = {
+    "openai": 64,
+    "anthropic": 32,
+    "jina": 16,
+    "voyage": 32,
+    "contextual": 16,
+    "fake": None,
+}
+
+POLL_INTERVAL = 0.01
+
+
+class ProviderBudget:
+    """Concurrency and rate budget shared by every caller of one provider.
+
+    Runs executing in parallel draw from the same budget, so together they
+    stay within the provider's limits instead of each assuming it owns them.
+
+    Args:
+        max_concurrency: Maximum calls in flight (default: unbounded)
+        requests_per_minute: Optional request budget per minute
+        tokens_per_minute: Optional token budget per minute
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None
+    ):
+        self.max_concurrency = max_concurrency
+        self._semaphore = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    @contextmanager
+    def slot(self, tokens: int = 0) -> Iterator[None]:
+        """Hold one of the provider's concurrent slots and spend one request (and `tokens`) from its budget."""
+        if self._semaphore:
+            self._semaphore.acquire()
+        try:
+            if self.request_bucket:
+                self.request_bucket.acquire(1)
+            if self.token_bucket and tokens:
+                self.token_bucket.acquire(tokens)
+            yield
+        finally:
+            if self._semaphore:
+                self._semaphore.release()
+
+    @asynccontextmanager
+    async def aslot(self, tokens: int = 0) -> AsyncIterator[None]:
+        """Async counterpart of slot() that waits without blocking the event loop."""
+        if self._semaphore:
+            while not self._semaphore.acquire(blocking=False):
+                await asyncio.sleep(POLL_INTERVAL)
+        try:
+            if self.request_bucket:
+                await self.request_bucket.acquire_async(1)
+            if self.token_bucket and tokens:
+                await self.token_bucket.acquire_async(tokens)
+            yield
+        finally:
+            if self._semaphore:
+                self._semaphore.release()
+
+
+_BUDGETS: Dict[Optional[str], ProviderBudget] = {}
+_BUDGETS_LOCK = threading.Lock()
+
+
+def default_limits(provider: Optional[str]) -> Dict[str, Any]:
+    rate_limits = PROVIDER_RATE_LIMITS.get(provider, {})
+    return {
+        "max_concurrency": PROVIDER_CONCURRENCY.get(provider),
+        "requests_per_minute": rate_limits.get("requests_per_minute"),
+        "tokens_per_minute": rate_limits.get("tokens_per_minute"),
+    }
+
+
+def get_provider_budget(provider: Optional[str]) -> ProviderBudget:
+    """Get the process-wide budget for a provider, unbounded for unknown providers."""
+    with _BUDGETS_LOCK:
+        if provider not in _BUDGETS:
+            _BUDGETS[provider] = ProviderBudget(**default_limits(provider))
+        return _BUDGETS[provider]
+
+
+def configure_provider_budgets(overrides: Dict[str, Dict[str, Any]]) -> None:
+    """Override provider limits, e.g. {"openai": {"max_concurrency": 16, "requests_per_minute": 500}}.
+
+    Limits that are not given keep their defaults. Must be called before the
+    models and runs that use the budgets are created.
+    """
+    with _BUDGETS_LOCK:
+        for provider, limits in overrides.items():
+            _BUDGETS[provider] = ProviderBudget(**{**default_limits(provider), **limits})
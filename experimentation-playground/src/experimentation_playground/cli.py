@@ -1,19 +1,36 @@
 import click
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import chromadb
 import dotenv
-from pathlib import Path
 
-from .run import Run
-from .embed.embed_mapping import get_embedder
-from .rewrite_query.rewrite_mapping import get_rewriter
+from .run import Run, PIPELINES, DEFAULT_REWRITE_CONCURRENCY, DEFAULT_RERANK_CONCURRENCY
+from .sweep import plan_sweep, DEFAULT_SWEEP_WORKERS
+from .bench import BENCH_SIZES, BENCH_CONCURRENCY, DEFAULT_BENCH_QUERIES, DEFAULT_BENCH_DIR, DEFAULT_REGRESSION_TOLERANCE, run_bench, save_bench, load_bench, compare_bench
+from .budget import configure_provider_budgets
+from .dataset import Dataset
+from .eval.significance import compare_runs
+from .eval.query_diff import DIFF_KINDS, QUERY_DIFF_FILE, build_query_diff, load_query_diff
+from .embed.embed_mapping import get_embedder, CHROMA_EMBED_TYPES
+from .rewrite_query.rewrite_mapping import get_rewriter, get_async_rewriter
 from .rerank_results.rerank_mapping import get_reranker
 from .visualize.visualize_run import visualize_run
 from .visualize.visualize_sweep import visualize_sweep
 
 dotenv.load_dotenv()
 
+def get_chroma_client():
+    return chromadb.CloudClient(
+        api_key=os.getenv("CHROMA_API_KEY"),
+        tenant=os.getenv("CHROMA_TENANT"),
+        database=os.getenv("CHROMA_DATABASE")
+    )
+
+def sweep_option(run_config: dict, sweep_config: dict, key: str, default):
+    """Look up an option on the run, falling back to the sweep-level value."""
+    return run_config.get(key, sweep_config.get(key, default))
+
 @click.group()
 def cli():
     pass
@@ -25,25 +42,28 @@ def cli():
 @click.option('--rerank-method', default=None)
 @click.option('--collection', required=True)
 @click.option('--data-dir', default='data/experimentation-playground-sample-data')
-def run_experiment(run_id: str, embed_method: str, rewrite_method: str, rerank_method: str, collection: str, data_dir: str):
+@click.option('--pipeline', type=click.Choice(PIPELINES), default='staged', help='Run stages as barriers, stream each query through them with threads, or on an asyncio event loop')
+@click.option('--rewrite-concurrency', type=int, default=DEFAULT_REWRITE_CONCURRENCY, help='Maximum rewrite calls in flight')
+@click.option('--rerank-concurrency', type=int, default=DEFAULT_RERANK_CONCURRENCY, help='Maximum rerank calls in flight')
+@click.option('--no-result-cache', is_flag=True, help='Recompute rewrites and reranks instead of reusing cached results')
+@click.option('--resume', is_flag=True, help='Continue from the journal of an interrupted run')
+@click.option('--sync', 'sync_collection', is_flag=True, help='Upsert changed chunks and delete removed ones instead of only ingesting into an empty collection')
+def run_experiment(run_id: str, embed_method: str, rewrite_method: str, rerank_method: str, collection: str, data_dir: str, pipeline: str, rewrite_concurrency: int, rerank_concurrency: int, no_result_cache: bool, resume: bool, sync_collection: bool):
     click.echo(f"Starting run: {run_id}")
 
-    data_path = Path(data_dir)
-    id_to_chunk = json.load(open(data_path / "id_to_chunk.json"))
-    id_to_query = json.load(open(data_path / "id_to_query.json"))
-    query_to_chunk = json.load(open(data_path / "query_to_chunk.json"))
-
-    chroma_client = chromadb.CloudClient(
-        api_key=os.getenv("CHROMA_API_KEY"),
-        tenant=os.getenv("CHROMA_TENANT"),
-        database=os.getenv("CHROMA_DATABASE")
-    )
+    dataset = Dataset(data_dir)
+    id_to_chunk = dataset.id_to_chunk
+    id_to_query = dataset.id_to_query
+    query_to_chunk = dataset.query_to_chunk
 
     embed_parts = embed_method.split(":")
     embed_type = embed_parts[0]
     embed_provider = embed_parts[1] if len(embed_parts) > 1 else None
     embed_model = embed_parts[2] if len(embed_parts) > 2 else None
 
+    # Local retrieval runs entirely in-process
+    chroma_client = get_chroma_client() if embed_type in CHROMA_EMBED_TYPES else None
+
     embedder = get_embedder(embed_type, chroma_client, collection, embed_provider, embed_model)
 
     config = {
@@ -55,6 +75,7 @@ def run_experiment(run_id: str, embed_method: str, rewrite_method: str, rerank_m
     }
 
     rewriter = None
+    async_rewriter = None
     rewriter_args = None
     if rewrite_method:
         rewrite_parts = rewrite_method.split(":")
@@ -62,6 +83,7 @@ def run_experiment(run_id: str, embed_method: str, rewrite_method: str, rerank_m
         rewrite_provider = rewrite_parts[1]
         rewrite_model = rewrite_parts[2]
         rewriter = get_rewriter(rewrite_type)
+        async_rewriter = get_async_rewriter(rewrite_type)
         rewriter_args = {"provider": rewrite_provider, "model_name": rewrite_model}
 
     reranker = None
@@ -79,8 +101,16 @@ def run_experiment(run_id: str, embed_method: str, rewrite_method: str, rerank_m
         query_to_chunk=query_to_chunk,
         config=config,
         rewriter=rewriter,
+        async_rewriter=async_rewriter,
         rewriter_args=rewriter_args,
         reranker=reranker,
+        pipeline=pipeline,
+        rewrite_concurrency=rewrite_concurrency,
+        rerank_concurrency=rerank_concurrency,
+        use_result_cache=not no_result_cache,
+        resume=resume,
+        sync_collection=sync_collection,
+        qrels=dataset.qrels,
     )
 
     results = run.run()
@@ -100,88 +130,214 @@ def run_experiment(run_id: str, embed_method: str, rewrite_method: str, rerank_m
     click.echo(f"Recall@1: {metrics.get('Recall@1', 'N/A')}")
     click.echo(f"Recall@5: {metrics.get('Recall@5', 'N/A')}")
     click.echo(f"Recall@10: {metrics.get('Recall@10', 'N/A')}")
+    click.echo(f"MRR: {metrics.get('MRR', 'N/A')}")
+    click.echo(f"nDCG@10: {metrics.get('nDCG@10', 'N/A')}")
+    echo_timing(results.get('timing'))
+
+def build_sweep_run(
+    run_config: dict,
+    sweep_config: dict,
+    chroma_client,
+    embedders: dict,
+    id_to_chunk: dict,
+    id_to_query: dict,
+    query_to_chunk: dict,
+    resume: bool = False,
+    qrels=None
+) -> Run:
+    data_dir = sweep_config.get('data_dir', 'data/experimentation-playground-sample-data')
+    embed_method = run_config['embed_method']
+    collection = run_config['collection']
+
+    # Runs over the same collection share one embedder
+    if (embed_method, collection) not in embedders:
+        embed_parts = embed_method.split(":")
+        embed_type = embed_parts[0]
+        embed_provider = embed_parts[1] if len(embed_parts) > 1 else None
+        embed_model = embed_parts[2] if len(embed_parts) > 2 else None
+        embedders[(embed_method, collection)] = get_embedder(embed_type, chroma_client, collection, embed_provider, embed_model)
+
+    config_obj = {
+        "embed_method": embed_method,
+        "rewrite_method": run_config.get('rewrite_method'),
+        "rerank_method": run_config.get('rerank_method'),
+        "collection": collection,
+        "data_dir": data_dir,
+    }
+
+    rewriter = None
+    async_rewriter = None
+    rewriter_args = None
+    if run_config.get('rewrite_method'):
+        rewrite_method = run_config['rewrite_method']
+        rewrite_parts = rewrite_method.split(":")
+        rewrite_type = rewrite_parts[0]
+        rewrite_provider = rewrite_parts[1]
+        rewrite_model = rewrite_parts[2]
+        rewriter = get_rewriter(rewrite_type)
+        async_rewriter = get_async_rewriter(rewrite_type)
+        rewriter_args = {"provider": rewrite_provider, "model_name": rewrite_model}
+
+    reranker = None
+    if run_config.get('rerank_method'):
+        rerank_method = run_config['rerank_method']
+        rerank_parts = rerank_method.split(":")
+        rerank_type = rerank_parts[0]
+        rerank_model = rerank_parts[1]
+        reranker = get_reranker(rerank_type, rerank_model)
+
+    return Run(
+        run_id=run_config['run_id'],
+        embedder=embedders[(embed_method, collection)],
+        id_to_chunk=id_to_chunk,
+        id_to_query=id_to_query,
+        query_to_chunk=query_to_chunk,
+        config=config_obj,
+        rewriter=rewriter,
+        async_rewriter=async_rewriter,
+        rewriter_args=rewriter_args,
+        reranker=reranker,
+        pipeline=sweep_option(run_config, sweep_config, 'pipeline', 'staged'),
+        rewrite_concurrency=sweep_option(run_config, sweep_config, 'rewrite_concurrency', DEFAULT_REWRITE_CONCURRENCY),
+        rerank_concurrency=sweep_option(run_config, sweep_config, 'rerank_concurrency', DEFAULT_RERANK_CONCURRENCY),
+        use_result_cache=sweep_option(run_config, sweep_config, 'use_result_cache', True),
+        resume=resume,
+        sync_collection=sweep_option(run_config, sweep_config, 'sync_collection', False),
+        qrels=qrels,
+    )
+
+def echo_metrics(metrics: dict) -> None:
+    click.echo(f"  ✓ Recall@1: {metrics.get('Recall@1', 'N/A')}")
+    click.echo(f"  ✓ Recall@5: {metrics.get('Recall@5', 'N/A')}")
+    click.echo(f"  ✓ Recall@10: {metrics.get('Recall@10', 'N/A')}")
+    click.echo(f"  ✓ MRR: {metrics.get('MRR', 'N/A')}")
+    click.echo(f"  ✓ nDCG@10: {metrics.get('nDCG@10', 'N/A')}")
+
+def echo_timing(timing: dict) -> None:
+    """Print one latency/throughput line per stage and provider of a run."""
+    if not timing:
+        return
+    click.echo(f"Stage timing ({timing['wall_seconds']:.2f}s total):")
+    for stage in timing['stages']:
+        click.echo(
+            f"  {stage['stage']} ({stage['provider']}): {stage['calls']} calls, "
+            f"p50 {stage['p50_seconds'] * 1000:.1f}ms, p95 {stage['p95_seconds'] * 1000:.1f}ms, p99 {stage['p99_seconds'] * 1000:.1f}ms, "
+            f"{stage['items_per_second']:.1f} items/s, {stage['retries']} retries"
+        )
+
+def record_significance(runs: list, baseline_id: str, output_dir: str) -> None:
+    """Store paired permutation tests of every run against the baseline in each run's results."""
+    saved = {run.run_id: run.load_per_query(output_dir) for run in runs}
+    baseline = saved.get(baseline_id)
+    if baseline is None:
+        click.echo(f"No per-query metrics saved for baseline {baseline_id}, skipping significance tests")
+        return
+
+    click.echo(f"\nPaired permutation tests against baseline {baseline_id}:")
+    for run in runs:
+        if run.run_id == baseline_id or saved[run.run_id] is None:
+            continue
+        comparison = compare_runs(*saved[run.run_id], *baseline)
+        if comparison is None:
+            continue
+
+        run.update_results(output_dir, {"significance": {"baseline": baseline_id, "metrics": comparison}})
+        recall = comparison.get('Recall@5')
+        if recall:
+            click.echo(f"  {run.run_id}: Recall@5 {recall['difference']:+.4f} (p = {recall['p_value']:.3f})")
+
+def echo_query_diff(query_diff, baseline_id: str, k: int = 10) -> None:
+    """Print how many queries each run improves and regresses against the baseline."""
+    click.echo(f"\nPer-query differences at Recall@{k} against baseline {baseline_id}:")
+    for run_id in query_diff.run_ids:
+        if run_id == baseline_id:
+            continue
+        improved = query_diff.count(run_id, baseline_id, 'improved', k)
+        regressed = query_diff.count(run_id, baseline_id, 'regressed', k)
+        click.echo(f"  {run_id}: +{improved} improved, -{regressed} regressed")
 
 @cli.command('sweep')
 @click.option('--config', required=True, type=click.Path(exists=True))
-def run_sweep(config: str):
+@click.option('--plan/--no-plan', default=True, help='Execute stages shared between runs once (default), or run each entry on its own')
+@click.option('--plan-workers', type=int, default=DEFAULT_SWEEP_WORKERS, help='Maximum planned stages running at once')
+@click.option('--parallel-runs', type=int, default=1, help='With --no-plan, number of runs executed concurrently')
+@click.option('--resume', is_flag=True, help='Skip finished runs and continue interrupted ones from their journals')
+def run_sweep(config: str, plan: bool, plan_workers: int, parallel_runs: int, resume: bool):
+    if plan and parallel_runs > 1:
+        raise click.UsageError("--parallel-runs only applies with --no-plan; planned sweeps run stages in parallel up to --plan-workers")
+
     click.echo(f"Starting sweep from config: {config}")
 
     with open(config) as f:
         sweep_config = json.load(f)
 
     data_dir = sweep_config.get('data_dir', 'data/experimentation-playground-sample-data')
-    data_path = Path(data_dir)
-    id_to_chunk = json.load(open(data_path / "id_to_chunk.json"))
-    id_to_query = json.load(open(data_path / "id_to_query.json"))
-    query_to_chunk = json.load(open(data_path / "query_to_chunk.json"))
-
-    chroma_client = chromadb.CloudClient(
-        api_key=os.getenv("CHROMA_API_KEY"),
-        tenant=os.getenv("CHROMA_TENANT"),
-        database=os.getenv("CHROMA_DATABASE")
+    dataset = Dataset(data_dir)
+    id_to_chunk = dataset.id_to_chunk
+    id_to_query = dataset.id_to_query
+    query_to_chunk = dataset.query_to_chunk
+
+    # Local retrieval runs entirely in-process
+    needs_chroma = any(
+        run_config['embed_method'].split(":")[0] in CHROMA_EMBED_TYPES
+        for run_config in sweep_config.get('runs', [])
     )
+    chroma_client = get_chroma_client() if needs_chroma else None
 
     output_dir = sweep_config.get('output_dir', 'results/sweeps')
-    runs = sweep_config.get('runs', [])
-
-    for run_config in runs:
-        run_id = run_config['run_id']
-        click.echo(f"\n→ Running: {run_id}")
-
-        embed_method = run_config['embed_method']
-        embed_parts = embed_method.split(":")
-        embed_type = embed_parts[0]
-        embed_provider = embed_parts[1] if len(embed_parts) > 1 else None
-        embed_model = embed_parts[2] if len(embed_parts) > 2 else None
 
-        collection = run_config['collection']
-        embedder = get_embedder(embed_type, chroma_client, collection, embed_provider, embed_model)
-
-        config_obj = {
-            "embed_method": embed_method,
-            "rewrite_method": run_config.get('rewrite_method'),
-            "rerank_method": run_config.get('rerank_method'),
-            "collection": collection,
-            "data_dir": data_dir,
-        }
-
-        rewriter = None
-        rewriter_args = None
-        if run_config.get('rewrite_method'):
-            rewrite_method = run_config['rewrite_method']
-            rewrite_parts = rewrite_method.split(":")
-            rewrite_type = rewrite_parts[0]
-            rewrite_provider = rewrite_parts[1]
-            rewrite_model = rewrite_parts[2]
-            rewriter = get_rewriter(rewrite_type)
-            rewriter_args = {"provider": rewrite_provider, "model_name": rewrite_model}
-
-        reranker = None
-        if run_config.get('rerank_method'):
-            rerank_method = run_config['rerank_method']
-            rerank_parts = rerank_method.split(":")
-            rerank_type = rerank_parts[0]
-            rerank_model = rerank_parts[1]
-            reranker = get_reranker(rerank_type, rerank_model)
-
-        run = Run(
-            run_id=run_id,
-            embedder=embedder,
-            id_to_chunk=id_to_chunk,
-            id_to_query=id_to_query,
-            query_to_chunk=query_to_chunk,
-            config=config_obj,
-            rewriter=rewriter,
-            rewriter_args=rewriter_args,
-            reranker=reranker,
-        )
-
-        results = run.run(output_dir=output_dir)
-
-        metrics = results.get('metrics', {})
-        click.echo(f"  ✓ Recall@1: {metrics.get('Recall@1', 'N/A')}")
-        click.echo(f"  ✓ Recall@5: {metrics.get('Recall@5', 'N/A')}")
-        click.echo(f"  ✓ Recall@10: {metrics.get('Recall@10', 'N/A')}")
+    # Concurrent runs and planned stages draw from the same per-provider limits
+    configure_provider_budgets(sweep_config.get('provider_budgets', {}))
+
+    embedders = {}
+    runs = [
+        build_sweep_run(run_config, sweep_config, chroma_client, embedders, id_to_chunk, id_to_query, query_to_chunk, resume, dataset.qrels)
+        for run_config in sweep_config.get('runs', [])
+    ]
+
+    sweep_runs = list(runs)
+    if resume:
+        for run in [run for run in runs if run.is_complete(output_dir)]:
+            click.echo(f"\n→ {run.run_id} already complete, skipping")
+            echo_metrics(run.load_results(output_dir).get('metrics', {}))
+            runs.remove(run)
+
+    if plan:
+        # The planner works on whole stages, so it replaces the per-run pipeline setting
+        stage_plan, run_nodes = plan_sweep(runs, output_dir=output_dir)
+        counts = ", ".join(f"{stage}: {count}" for stage, count in stage_plan.stage_counts().items())
+        click.echo(f"Planned {len(stage_plan.nodes)} distinct stages for {len(runs)} runs ({counts})")
+
+        outputs = stage_plan.execute(max_workers=plan_workers)
+        for run in runs:
+            click.echo(f"\n→ {run.run_id}")
+            echo_metrics(outputs[run_nodes[run.run_id]].get('metrics', {}))
+    elif parallel_runs > 1:
+        # Ingest each collection once up front so concurrent runs don't race to fill it, timed by the run that ingests it
+        for run in {id(run.embedder): run for run in runs}.values():
+            run.ingest()
+        for run in runs:
+            run.sync_collection = False
+
+        click.echo(f"Running {len(runs)} runs, {parallel_runs} at a time")
+        with ThreadPoolExecutor(max_workers=parallel_runs) as executor:
+            futures = {executor.submit(run.run, output_dir=output_dir): run for run in runs}
+            for future in as_completed(futures):
+                click.echo(f"\n→ {futures[future].run_id}")
+                echo_metrics(future.result().get('metrics', {}))
+    else:
+        for run in runs:
+            click.echo(f"\n→ Running: {run.run_id}")
+            results = run.run(output_dir=output_dir)
+            echo_metrics(results.get('metrics', {}))
+
+    if len(sweep_runs) > 1:
+        baseline_id = sweep_config.get('baseline', sweep_runs[0].run_id)
+        record_significance(sweep_runs, baseline_id, output_dir)
+        # Saved next to the results, for the report and the `diff` command
+        query_diff = build_query_diff(output_dir)
+        if baseline_id in query_diff.run_ids:
+            echo_query_diff(query_diff, baseline_id)
 
     click.echo(f"\n✓ Sweep complete!")
     click.echo(f"Results saved to: {output_dir}/")
@@ -191,5 +347,90 @@ def run_sweep(config: str):
     visualize_sweep(output_dir, sweep_html_path)
     click.echo(f"Sweep visualization saved to: {sweep_html_path}")
 
+@cli.command('diff')
+@click.option('--sweep-dir', required=True, type=click.Path(exists=True, file_okay=False), help='Output directory of the sweep')
+@click.option('--run', 'run_id', required=True, help='Run whose queries are listed')
+@click.option('--baseline', 'baseline_id', required=True, help='Run to compare it with')
+@click.option('--kind', type=click.Choice(DIFF_KINDS), default='regressed', help='Queries the run newly hits, newly misses, or that both runs miss')
+@click.option('--k', type=int, default=10, help='Recall@k cutoff of a hit')
+@click.option('--limit', type=int, default=50, help='Maximum queries listed, 0 for all')
+def diff_runs(sweep_dir: str, run_id: str, baseline_id: str, kind: str, k: int, limit: int):
+    """List the queries a run improves or regresses against another run of a sweep."""
+    query_diff = load_query_diff(sweep_dir)
+    try:
+        rows = query_diff.select(run_id, baseline_id, kind, k)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+    run, baseline = query_diff.run_ids.index(run_id), query_diff.run_ids.index(baseline_id)
+    click.echo(f"{len(rows)} queries {kind.replace('_', ' ')} in {run_id} against {baseline_id} at Recall@{k} (index: {sweep_dir}/{QUERY_DIFF_FILE})")
+    shown = rows[:limit] if limit else rows
+    for row in shown.tolist():
+        # Hit rank 0 is a miss within the retrieved results
+        rank, baseline_rank = (query_diff.ranks[row, column] for column in (run, baseline))
+        click.echo(f"  {query_diff.query_ids[row]}: rank {baseline_rank or 'miss'} -> {rank or 'miss'}")
+    if len(shown) < len(rows):
+        click.echo(f"  ... {len(rows) - len(shown)} more, use --limit 0 to list all")
+
+def int_list(ctx, param, value: str) -> list:
+    try:
+        return [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise click.BadParameter(f"Expected comma-separated integers, got {value}")
+
+def str_list(ctx, param, value: str) -> list:
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+@cli.command('bench')
+@click.option('--sizes', default=",".join(map(str, BENCH_SIZES)), callback=int_list, help='Comma-separated corpus sizes, in chunks (e.g. 1000,100000,1000000)')
+@click.option('--concurrency', default=",".join(map(str, BENCH_CONCURRENCY)), callback=int_list, help='Comma-separated rewrite and rerank concurrency settings')
+@click.option('--pipelines', default='staged', callback=str_list, help=f'Comma-separated pipelines, out of {", ".join(PIPELINES)}')
+@click.option('--queries', 'n_queries', type=int, default=DEFAULT_BENCH_QUERIES, help='Queries per run')
+@click.option('--rewrite/--no-rewrite', default=True, help='Rewrite queries with the fake LLM')
+@click.option('--rerank/--no-rerank', default=True, help='Rerank results with the fake reranker')
+@click.option('--dimensions', type=int, default=256, help='Dimensions of the fake embeddings')
+@click.option('--latency', type=float, default=0.0, help='Seconds each fake provider request takes')
+@click.option('--error-rate', type=float, default=0.0, help='Fraction of fake provider requests failing with a server error')
+@click.option('--rate-limit-rate', type=float, default=0.0, help='Fraction of fake provider requests failing with a 429')
+@click.option('--requests-per-minute', type=float, default=None, help='Requests each kind of fake provider accepts per minute before answering 429')
+@click.option('--fake-config', type=click.Path(exists=True), default=None, help='JSON file of per-kind fake provider settings, e.g. {"rerank": {"latency": 0.05}}, overriding the options above')
+@click.option('--seed', type=int, default=0, help='Seed of the synthetic datasets and fake provider failures')
+@click.option('--output-dir', default=DEFAULT_BENCH_DIR, help='Directory the report is saved to')
+@click.option('--baseline', type=click.Path(exists=True), default=None, help='Earlier report to check for regressions against')
+@click.option('--tolerance', type=float, default=DEFAULT_REGRESSION_TOLERANCE, help='Relative throughput drop or p95 latency rise reported as a regression')
+def bench(sizes: list, concurrency: list, pipelines: list, n_queries: int, rewrite: bool, rerank: bool, dimensions: int, latency: float, error_rate: float, rate_limit_rate: float, requests_per_minute: float, fake_config: str, seed: int, output_dir: str, baseline: str, tolerance: float):
+    """Benchmark ingestion and runs against fake providers and an in-memory Chroma."""
+    for pipeline in pipelines:
+        if pipeline not in PIPELINES:
+            raise click.BadParameter(f"Unknown pipeline: {pipeline}. Available: {PIPELINES}")
+
+    behavior = {"latency": latency, "error_rate": error_rate, "rate_limit_rate": rate_limit_rate, "requests_per_minute": requests_per_minute}
+    overrides = {}
+    if fake_config:
+        with open(fake_config) as f:
+            overrides = json.load(f)
+    fake_settings = {kind: {**behavior, **overrides.get(kind, {})} for kind in ["embed", "llm", "rerank"]}
+
+    report = run_bench(sizes, concurrency, pipelines, n_queries, rewrite=rewrite, rerank=rerank, dimensions=dimensions, fake_settings=fake_settings, seed=seed)
+
+    click.echo("\nIngestion:")
+    for ingest in report['ingest']:
+        click.echo(f"  {ingest['size']} chunks: {ingest['seconds']:.2f}s, {ingest['chunks_per_second']:.1f} chunks/s")
+    for run in report['runs']:
+        click.echo(f"\n→ {run['size']} chunks, {run['pipeline']}, concurrency {run['concurrency']}: {run['seconds']:.2f}s, {run['queries_per_second']:.1f} queries/s")
+        echo_timing({"wall_seconds": run['seconds'], "stages": run['stages']})
+
+    path = save_bench(report, output_dir)
+    click.echo(f"\nBenchmark saved to: {path}")
+
+    if baseline:
+        regressions = compare_bench(report, load_bench(baseline), tolerance)
+        if regressions:
+            click.echo(f"\nRegressions against {baseline}:")
+            for regression in regressions:
+                click.echo(f"  {regression['name']}: {regression['baseline']:.4g} -> {regression['current']:.4g} ({regression['change']:+.0%})")
+            raise click.ClickException(f"{len(regressions)} regressions beyond {tolerance:.0%} against {baseline}")
+        click.echo(f"No regressions beyond {tolerance:.0%} against {baseline}")
+
 if __name__ == '__main__':
     cli()
@@ -0,0 +1,248 @@
+import json
+import mmap
+import os
+from array import array
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Tuple
+
+from .eval.qrels import Qrels
+
+# Files making up a dataset directory, with the (key, value) fields used by their JSONL/Parquet forms
+DATASET_FILES = {
+    "id_to_chunk": ("id", "text"),
+    "id_to_query": ("id", "text"),
+    "query_to_chunk": ("query_id", "chunk_id"),
+}
+
+# Fields of the optional graded judgments file, one (query, chunk, grade) record per judgment
+QRELS_FIELDS = ("query_id", "chunk_id", "grade")
+
+# Checked in this order, so a converted .jsonl/.parquet file takes precedence over the original .json
+DATASET_FORMATS = [".jsonl", ".parquet", ".json"]
+
+WHITESPACE = b" \t\r\n"
+
+
+class LazyTextMap(Mapping[str, Any]):
+    """Read-only mapping whose values are decoded from a memory-mapped file on access.
+
+    Only the keys and the byte range of each value are held in memory, so a
+    multi-GB corpus costs roughly the size of its ids until texts are read.
+
+    Args:
+        path: File the offsets point into
+        index: Key -> position in `offsets`
+        offsets: Flat array of (start, end) byte offsets, two entries per key
+        decode: Turns the bytes of one value back into the value
+    """
+
+    def __init__(self, path: str, index: Dict[str, int], offsets: array, decode: Callable[[bytes], Any]):
+        self.path = path
+        self._index = index
+        self._offsets = offsets
+        self._decode = decode
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path) else b""
+
+    def __getitem__(self, key: str) -> Any:
+        i = self._index[key] * 2
+        return self._decode(self._mmap[self._offsets[i]:self._offsets[i + 1]])
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+class ParquetMap(Mapping[str, Any]):
+    """Read-only mapping over two columns of a memory-mapped Parquet/Arrow table.
+
+    Values stay in Arrow buffers and are converted to Python objects on access.
+    """
+
+    def __init__(self, path: str, key_field: str, value_field: str):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Reading Parquet datasets requires pyarrow: pip install pyarrow") from e
+
+        self.path = path
+        table = pq.read_table(path, columns=[key_field, value_field], memory_map=True)
+        self._index = {key: i for i, key in enumerate(table.column(key_field).to_pylist())}
+        self._values = table.column(value_field).combine_chunks()
+
+    def __getitem__(self, key: str) -> Any:
+        return self._values[self._index[key]].as_py()
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+def _skip_whitespace(data: Any, pos: int) -> int:
+    while pos < len(data) and data[pos] in WHITESPACE:
+        pos += 1
+    return pos
+
+
+def _string_end(data: Any, start: int) -> int:
+    """Index of the quote closing the JSON string that opens at `start`."""
+    pos = start + 1
+    while True:
+        end = data.find(b'"', pos)
+        if end < 0:
+            raise ValueError(f"Unterminated string at byte {start}")
+
+        # A quote preceded by an odd number of backslashes is escaped
+        backslashes = 0
+        while data[end - 1 - backslashes] == ord("\\"):
+            backslashes += 1
+        if backslashes % 2 == 0:
+            return end
+        pos = end + 1
+
+
+def _index_json_object(data: Any) -> Optional[Tuple[Dict[str, int], array]]:
+    """Offsets of every value in a flat {"key": "string", ...} JSON object, or None if a value is not a string."""
+    index: Dict[str, int] = {}
+    offsets = array("q")
+
+    pos = _skip_whitespace(data, 0)
+    if data[pos:pos + 1] != b"{":
+        return None
+    pos = _skip_whitespace(data, pos + 1)
+
+    while data[pos:pos + 1] != b"}":
+        key_end = _string_end(data, pos)
+        key = json.loads(data[pos:key_end + 1])
+
+        pos = _skip_whitespace(data, key_end + 1)
+        pos = _skip_whitespace(data, pos + 1)  # past ':'
+        if data[pos:pos + 1] != b'"':
+            return None
+
+        value_end = _string_end(data, pos) + 1
+        # Rows are numbered by pair, so a repeated key points at its last value, as with json.load
+        index[key] = len(offsets) // 2
+        offsets.extend((pos, value_end))
+
+        pos = _skip_whitespace(data, value_end)
+        if data[pos:pos + 1] == b",":
+            pos = _skip_whitespace(data, pos + 1)
+
+    return index, offsets
+
+
+def load_json_mapping(path: str) -> Mapping[str, Any]:
+    """Index a flat JSON object of strings without decoding its values, falling back to json.load."""
+    if os.path.getsize(path):
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            indexed = _index_json_object(data)
+        if indexed is not None:
+            return LazyTextMap(path, *indexed, decode=json.loads)
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_jsonl_mapping(path: str, key_field: str, value_field: str) -> Mapping[str, Any]:
+    """Index a JSONL file of {key_field: ..., value_field: ...} records by line offsets."""
+    index: Dict[str, int] = {}
+    offsets = array("q")
+
+    with open(path, "rb") as f:
+        start = 0
+        for line in f:
+            end = start + len(line)
+            if line.strip():
+                # A repeated key points at its last record
+                index[json.loads(line)[key_field]] = len(offsets) // 2
+                offsets.extend((start, end))
+            start = end
+
+    return LazyTextMap(path, index, offsets, decode=lambda line: json.loads(line)[value_field])
+
+
+def find_dataset_file(data_dir: str, name: str) -> Optional[Path]:
+    for suffix in DATASET_FORMATS:
+        path = Path(data_dir) / f"{name}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def load_mapping(data_dir: str, name: str) -> Mapping[str, Any]:
+    """Load one dataset file by name from whichever supported format is present."""
+    key_field, value_field = DATASET_FILES[name]
+    path = find_dataset_file(data_dir, name)
+    if path is None:
+        raise FileNotFoundError(f"No {name} file ({', '.join(DATASET_FORMATS)}) found in {data_dir}")
+
+    if path.suffix == ".jsonl":
+        return load_jsonl_mapping(str(path), key_field, value_field)
+    elif path.suffix == ".parquet":
+        return ParquetMap(str(path), key_field, value_field)
+    return load_json_mapping(str(path))
+
+
+def load_qrels(path: str) -> Qrels:
+    """Load graded judgments from a .jsonl/.parquet table of QRELS_FIELDS records or a nested .json object.
+
+    Records without a grade count as grade 1.
+    """
+    query_field, doc_field, grade_field = QRELS_FIELDS
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Reading Parquet datasets requires pyarrow: pip install pyarrow") from e
+
+        table = pq.read_table(path, memory_map=True)
+        grades = table.column(grade_field).to_numpy() if grade_field in table.column_names else [1.0] * table.num_rows
+        return Qrels(table.column(query_field).to_pylist(), table.column(doc_field).to_pylist(), grades)
+
+    if path.endswith(".jsonl"):
+        query_ids, doc_ids, grades = [], [], []
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    query_ids.append(record[query_field])
+                    doc_ids.append(record[doc_field])
+                    grades.append(record.get(grade_field, 1))
+        return Qrels(query_ids, doc_ids, grades)
+
+    with open(path) as f:
+        return Qrels.from_mapping(json.load(f))
+
+
+class Dataset:
+    """Chunks, queries and relevance labels of a data directory, loaded lazily.
+
+    Args:
+        data_dir: Directory holding id_to_chunk, id_to_query and query_to_chunk
+            as .json (a flat object), .jsonl or .parquet files, and optionally
+            graded judgments in qrels (which may replace query_to_chunk)
+    """
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self.id_to_chunk = load_mapping(data_dir, "id_to_chunk")
+        self.id_to_query = load_mapping(data_dir, "id_to_query")
+
+        qrels_path = find_dataset_file(data_dir, "qrels")
+        self.qrels: Optional[Qrels] = load_qrels(str(qrels_path)) if qrels_path else None
+        if self.qrels is not None and find_dataset_file(data_dir, "query_to_chunk") is None:
+            # Single-label views (expected_doc_id in logs) use each query's best-graded chunk
+            self.query_to_chunk: Mapping[str, Any] = self.qrels.top_docs()
+        else:
+            self.query_to_chunk = load_mapping(data_dir, "query_to_chunk")
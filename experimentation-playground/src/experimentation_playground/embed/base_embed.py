@@ -1,15 +1,23 @@
 from abc import ABC, abstractmethod
-from typing import List, Any, Dict
+import asyncio
+from typing import List, Any, Dict, Mapping, Optional
 
 class BaseEmbed(ABC):
+    # Provider that embeds the chunks and queries, used to label run telemetry
+    provider: Optional[str] = None
+
     def __init__(self, client: Any, collection_name: str):
         self.client = client
         self.collection_name = collection_name
 
     @abstractmethod
-    def add_to_collection(self, id_to_chunk: Dict[str, str]) -> None:
+    def add_to_collection(self, id_to_chunk: Mapping[str, str], sync: bool = False) -> None:
+        """Ingest chunks into an empty collection, or with sync=True upsert/delete only what changed."""
         pass
 
     @abstractmethod
-    def query_collection(self, id_to_query: Dict[str, str], n_results: int = 10) -> Dict[str, List[str]]:
-        pass
\ No newline at end of file
+    def query_collection(self, id_to_query: Mapping[str, str], n_results: int = 10, show_progress: bool = True) -> Dict[str, List[str]]:
+        pass
+
+    async def aquery_collection(self, id_to_query: Mapping[str, str], n_results: int = 10) -> Dict[str, List[str]]:
+        return await asyncio.to_thread(self.query_collection, id_to_query, n_results, False)
@@ -1,35 +1,58 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+import contextvars
+import heapq
 import os
 import multiprocessing
-from typing import List, Any, Dict, Optional
+import threading
+import time
+from typing import List, Any, Dict, Optional, Callable, Deque, Mapping, Tuple
 from tqdm import tqdm
 from chromadb import Search, K, Knn
 
+from .config import (
+    DEFAULT_SEARCH_BATCH_SIZE,
+    MAX_SEARCH_BATCH_SIZE,
+    DEFAULT_SEARCH_CONCURRENCY,
+    DEFAULT_MAX_RETRIES,
+    QUERY_EMBED_BLOCK_SIZE,
+    GET_PAGE_SIZE,
+    INGEST_BLOCK_SIZE,
+    DELETE_BATCH_SIZE,
+)
+from .embedding_cache import text_hash
+from .scheduler import is_rate_limit_error
+from .vector_store import VectorStore
+from ..telemetry import note_retry
+
+# Metadata key holding the SHA-256 of each chunk's text, used to diff incremental syncs
+CONTENT_HASH_KEY = "content_hash"
+# Delay before retrying a rate limited search batch, doubled on each retry up to the maximum
+SEARCH_BASE_BACKOFF = 1.0
+SEARCH_MAX_BACKOFF = 60.0
+
 def add_to_chroma_collection(
     collection: Any, 
     ids: List[str], 
     texts: List[str], 
     embeddings: List[List[float]] | None = None, 
-    metadatas: List[Dict[str, Any]] | None = None
+    metadatas: List[Dict[str, Any]] | None = None,
+    upsert: bool = False
 ) -> None:
     BATCH_SIZE = 100
     LEN = len(texts)
     N_THREADS = min(os.cpu_count() or multiprocessing.cpu_count(), 20)
+    write = collection.upsert if upsert else collection.add
 
     def add_batch(start: int, end: int) -> None:
-        id_batch = ids[start:end]
-        doc_batch = texts[start:end]
+        batch = {"ids": ids[start:end], "documents": texts[start:end]}
+        if embeddings is not None:
+            batch["embeddings"] = embeddings[start:end]
+        if metadatas:
+            batch["metadatas"] = metadatas[start:end]
 
         try:
-            if embeddings and metadatas:
-                collection.add(ids=id_batch, documents=doc_batch, embeddings=embeddings[start:end], metadatas=metadatas[start:end])
-            elif embeddings:
-                collection.add(ids=id_batch, documents=doc_batch, embeddings=embeddings[start:end])
-            elif metadatas:
-                collection.add(ids=id_batch, documents=doc_batch, metadatas=metadatas[start:end])
-            else:
-                collection.add(ids=id_batch, documents=doc_batch)
-
+            write(**batch)
         except Exception as e:
             raise Exception(f"Error adding {start} to {end}: {e}")
 
@@ -45,48 +68,263 @@ def add_to_chroma_collection(
 
     threadpool.shutdown(wait=True)
 
+def content_hash_metadatas(texts: List[str]) -> List[Dict[str, str]]:
+    return [{CONTENT_HASH_KEY: text_hash(text)} for text in texts]
+
+def ingest_chroma_collection(
+    collection: Any,
+    id_to_chunk: Mapping[str, str],
+    ids: Optional[List[str]] = None,
+    embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+    upsert: bool = False,
+    block_size: int = INGEST_BLOCK_SIZE,
+    vector_store: Optional[VectorStore] = None
+) -> None:
+    """Embed (if `embed_fn` is given) and write chunks one block at a time, storing their content hashes.
+
+    Only one block of texts and vectors is materialized at once, so lazily
+    loaded corpora are never held in memory in full. With a `vector_store`,
+    vectors already stored for unchanged texts are reused instead of embedded,
+    and new vectors are written to the store.
+    """
+    ids = list(id_to_chunk) if ids is None else ids
+    for start in range(0, len(ids), block_size):
+        block_ids = ids[start:start + block_size]
+        texts = [id_to_chunk[doc_id] for doc_id in block_ids]
+        if embed_fn and vector_store is not None:
+            embeddings = vector_store.get_or_embed(block_ids, texts, embed_fn)
+        else:
+            embeddings = embed_fn(texts) if embed_fn else None
+        add_to_chroma_collection(collection, block_ids, texts, embeddings, content_hash_metadatas(texts), upsert=upsert)
+
+    if vector_store is not None:
+        vector_store.flush()
+
+def get_content_hashes(collection: Any, page_size: int = GET_PAGE_SIZE) -> Dict[str, Optional[str]]:
+    """Page through a collection, returning id -> stored content hash (None if missing)."""
+    hashes = {}
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        for doc_id, metadata in zip(page["ids"], page["metadatas"] or []):
+            hashes[doc_id] = (metadata or {}).get(CONTENT_HASH_KEY)
+        if len(page["ids"]) < page_size:
+            return hashes
+        offset += page_size
+
+def sync_chroma_collection(
+    collection: Any,
+    id_to_chunk: Mapping[str, str],
+    embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+    vector_store: Optional[VectorStore] = None
+) -> Tuple[int, int]:
+    """Bring a collection (and its `vector_store`, if given) in line with id_to_chunk by content hash.
+
+    New and changed chunks are embedded (if `embed_fn` is given) and upserted,
+    chunks that are no longer present are deleted. Chunks ingested without a
+    stored hash count as changed.
+
+    Returns:
+        Number of chunks upserted and deleted
+    """
+    stored = get_content_hashes(collection)
+    changed_ids = [
+        doc_id for doc_id, text in id_to_chunk.items()
+        if stored.get(doc_id) != text_hash(text)
+    ]
+    deleted_ids = [doc_id for doc_id in stored if doc_id not in id_to_chunk]
+
+    for i in range(0, len(deleted_ids), DELETE_BATCH_SIZE):
+        collection.delete(ids=deleted_ids[i:i + DELETE_BATCH_SIZE])
+
+    if vector_store is not None:
+        vector_store.delete(deleted_ids)
+
+    ingest_chroma_collection(collection, id_to_chunk, changed_ids, embed_fn, upsert=True, vector_store=vector_store)
+
+    print(f"Synced collection: {len(changed_ids)} upserted, {len(deleted_ids)} deleted, {len(id_to_chunk) - len(changed_ids)} unchanged")
+    return len(changed_ids), len(deleted_ids)
+
+class SearchBatchTuner:
+    """Grows the search batch size until the backend rejects it, then holds below that limit.
+
+    Args:
+        initial: Starting number of searches per request
+        maximum: Upper bound on searches per request
+    """
+
+    def __init__(self, initial: int = DEFAULT_SEARCH_BATCH_SIZE, maximum: int = MAX_SEARCH_BATCH_SIZE):
+        self.size = initial
+        self.maximum = maximum
+        self.limit_found = False
+        self._lock = threading.Lock()
+
+    def on_success(self, size: int) -> None:
+        with self._lock:
+            if not self.limit_found and size >= self.size:
+                self.size = min(self.maximum, self.size * 2)
+
+    def on_limit(self, size: int) -> None:
+        with self._lock:
+            self.limit_found = True
+            self.size = max(1, min(self.size, size // 2))
+
+
+def is_search_limit_error(error: Exception) -> bool:
+    return type(error).__name__ in ("QuotaError", "BatchSizeExceededError")
+
+
+def run_searches(
+    collection: Any,
+    queries: List[Any],
+    n_results: int = 10,
+    embedding_key: Optional[str] = None
+) -> List[List[str]]:
+    searches = []
+    for query in queries:
+        if embedding_key:
+            search = (Search()
+                .rank(Knn(query=query, key=embedding_key))
+                .limit(n_results)
+                .select(K.ID))
+        else:
+            search = (Search()
+                .rank(Knn(query=query))
+                .limit(n_results)
+                .select(K.ID))
+        searches.append(search)
+
+    try:
+        return collection.search(searches)['ids']
+    except NotImplementedError:
+        # Local Chroma has no Search API, fall back to query() so the pipeline runs against EphemeralClient
+        if isinstance(queries[0], str):
+            return collection.query(query_texts=queries, n_results=n_results, include=[])['ids']
+        return collection.query(query_embeddings=queries, n_results=n_results, include=[])['ids']
+
+
 def search_chroma_collection(
     collection: Any,
     query_ids: List[str],
     query_embeddings: Optional[List[List[float]]] = None,
     query_texts: Optional[List[str]] = None,
     n_results: int = 10,
-    embedding_key: Optional[str] = None
+    embedding_key: Optional[str] = None,
+    embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+    batch_size: int = DEFAULT_SEARCH_BATCH_SIZE,
+    max_in_flight: int = DEFAULT_SEARCH_CONCURRENCY,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    show_progress: bool = True
 ) -> Dict[str, List[str]]:
-    BATCH_SIZE = 5
-    results: Dict[str, List[str]] = {}
+    """Search a collection with several batches in flight.
 
+    When `embed_fn` is given, `query_texts` are embedded in blocks and each block
+    is searched as soon as it is embedded, so embedding of the next block overlaps
+    with search of the current one. The batch size starts at `batch_size` and
+    grows until the backend reports a batch limit. Rate limited batches are
+    resubmitted after an exponential backoff, while other batches keep being
+    collected, and fail the search after `max_retries` attempts.
+    """
     if query_embeddings is None and query_texts is None:
         raise ValueError("Either query_embeddings or query_texts must be provided")
 
+    results: Dict[str, List[str]] = {}
     total_queries = len(query_ids)
+    remaining = total_queries
+    tuner = SearchBatchTuner(initial=batch_size)
+
+    # Queries ready to be searched, as (query_id, query) pairs
+    ready: Deque[Tuple[str, Any]] = deque()
+
+    embed_executor = ThreadPoolExecutor(max_workers=1)
+    embed_futures: Deque[Future] = deque()
+    if embed_fn is not None and query_texts is not None:
+        for i in range(0, total_queries, QUERY_EMBED_BLOCK_SIZE):
+            block_ids = query_ids[i:i + QUERY_EMBED_BLOCK_SIZE]
+            block_texts = query_texts[i:i + QUERY_EMBED_BLOCK_SIZE]
+            # Copy the caller's context so query embedding batches are reported to its run telemetry
+            future = embed_executor.submit(
+                contextvars.copy_context().run, lambda ids, texts: list(zip(ids, embed_fn(texts))), block_ids, block_texts
+            )
+            embed_futures.append(future)
+    else:
+        queries = query_embeddings if query_embeddings is not None else query_texts
+        ready.extend(zip(query_ids, queries))
+
+    search_executor = ThreadPoolExecutor(max_workers=max_in_flight)
+    # Batches in flight, with the number of attempts made at each
+    in_flight: Dict[Future, Tuple[List[Tuple[str, Any]], int]] = {}
+    # Rate limited batches waiting for their backoff, as (due time, sequence, batch, attempts) entries of a heap
+    delayed: List[Tuple[float, int, List[Tuple[str, Any]], int]] = []
+    delayed_count = 0
+
+    def submit(batch: List[Tuple[str, Any]], attempts: int) -> None:
+        future = search_executor.submit(
+            run_searches,
+            collection,
+            [query for _, query in batch],
+            n_results,
+            embedding_key
+        )
+        in_flight[future] = (batch, attempts)
+
+    try:
+        with tqdm(total=total_queries, desc="Searching collection", disable=not show_progress) as pbar:
+            while remaining > 0:
+                # Blocks are released in order so ready queries keep the input ordering
+                while embed_futures and (embed_futures[0].done() or not ready and not in_flight):
+                    ready.extend(embed_futures.popleft().result())
+
+                # Retries whose backoff has elapsed go first, keeping their batch and attempt count
+                while delayed and delayed[0][0] <= time.monotonic() and len(in_flight) < max_in_flight:
+                    _, _, batch, attempts = heapq.heappop(delayed)
+                    submit(batch, attempts)
+
+                while ready and len(in_flight) < max_in_flight:
+                    submit([ready.popleft() for _ in range(min(tuner.size, len(ready)))], 0)
+
+                if not in_flight and not embed_futures and not delayed:
+                    break
+
+                # Also wake up when the next query block finishes embedding, or the next retry is due
+                waiting = list(in_flight) + ([embed_futures[0]] if embed_futures else [])
+                timeout = max(0.0, delayed[0][0] - time.monotonic()) if delayed else None
+                if not waiting:
+                    time.sleep(timeout)
+                    continue
+                done, _ = wait(waiting, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future not in in_flight:
+                        continue
+                    batch, attempts = in_flight.pop(future)
+                    try:
+                        batch_results = future.result()
+                    except Exception as e:
+                        if is_search_limit_error(e) and len(batch) > 1:
+                            tuner.on_limit(len(batch))
+                            ready.extendleft(reversed(batch))
+                            continue
+                        if is_rate_limit_error(e):
+                            if attempts + 1 >= max_retries:
+                                raise Exception(
+                                    f"Searching batch of {len(batch)} queries still rate limited after {max_retries} attempts: {e}"
+                                ) from e
+                            note_retry()
+                            delay = min(SEARCH_MAX_BACKOFF, SEARCH_BASE_BACKOFF * 2 ** attempts)
+                            heapq.heappush(delayed, (time.monotonic() + delay, delayed_count, batch, attempts + 1))
+                            delayed_count += 1
+                            continue
+                        raise Exception(f"Error searching batch of {len(batch)} queries: {e}") from e
+
+                    tuner.on_success(len(batch))
+                    for (query_id, _), ids in zip(batch, batch_results):
+                        results[query_id] = ids
+                    remaining -= len(batch)
+                    pbar.update(len(batch))
+    finally:
+        for future in list(in_flight) + list(embed_futures):
+            future.cancel()
+        search_executor.shutdown(wait=True)
+        embed_executor.shutdown(wait=True)
 
-    for i in tqdm(range(0, total_queries, BATCH_SIZE), desc="Processing batches"):
-        end_idx = min(i + BATCH_SIZE, total_queries)
-        batch_ids = query_ids[i:end_idx]
-
-        searches = []
-        for idx in range(len(batch_ids)):
-            if query_embeddings is not None:
-                query = query_embeddings[i + idx]
-            else:
-                query = query_texts[i + idx]
-
-            if embedding_key:
-                search = (Search()
-                    .rank(Knn(query=query, key=embedding_key))
-                    .limit(n_results)
-                    .select(K.ID))
-            else:
-                search = (Search()
-                    .rank(Knn(query=query))
-                    .limit(n_results)
-                    .select(K.ID))
-            searches.append(search)
-
-        search_results = collection.search(searches)
-
-        for idx, query_id in enumerate(batch_ids):
-            results[query_id] = search_results['ids'][idx]
-
-    return results
\ No newline at end of file
+    return {query_id: results[query_id] for query_id in query_ids}
@@ -1,4 +1,29 @@
 DEFAULT_BATCH_SIZE = 100
+DEFAULT_CACHE_PATH = ".cache/embeddings.sqlite"
+DEFAULT_VECTOR_STORE_DIR = ".cache/vectors"
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MAX_RETRIES = 5
+
+# Search pipeline defaults, batch size grows from the initial value until the backend rejects it
+DEFAULT_SEARCH_BATCH_SIZE = 5
+MAX_SEARCH_BATCH_SIZE = 100
+DEFAULT_SEARCH_CONCURRENCY = 8
+QUERY_EMBED_BLOCK_SIZE = 500
+
+# Chunks embedded and written per block during ingestion, bounds texts and vectors held in memory
+INGEST_BLOCK_SIZE = 10_000
+
+# Local retrieval: rows scored per matrix multiply, and corpus size from which an HNSW index is used if hnswlib is installed
+LOCAL_DOC_BLOCK_SIZE = 16_384
+LOCAL_QUERY_BLOCK_SIZE = 1024
+LOCAL_ANN_THRESHOLD = 200_000
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 128
+
+# Page size for reading ids/metadata back from a collection during incremental sync
+GET_PAGE_SIZE = 300
+DELETE_BATCH_SIZE = 100
 
 # Provider and model configurations
 EMBEDDING_CONFIGS = {
@@ -13,6 +38,18 @@ EMBEDDING_CONFIGS = {
         "voyage-3-large",
         "voyage-3",
     ],
+    # Deterministic local provider for benchmarking, no API key required
+    "fake": [
+        "fake-embedding",
+    ],
+}
+
+# Default request/token budgets per provider, tune these to your account tier
+PROVIDER_RATE_LIMITS = {
+    "openai": {"requests_per_minute": 3000, "tokens_per_minute": 1_000_000},
+    "jina": {"requests_per_minute": 500, "tokens_per_minute": 1_000_000},
+    "voyage": {"requests_per_minute": 2000, "tokens_per_minute": 3_000_000},
+    "fake": {"requests_per_minute": None, "tokens_per_minute": None},
 }
 
 
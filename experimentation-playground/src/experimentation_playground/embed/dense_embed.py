@@ -1,14 +1,18 @@
 from .base_embed import BaseEmbed
-from typing import List, Any, Dict
+import asyncio
+from typing import List, Any, Dict, Mapping, Optional
 from .embedding_models import EmbeddingModel
+from .vector_store import get_vector_store
 from .chroma import *
 
 class DenseEmbed(BaseEmbed):    
-    def __init__(self, client: Any, collection_name: str, provider: str, model_name: str):
+    def __init__(self, client: Any, collection_name: str, provider: str, model_name: str, vector_store_root: Optional[str] = None, **model_kwargs):
         super().__init__(client, collection_name)
         self.provider = provider
         self.model_name = model_name
-        self.model = EmbeddingModel(provider, model_name)
+        self.model = EmbeddingModel(provider, model_name, **model_kwargs)
+        # Document vectors are kept on disk as a float32 matrix for reuse across ingestion, search and analysis
+        self.vector_store = get_vector_store(collection_name, provider, model_name, root=vector_store_root)
         if collection_name not in [collection.name for collection in client.list_collections()]:
             self.collection = client.create_collection(collection_name, metadata={"hnsw:space": "cosine"})
             print(f"Collection {collection_name} created")
@@ -16,16 +20,30 @@ class DenseEmbed(BaseEmbed):
             self.collection = client.get_collection(collection_name)
             print(f"Collection {collection_name} already exists")
 
-    def add_to_collection(self, id_to_chunk: Dict[str, str]) -> None:
-        if self.collection.count() == 0:
-            embeddings = self.model.embed_in_batches(list(id_to_chunk.values()))
-            add_to_chroma_collection(self.collection, list(id_to_chunk.keys()), list(id_to_chunk.values()), embeddings)
+    def add_to_collection(self, id_to_chunk: Mapping[str, str], sync: bool = False) -> None:
+        if sync:
+            sync_chroma_collection(self.collection, id_to_chunk, embed_fn=self.model.embed_in_batches, vector_store=self.vector_store)
+        elif self.collection.count() == 0:
+            ingest_chroma_collection(self.collection, id_to_chunk, embed_fn=self.model.embed_in_batches, vector_store=self.vector_store)
         
-    def query_collection(self, id_to_query: Dict[str, str], n_results: int = 10) -> Dict[str, List[str]]:
-        embeddings = self.model.embed(list(id_to_query.values()))
+    def query_collection(self, id_to_query: Mapping[str, str], n_results: int = 10, show_progress: bool = True) -> Dict[str, List[str]]:
+        # Query blocks are embedded while earlier blocks are being searched
         return search_chroma_collection(
             self.collection,
             list(id_to_query.keys()),
-            query_embeddings=embeddings,
-            n_results=n_results
-        )
\ No newline at end of file
+            query_texts=list(id_to_query.values()),
+            embed_fn=lambda texts: self.model.embed(texts, input_type="query"),
+            n_results=n_results,
+            show_progress=show_progress
+        )
+
+    async def aquery_collection(self, id_to_query: Mapping[str, str], n_results: int = 10) -> Dict[str, List[str]]:
+        query_embeddings = await self.model.aembed(list(id_to_query.values()), input_type="query")
+        return await asyncio.to_thread(
+            search_chroma_collection,
+            self.collection,
+            list(id_to_query.keys()),
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            show_progress=False
+        )
@@ -1,11 +1,18 @@
 from .dense_embed import DenseEmbed
 from .sparse_embed import SparseEmbed
+from .local_embed import LocalEmbed
+from .fake_embed import FakeEmbed
 
 EMBED_REGISTRY = {
     "dense": DenseEmbed,
     "sparse": SparseEmbed,
+    "local": LocalEmbed,
+    "fake": FakeEmbed,
 }
 
+# Embed types that search a Chroma collection, the others run without a Chroma client
+CHROMA_EMBED_TYPES = {"dense", "sparse", "fake"}
+
 def get_embedder(embed_type: str, client, collection_name: str, provider: str = None, model_name: str = None):
     if embed_type not in EMBED_REGISTRY:
         raise ValueError(f"Unknown embed type: {embed_type}")
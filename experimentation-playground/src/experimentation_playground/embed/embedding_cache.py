@@ -0,0 +1,122 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from .config import DEFAULT_CACHE_PATH
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def pack_vector(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def unpack_vector(blob: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class EmbeddingCache:
+    """Persistent, content-addressed cache for embedding vectors.
+
+    Vectors are keyed on (provider, model_name, input_type, sha256(text)) and
+    stored as float32 blobs in a SQLite database, so repeated runs over the same
+    corpus or query set only pay for texts that have not been embedded before.
+
+    Args:
+        path: Path to the SQLite database file (default: .cache/embeddings.sqlite)
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                provider TEXT NOT NULL,
+                model_name TEXT NOT NULL,
+                input_type TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (provider, model_name, input_type, text_hash)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get_many(
+        self,
+        provider: str,
+        model_name: str,
+        input_type: str,
+        hashes: List[str]
+    ) -> Dict[str, List[float]]:
+        """Look up cached vectors by text hash, returning a text hash -> vector mapping."""
+        hashes = list(set(hashes))
+        found: Dict[str, List[float]] = {}
+
+        # SQLite caps the number of bound parameters per statement
+        chunk_size = 500
+        with self._lock:
+            for i in range(0, len(hashes), chunk_size):
+                chunk = hashes[i:i + chunk_size]
+                placeholders = ",".join("?" for _ in chunk)
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE provider = ? AND model_name = ? AND input_type = ? "
+                    f"AND text_hash IN ({placeholders})",
+                    (provider, model_name, input_type, *chunk)
+                ).fetchall()
+                for hash_, blob in rows:
+                    found[hash_] = unpack_vector(blob)
+
+        return found
+
+    def put_many(
+        self,
+        provider: str,
+        model_name: str,
+        input_type: str,
+        items: List[Tuple[str, List[float]]]
+    ) -> None:
+        """Store (text hash, vector) pairs."""
+        rows = [
+            (provider, model_name, input_type, hash_, pack_vector(vector))
+            for hash_, vector in items
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings "
+                "(provider, model_name, input_type, text_hash, vector) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_CACHES: Dict[str, EmbeddingCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_embedding_cache(path: Optional[str] = None) -> EmbeddingCache:
+    """Get the process-wide cache for a database path, creating it on first use."""
+    path = path or os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH)
+    with _CACHES_LOCK:
+        if path not in _CACHES:
+            _CACHES[path] = EmbeddingCache(path)
+        return _CACHES[path]
@@ -1,129 +1,243 @@
-from typing import List, Any, Dict, Optional
-from tqdm import tqdm
-import requests
-import json
-from voyageai import Client as VoyageClient
-from openai import OpenAI as OpenAIClient
+from typing import List, Any, Dict, Optional, Callable, Tuple
+import asyncio
+import random
+import time
+import threading
+from voyageai import Client as VoyageClient, AsyncClient as AsyncVoyageClient
+from openai import OpenAI as OpenAIClient, AsyncOpenAI as AsyncOpenAIClient
 import os
 import dotenv
 
-from .config import validate_provider_and_model, EMBEDDING_CONFIGS, DEFAULT_BATCH_SIZE
+from .config import (
+    validate_provider_and_model,
+    EMBEDDING_CONFIGS,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_CONCURRENCY,
+)
+from .embedding_cache import EmbeddingCache, get_embedding_cache, text_hash
+from .scheduler import EmbeddingScheduler, EmbeddingError
+from ..pipeline import LoopLocal
+from ..budget import get_provider_budget
+from ..fake_providers import FakeBehavior, stable_seed
+from ..http_pool import DEFAULT_MAX_CONNECTIONS, post_json, apost_json
 
 dotenv.load_dotenv()
 
+# Jina task names for the generic 'query'/'document' input types
+JINA_TASKS = {
+    "query": "retrieval.query",
+    "document": "retrieval.passage",
+}
+
 # common embedding functions
+# Provider calls raise on failure so the scheduler can retry and back off on 429s
+def _split_batches(texts: List[str], batch_size: int) -> List[List[str]]:
+    return [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+
+
 def openai_embed(
     openai_client: OpenAIClient, 
     texts: List[str], 
     model: str
 ) -> List[List[float]]:
-    try:
-        return [response.embedding for response in openai_client.embeddings.create(model=model, input = texts).data]
-    except Exception as e:
-        print(f"Error embedding: {e}")
-        return [[0.0]*1024 for _ in texts]
+    return [response.embedding for response in openai_client.embeddings.create(model=model, input = texts).data]
+
+async def aopenai_embed(
+    openai_client: AsyncOpenAIClient,
+    texts: List[str],
+    model: str
+) -> List[List[float]]:
+    response = await openai_client.embeddings.create(model=model, input=texts)
+    return [item.embedding for item in response.data]
  
 def openai_embed_in_batches(
     openai_client: OpenAIClient, 
     texts: List[str], 
     model: str, 
-    batch_size: int = 100
+    batch_size: int = 100,
+    scheduler: Optional[EmbeddingScheduler] = None
 ) -> List[List[float]]:
-    all_embeddings = []
-
-    for i in tqdm(range(0, len(texts), batch_size), desc="Processing OpenAI batches"):
-        batch = texts[i:i + batch_size]
-        batch_embeddings = openai_embed(openai_client, batch, model)
-        all_embeddings.extend(batch_embeddings)
-
-    return all_embeddings
+    scheduler = scheduler or EmbeddingScheduler()
+    return scheduler.run(
+        _split_batches(texts, batch_size),
+        lambda batch: openai_embed(openai_client, batch, model),
+        desc="Processing OpenAI batches"
+    )
 
 
 def jina_embed(
     JINA_API_KEY: str, 
     input_type: str, 
-    texts: List[str]
+    texts: List[str],
+    model: str = "jina-embeddings-v3",
+    compress: bool = False,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS
 ) -> List[List[float]]:
-    try:
-        url = "https://api.jina.ai/v1/embeddings"
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {JINA_API_KEY}"
-        }
-        
-        data = {
-            "model": "jina-embeddings-v3",
-            "task": input_type,
-            "late_chunking": False,
-            "dimensions": 1024,
-            "embedding_type": "float",
-            "input": texts
-        }
-
-        response = requests.post(url, headers=headers, json=data)
-        response_dict = json.loads(response.text)
-        embeddings = [item["embedding"] for item in response_dict["data"]]
-        
-        return embeddings
-    
-    except Exception as e:
-        print(f"Error embedding batch: {e}")
-        return [[0.0]*1024 for _ in texts]
+    url, headers, data = _jina_request(JINA_API_KEY, input_type, texts, model)
+
+    response = post_json(url, data, headers, compress=compress, max_connections=max_connections)
+    response_dict = response.json()
+    embeddings = [item["embedding"] for item in response_dict["data"]]
+
+    return embeddings
+
+async def ajina_embed(
+    JINA_API_KEY: str,
+    input_type: str,
+    texts: List[str],
+    model: str = "jina-embeddings-v3",
+    compress: bool = False,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS
+) -> List[List[float]]:
+    url, headers, data = _jina_request(JINA_API_KEY, input_type, texts, model)
+
+    response = await apost_json(url, data, headers, compress=compress, max_connections=max_connections)
+    return [item["embedding"] for item in response.json()["data"]]
+
+def _jina_request(
+    JINA_API_KEY: str,
+    input_type: str,
+    texts: List[str],
+    model: str
+) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+    url = "https://api.jina.ai/v1/embeddings"
+    headers = {
+        "Authorization": f"Bearer {JINA_API_KEY}"
+    }
+
+    data = {
+        "model": model,
+        "task": JINA_TASKS.get(input_type, input_type),
+        "late_chunking": False,
+        "dimensions": 1024,
+        "embedding_type": "float",
+        "input": texts
+    }
+    return url, headers, data
 
 def jina_embed_in_batches(
     JINA_API_KEY: str, 
     input_type: str, 
     texts: List[str], 
-    batch_size: int = 100
+    batch_size: int = 100,
+    model: str = "jina-embeddings-v3",
+    scheduler: Optional[EmbeddingScheduler] = None,
+    compress: bool = False
 ) -> List[List[float]]:
-    all_embeddings = []
-    
-    for i in tqdm(range(0, len(texts), batch_size), desc="Processing Jina batches"):
-        batch = texts[i:i + batch_size]
-        batch_embeddings = jina_embed(JINA_API_KEY, input_type, batch)
-        all_embeddings.extend(batch_embeddings)
-    
-    return all_embeddings
+    scheduler = scheduler or EmbeddingScheduler()
+    # One pooled connection per batch in flight
+    return scheduler.run(
+        _split_batches(texts, batch_size),
+        lambda batch: jina_embed(JINA_API_KEY, input_type, batch, model, compress, scheduler.max_concurrency),
+        desc="Processing Jina batches"
+    )
 
 
 def voyage_embed(
     voyage_client: VoyageClient, 
     input_type: str, 
-    texts: List[str]
+    texts: List[str],
+    model: str = "voyage-3-large"
+) -> List[List[float]]:
+    response = voyage_client.embed(texts, model=model, input_type=input_type)
+    return response.embeddings
+
+async def avoyage_embed(
+    voyage_client: AsyncVoyageClient,
+    input_type: str,
+    texts: List[str],
+    model: str = "voyage-3-large"
 ) -> List[List[float]]:
-    try:
-        response = voyage_client.embed(texts, model="voyage-3-large", input_type=input_type)
-        return response.embeddings
-    
-    except Exception as e:
-        print(f"Error embedding batch: {e}")
-        return [[0.0]*1024 for _ in texts]
+    response = await voyage_client.embed(texts, model=model, input_type=input_type)
+    return response.embeddings
 
 def voyage_embed_in_batches(
     voyage_client: VoyageClient,
     input_type: str,
     texts: List[str],
-    batch_size: int = 100
+    batch_size: int = 100,
+    model: str = "voyage-3-large",
+    scheduler: Optional[EmbeddingScheduler] = None
 ) -> List[List[float]]:
-    all_embeddings = []
+    scheduler = scheduler or EmbeddingScheduler()
+    return scheduler.run(
+        _split_batches(texts, batch_size),
+        lambda batch: voyage_embed(voyage_client, input_type, batch, model),
+        desc="Processing Voyage batches"
+    )
 
-    for i in tqdm(range(0, len(texts), batch_size), desc="Processing Voyage batches"):
-        batch = texts[i:i + batch_size]
 
-        batch_embeddings = voyage_embed(voyage_client, input_type, batch)
+def fake_embed(
+    texts: List[str],
+    dimensions: int = 256,
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    behavior: Optional[FakeBehavior] = None
+) -> List[List[float]]:
+    """Deterministic local embeddings with injectable latency, errors and 429s.
 
-        all_embeddings.extend(batch_embeddings)
+    A shared `behavior` replaces the per-call latency and failure rates, and
+    adds its requests per minute limit.
+    """
+    behavior = behavior or FakeBehavior(latency, error_rate, rate_limit_rate)
+    if behavior.latency:
+        time.sleep(behavior.latency)
+    behavior.check()
+    return _fake_vectors(texts, dimensions)
 
-    return all_embeddings
+async def afake_embed(
+    texts: List[str],
+    dimensions: int = 256,
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    behavior: Optional[FakeBehavior] = None
+) -> List[List[float]]:
+    behavior = behavior or FakeBehavior(latency, error_rate, rate_limit_rate)
+    if behavior.latency:
+        await asyncio.sleep(behavior.latency)
+    behavior.check()
+    return _fake_vectors(texts, dimensions)
+
+def _fake_vectors(texts: List[str], dimensions: int) -> List[List[float]]:
+    embeddings = []
+    for text in texts:
+        rng = random.Random(stable_seed(text))
+        embeddings.append([rng.uniform(-1.0, 1.0) for _ in range(dimensions)])
+    return embeddings
+
+def fake_embed_in_batches(
+    texts: List[str],
+    batch_size: int = 100,
+    scheduler: Optional[EmbeddingScheduler] = None,
+    **kwargs
+) -> List[List[float]]:
+    scheduler = scheduler or EmbeddingScheduler()
+    return scheduler.run(
+        _split_batches(texts, batch_size),
+        lambda batch: fake_embed(batch, **kwargs),
+        desc="Processing Fake batches"
+    )
 
 
 class EmbeddingModel:
     """Unified interface for embedding models across different providers.
 
+    Embeddings are served from a persistent content-addressed cache when
+    available, so only texts that have not been embedded before are sent to
+    the provider.
+
     Args:
         provider: The embedding provider ('openai', 'jina', 'voyage')
         model_name: The specific model name
         api_key: Optional API key (can also be set via environment variables)
+        cache: Optional embedding cache (default: shared cache at EMBEDDING_CACHE_PATH)
+        use_cache: Whether to read and write cached embeddings (default: True)
+        max_concurrency: Maximum number of batches in flight (default: 8)
+        requests_per_minute: Optional request budget for this model alone
+        tokens_per_minute: Optional token budget for this model alone
+        compress_requests: Gzip large request bodies for HTTP providers (default: False)
         **kwargs: Additional provider-specific configuration
 
     Example:
@@ -138,6 +252,9 @@ class EmbeddingModel:
         >>> # Voyage
         >>> model = EmbeddingModel(provider="voyage", model_name="voyage-3-large")
         >>> embeddings = model.embed_in_batches(texts, batch_size=50)
+
+        >>> # Fake provider with injected latency and 429s for benchmarking
+        >>> model = EmbeddingModel(provider="fake", model_name="fake-embedding", latency=0.2, rate_limit_rate=0.05)
     """
 
     def __init__(
@@ -145,6 +262,12 @@ class EmbeddingModel:
         provider: str,
         model_name: str,
         api_key: Optional[str] = None,
+        cache: Optional[EmbeddingCache] = None,
+        use_cache: bool = True,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        compress_requests: bool = False,
         **kwargs
     ):
         self.provider = provider.lower()
@@ -157,6 +280,7 @@ class EmbeddingModel:
             if not api_key:
                 raise ValueError("OpenAI API key required. Set OPENAI_API_KEY environment variable or pass api_key parameter.")
             self.client = OpenAIClient(api_key=api_key)
+            self.async_clients = LoopLocal(lambda: AsyncOpenAIClient(api_key=api_key))
 
         elif self.provider == "jina":
             self.api_key = api_key or os.getenv("JINA_API_KEY")
@@ -168,6 +292,23 @@ class EmbeddingModel:
             if not api_key:
                 raise ValueError("Voyage API key required. Set VOYAGE_API_KEY environment variable or pass api_key parameter.")
             self.client = VoyageClient(api_key=api_key)
+            self.async_clients = LoopLocal(lambda: AsyncVoyageClient(api_key=api_key))
+
+        # Provider-wide limits are shared with every other model and run in the process
+        self.scheduler = EmbeddingScheduler(
+            max_concurrency=max_concurrency,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            budget=get_provider_budget(self.provider),
+            provider=self.provider,
+        )
+
+        self.compress_requests = compress_requests
+
+        self.cache = (cache or get_embedding_cache()) if use_cache else None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._stats_lock = threading.Lock()
 
         # Store additional kwargs for provider-specific options
         self.kwargs = kwargs
@@ -179,25 +320,29 @@ class EmbeddingModel:
     ) -> List[List[float]]:
         """Generate embeddings for a list of texts.
 
+        Texts beyond the provider batch size are split into bounded batches and
+        embedded concurrently with the same retry semantics as embed_in_batches.
+
         Args:
             texts: List of texts to embed
             input_type: Optional input type ('query' or 'document') for Jina/Voyage
 
         Returns:
             List of embedding vectors
-        """
-        if self.provider == "openai":
-            return openai_embed(self.client, texts, self.model_name)
 
-        elif self.provider == "jina":
-            input_type = input_type or "document"
-            return jina_embed(self.api_key, input_type, texts)
+        Raises:
+            EmbeddingError: If a batch cannot be embedded after all retries
+        """
+        input_type = self._resolve_input_type(input_type)
 
-        elif self.provider == "voyage":
-            input_type = input_type or "document"
-            return voyage_embed(self.client, input_type, texts)
+        def embed_misses(misses: List[str]) -> List[List[float]]:
+            return self.scheduler.run(
+                _split_batches(misses, DEFAULT_BATCH_SIZE),
+                lambda batch: self._embed_batch(batch, input_type),
+                desc=None
+            )
 
-        raise ValueError(f"Unsupported provider: {self.provider}")
+        return self._embed_with_cache(texts, input_type, embed_misses)
 
     def embed_in_batches(
         self,
@@ -214,20 +359,149 @@ class EmbeddingModel:
 
         Returns:
             List of embedding vectors
+
+        Raises:
+            EmbeddingError: If a batch cannot be embedded after all retries
         """
+        input_type = self._resolve_input_type(input_type)
+
+        def embed_misses(misses: List[str]) -> List[List[float]]:
+            if self.provider == "openai":
+                return openai_embed_in_batches(self.client, misses, self.model_name, batch_size, self.scheduler)
+
+            elif self.provider == "jina":
+                return jina_embed_in_batches(self.api_key, input_type, misses, batch_size, self.model_name, self.scheduler, self.compress_requests)
+
+            elif self.provider == "voyage":
+                return voyage_embed_in_batches(self.client, input_type, misses, batch_size, self.model_name, self.scheduler)
+
+            elif self.provider == "fake":
+                return fake_embed_in_batches(misses, batch_size, self.scheduler, **self.kwargs)
+
+            raise ValueError(f"Unsupported provider: {self.provider}")
+
+        hits, misses = self.cache_hits, self.cache_misses
+        embeddings = self._embed_with_cache(texts, input_type, embed_misses)
+        if self.cache is not None:
+            print(f"Embedding cache: {self.cache_hits - hits} hits, {self.cache_misses - misses} misses")
+        return embeddings
+
+    async def aembed(
+        self,
+        texts: List[str],
+        input_type: Optional[str] = None
+    ) -> List[List[float]]:
+        """Async counterpart of embed() using the providers' async clients.
+
+        Args:
+            texts: List of texts to embed
+            input_type: Optional input type ('query' or 'document') for Jina/Voyage
+
+        Returns:
+            List of embedding vectors
+
+        Raises:
+            EmbeddingError: If a batch cannot be embedded after all retries
+        """
+        input_type = self._resolve_input_type(input_type)
+        # The SQLite cache is read and written in a worker thread, so disk I/O doesn't block other requests on the loop
+        hashes, cached, missing = await asyncio.to_thread(self._lookup_cache, texts, input_type)
+
+        if missing:
+            miss_embeddings = await self.scheduler.arun(
+                _split_batches(list(missing.values()), DEFAULT_BATCH_SIZE),
+                lambda batch: self._aembed_batch(batch, input_type)
+            )
+            await asyncio.to_thread(self._store_cache, input_type, cached, list(missing.keys()), miss_embeddings)
+
+        return [cached[hash_] for hash_ in hashes]
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Get embedding cache hit/miss counts for this model."""
+        return {"hits": self.cache_hits, "misses": self.cache_misses}
+
+    def _embed_batch(self, texts: List[str], input_type: Optional[str]) -> List[List[float]]:
         if self.provider == "openai":
-            return openai_embed_in_batches(self.client, texts, self.model_name, batch_size)
+            return openai_embed(self.client, texts, self.model_name)
 
         elif self.provider == "jina":
-            input_type = input_type or "document"
-            return jina_embed_in_batches(self.api_key, input_type, texts, batch_size)
+            return jina_embed(self.api_key, input_type, texts, self.model_name, self.compress_requests, self.scheduler.max_concurrency)
 
         elif self.provider == "voyage":
-            input_type = input_type or "document"
-            return voyage_embed_in_batches(self.client, input_type, texts, batch_size)
+            return voyage_embed(self.client, input_type, texts, self.model_name)
+
+        elif self.provider == "fake":
+            return fake_embed(texts, **self.kwargs)
 
         raise ValueError(f"Unsupported provider: {self.provider}")
 
+    async def _aembed_batch(self, texts: List[str], input_type: Optional[str]) -> List[List[float]]:
+        if self.provider == "openai":
+            return await aopenai_embed(self.async_clients.get(), texts, self.model_name)
+
+        elif self.provider == "jina":
+            return await ajina_embed(self.api_key, input_type, texts, self.model_name, self.compress_requests, self.scheduler.max_concurrency)
+
+        elif self.provider == "voyage":
+            return await avoyage_embed(self.async_clients.get(), input_type, texts, self.model_name)
+
+        elif self.provider == "fake":
+            return await afake_embed(texts, **self.kwargs)
+
+        raise ValueError(f"Unsupported provider: {self.provider}")
+
+    def _resolve_input_type(self, input_type: Optional[str]) -> Optional[str]:
+        if self.provider in ("jina", "voyage"):
+            return input_type or "document"
+        return input_type
+
+    def _embed_with_cache(
+        self,
+        texts: List[str],
+        input_type: Optional[str],
+        embed_misses: Callable[[List[str]], List[List[float]]]
+    ) -> List[List[float]]:
+        hashes, cached, missing = self._lookup_cache(texts, input_type)
+
+        if missing:
+            miss_embeddings = embed_misses(list(missing.values()))
+            self._store_cache(input_type, cached, list(missing.keys()), miss_embeddings)
+
+        return [cached[hash_] for hash_ in hashes]
+
+    def _lookup_cache(
+        self,
+        texts: List[str],
+        input_type: Optional[str]
+    ) -> Tuple[List[str], Dict[str, List[float]], Dict[str, str]]:
+        """Split texts into cached vectors and misses, keyed by text hash."""
+        hashes = [text_hash(text) for text in texts]
+        if self.cache is None:
+            return hashes, {}, dict(zip(hashes, texts))
+
+        # OpenAI models ignore the input type, so all their vectors share one key
+        cached = self.cache.get_many(self.provider, self.model_name, input_type or "default", hashes)
+
+        # Deduplicate misses so repeated texts are only embedded once
+        missing = {hash_: text for hash_, text in zip(hashes, texts) if hash_ not in cached}
+        with self._stats_lock:
+            self.cache_hits += sum(1 for hash_ in hashes if hash_ in cached)
+            self.cache_misses += len(missing)
+
+        return hashes, cached, missing
+
+    def _store_cache(
+        self,
+        input_type: Optional[str],
+        cached: Dict[str, List[float]],
+        miss_hashes: List[str],
+        miss_embeddings: List[List[float]]
+    ) -> None:
+        if self.cache is not None:
+            self.cache.put_many(self.provider, self.model_name, input_type or "default", list(zip(miss_hashes, miss_embeddings)))
+        for hash_, embedding in zip(miss_hashes, miss_embeddings):
+            cached[hash_] = embedding
+
     @classmethod
     def supported_providers(cls) -> List[str]:
         """Get list of supported providers."""
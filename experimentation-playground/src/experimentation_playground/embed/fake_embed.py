@@ -0,0 +1,36 @@
+from typing import Any, Optional
+from .dense_embed import DenseEmbed
+from ..fake_providers import get_fake_behavior
+
+FAKE_EMBED_PROVIDER = "fake"
+FAKE_EMBED_MODEL = "fake-embedding"
+
+
+class FakeEmbed(DenseEmbed):
+    """Dense retrieval over a Chroma collection with deterministic local embeddings.
+
+    Requests go through the shared "embed" fake behavior, so their latency,
+    errors and rate limits are set with configure_fake_providers(). The
+    embedding cache is bypassed, so every run embeds its texts again, as
+    against an uncached provider.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        collection_name: str,
+        provider: Optional[str] = None,
+        model_name: Optional[str] = None,
+        vector_store_root: Optional[str] = None,
+        dimensions: int = 256
+    ):
+        super().__init__(
+            client,
+            collection_name,
+            provider or FAKE_EMBED_PROVIDER,
+            model_name or FAKE_EMBED_MODEL,
+            vector_store_root=vector_store_root,
+            use_cache=False,
+            dimensions=dimensions,
+            behavior=get_fake_behavior("embed")
+        )
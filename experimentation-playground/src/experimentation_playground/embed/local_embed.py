@@ -0,0 +1,220 @@
+from .base_embed import BaseEmbed
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from typing import List, Any, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .config import (
+    INGEST_BLOCK_SIZE,
+    QUERY_EMBED_BLOCK_SIZE,
+    LOCAL_DOC_BLOCK_SIZE,
+    LOCAL_QUERY_BLOCK_SIZE,
+    LOCAL_ANN_THRESHOLD,
+    HNSW_M,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+)
+from .embedding_models import EmbeddingModel
+from .vector_store import get_vector_store
+
+HNSW_INDEX_FILE = "hnsw.bin"
+HNSW_META_FILE = "hnsw.json"
+SEARCH_MODES = ["auto", "exact", "hnsw"]
+
+
+def inverse_norms(matrix: np.ndarray, block_size: int = LOCAL_DOC_BLOCK_SIZE) -> np.ndarray:
+    """1 / L2 norm of every row (0 for zero rows), computed block by block over a memory-mapped matrix."""
+    norms = np.empty(matrix.shape[0], dtype=np.float32)
+    for start in range(0, matrix.shape[0], block_size):
+        norms[start:start + block_size] = np.linalg.norm(matrix[start:start + block_size], axis=1)
+    with np.errstate(divide="ignore"):
+        return np.where(norms > 0, 1.0 / norms, 0.0).astype(np.float32)
+
+
+def exact_top_k(
+    queries: np.ndarray,
+    matrix: np.ndarray,
+    inv_norms: np.ndarray,
+    k: int,
+    block_size: int = LOCAL_DOC_BLOCK_SIZE
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Brute-force cosine top-k of unit-norm `queries` against every row of `matrix`.
+
+    Rows are scored one block at a time with a single matrix multiply, and a
+    running top-k per query is kept with argpartition, so memory stays at
+    len(queries) x (block_size + k) scores regardless of corpus size.
+
+    Returns:
+        (rows, scores), both of shape (len(queries), k), best match first
+    """
+    k = min(k, matrix.shape[0])
+    best_rows = np.empty((len(queries), 0), dtype=np.int64)
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+
+    for start in range(0, matrix.shape[0], block_size):
+        block = np.asarray(matrix[start:start + block_size])
+        scores = (queries @ block.T) * inv_norms[start:start + len(block)]
+        rows = np.broadcast_to(np.arange(start, start + len(block)), scores.shape)
+
+        candidate_scores = np.concatenate([best_scores, scores], axis=1)
+        candidate_rows = np.concatenate([best_rows, rows], axis=1)
+        if candidate_scores.shape[1] > k:
+            top = np.argpartition(-candidate_scores, k - 1, axis=1)[:, :k]
+            candidate_scores = np.take_along_axis(candidate_scores, top, axis=1)
+            candidate_rows = np.take_along_axis(candidate_rows, top, axis=1)
+        best_scores, best_rows = candidate_scores, candidate_rows
+
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+def store_fingerprint(ids: List[str], hashes: List[str]) -> str:
+    """Identifies the exact rows of a store, used to tell whether a persisted index is still valid."""
+    digest = hashlib.sha256()
+    for doc_id, hash_ in zip(ids, hashes):
+        digest.update(f"{doc_id}\0{hash_}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class LocalEmbed(BaseEmbed):
+    """Dense retrieval over the vector store on local disk, without a Chroma round-trip.
+
+    Chunks are embedded (or reused from the vector store and embedding cache)
+    exactly like DenseEmbed, but searches run in-process: an exact, blocked
+    cosine top-k for small corpora, and an HNSW index (requires hnswlib) from
+    LOCAL_ANN_THRESHOLD chunks. `client` is unused, and a `collection_name`
+    shared with a dense embedder reuses its stored vectors.
+
+    Args:
+        client: Ignored, accepted for EMBED_REGISTRY compatibility
+        collection_name: Name of the vector store
+        provider: Embedding provider
+        model_name: Embedding model
+        search: "exact", "hnsw", or "auto" to pick by corpus size (default: "auto")
+    """
+
+    def __init__(self, client: Any, collection_name: str, provider: str, model_name: str, search: str = "auto"):
+        super().__init__(client, collection_name)
+        if search not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {search}. Available: {SEARCH_MODES}")
+
+        self.provider = provider
+        self.model_name = model_name
+        self.search = search
+        self.model = EmbeddingModel(provider, model_name)
+        self.vector_store = get_vector_store(collection_name, provider, model_name)
+        # Rows of the store as of `_generation`, and the norms and index derived from them. The store is
+        # shared with every embedder of the same collection and model, so its writes may come from elsewhere
+        self._generation: Optional[int] = None
+        self._matrix: Optional[np.ndarray] = None
+        self._ids: List[str] = []
+        self._hashes: List[str] = []
+        self._inv_norms: Optional[np.ndarray] = None
+        self._hnsw: Optional[Any] = None
+        self._lock = threading.Lock()
+        print(f"Local collection {collection_name}: {len(self.vector_store)} stored vectors")
+
+    def add_to_collection(self, id_to_chunk: Mapping[str, str], sync: bool = False) -> None:
+        store = self.vector_store
+        if not sync and len(store):
+            return
+
+        ids = list(id_to_chunk)
+        for start in range(0, len(ids), INGEST_BLOCK_SIZE):
+            block_ids = ids[start:start + INGEST_BLOCK_SIZE]
+            store.get_or_embed(block_ids, [id_to_chunk[doc_id] for doc_id in block_ids], self.model.embed_in_batches)
+        if sync:
+            store.delete([doc_id for doc_id in store.ids if doc_id not in id_to_chunk])
+        store.flush()
+
+    def _use_hnsw(self) -> bool:
+        if self.search != "auto":
+            return self.search == "hnsw"
+        if len(self.vector_store) < LOCAL_ANN_THRESHOLD:
+            return False
+        try:
+            import hnswlib  # noqa: F401
+        except ImportError:
+            print(f"hnswlib is not installed, searching {len(self.vector_store)} vectors exactly")
+            return False
+        return True
+
+    def _load_hnsw(self) -> Any:
+        try:
+            import hnswlib
+        except ImportError as e:
+            raise ImportError("HNSW search requires hnswlib: pip install hnswlib") from e
+
+        store = self.vector_store
+        index_path = os.path.join(store.path, HNSW_INDEX_FILE)
+        meta_path = os.path.join(store.path, HNSW_META_FILE)
+        fingerprint = store_fingerprint(self._ids, self._hashes)
+        matrix = self._matrix
+
+        index = hnswlib.Index(space="cosine", dim=matrix.shape[1])
+        if os.path.exists(index_path) and os.path.exists(meta_path):
+            with open(meta_path) as f:
+                if json.load(f).get("fingerprint") == fingerprint:
+                    index.load_index(index_path, max_elements=len(matrix))
+                    return index
+
+        print(f"Building HNSW index over {len(matrix)} vectors")
+        index.init_index(max_elements=len(matrix), ef_construction=HNSW_EF_CONSTRUCTION, M=HNSW_M)
+        for start in range(0, len(matrix), INGEST_BLOCK_SIZE):
+            block = np.asarray(matrix[start:start + INGEST_BLOCK_SIZE])
+            index.add_items(block, np.arange(start, start + len(block)))
+        index.save_index(index_path)
+        with open(meta_path, "w") as f:
+            json.dump({"fingerprint": fingerprint}, f)
+        return index
+
+    def search_vectors(self, query_vectors: np.ndarray, n_results: int = 10) -> List[List[str]]:
+        """Top `n_results` chunk ids for each query vector, best match first."""
+        store = self.vector_store
+        use_hnsw = self._use_hnsw()
+        with self._lock:
+            if self._generation != store.generation:
+                self._generation, self._matrix, self._ids, self._hashes = store.snapshot()
+                self._inv_norms = None
+                self._hnsw = None
+            if self._ids and use_hnsw and self._hnsw is None:
+                self._hnsw = self._load_hnsw()
+            if self._ids and not use_hnsw and self._inv_norms is None:
+                self._inv_norms = inverse_norms(self._matrix)
+            matrix, ids, hnsw, inv_norms = self._matrix, self._ids, self._hnsw, self._inv_norms
+
+        if not ids:
+            return [[] for _ in range(len(query_vectors))]
+
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms > 0, norms, 1.0)
+        k = min(n_results, len(ids))
+        if use_hnsw:
+            hnsw.set_ef(max(HNSW_EF_SEARCH, k))
+            rows, _ = hnsw.knn_query(queries, k=k)
+        else:
+            rows = np.concatenate([
+                exact_top_k(queries[start:start + LOCAL_QUERY_BLOCK_SIZE], matrix, inv_norms, k)[0]
+                for start in range(0, len(queries), LOCAL_QUERY_BLOCK_SIZE)
+            ])
+
+        return [[ids[row] for row in query_rows] for query_rows in rows.tolist()]
+
+    def query_collection(self, id_to_query: Mapping[str, str], n_results: int = 10, show_progress: bool = True) -> Dict[str, List[str]]:
+        query_ids = list(id_to_query)
+        results: Dict[str, List[str]] = {}
+        for start in range(0, len(query_ids), QUERY_EMBED_BLOCK_SIZE):
+            block_ids = query_ids[start:start + QUERY_EMBED_BLOCK_SIZE]
+            query_vectors = self.model.embed([id_to_query[qid] for qid in block_ids], input_type="query")
+            results.update(zip(block_ids, self.search_vectors(query_vectors, n_results)))
+        return results
+
+    async def aquery_collection(self, id_to_query: Mapping[str, str], n_results: int = 10) -> Dict[str, List[str]]:
+        query_vectors = await self.model.aembed(list(id_to_query.values()), input_type="query")
+        ranked = await asyncio.to_thread(self.search_vectors, query_vectors, n_results)
+        return dict(zip(id_to_query.keys(), ranked))
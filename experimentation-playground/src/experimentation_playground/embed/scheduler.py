@@ -0,0 +1,270 @@
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from typing import Any, Awaitable, Callable, List, Optional
+
+from tqdm import tqdm
+
+from .config import DEFAULT_MAX_CONCURRENCY, DEFAULT_MAX_RETRIES
+from ..telemetry import active_telemetry, note_retry, text_bytes
+
+
+class EmbeddingError(RuntimeError):
+    pass
+
+
+def estimate_tokens(texts: List[str]) -> int:
+    # Roughly four characters per token for English text
+    return sum(len(text) for text in texts) // 4 + 1
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    status = (
+        getattr(error, "status_code", None)
+        or getattr(error, "http_status", None)
+        or getattr(getattr(error, "response", None), "status_code", None)
+    )
+    return status == 429 or type(error).__name__ == "RateLimitError"
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at a per-minute rate.
+
+    Args:
+        rate_per_minute: Number of tokens added to the bucket per minute
+        capacity: Maximum number of tokens the bucket holds (default: rate_per_minute)
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> None:
+        """Block until `amount` tokens are available, then consume them."""
+        while (wait_time := self._try_acquire(amount)) > 0:
+            time.sleep(wait_time)
+
+    async def acquire_async(self, amount: float = 1.0) -> None:
+        """Wait without blocking the event loop until `amount` tokens are available, then consume them."""
+        while (wait_time := self._try_acquire(amount)) > 0:
+            await asyncio.sleep(wait_time)
+
+    def _try_acquire(self, amount: float) -> float:
+        # Requests larger than the bucket wait for a full bucket instead of forever
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+
+            return (amount - self._tokens) / self.rate
+
+
+class EmbeddingScheduler:
+    """Runs embedding batches concurrently within provider rate limits.
+
+    Keeps up to `max_concurrency` batches in flight, paces requests with
+    request/token buckets, and backs off for all workers when the provider
+    answers with a 429. Output ordering always matches input ordering.
+
+    Args:
+        max_concurrency: Maximum number of batches in flight (default: 8)
+        requests_per_minute: Optional request budget per minute
+        tokens_per_minute: Optional token budget per minute
+        max_retries: Attempts per batch before giving up (default: 5)
+        base_backoff: Initial backoff in seconds after a failure (default: 1.0)
+        max_backoff: Upper bound on the backoff in seconds (default: 60.0)
+        budget: Optional ProviderBudget shared with other schedulers and runs
+        provider: Provider name that batches are reported under in run telemetry
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        budget: Optional[Any] = None,
+        provider: Optional[str] = None
+    ):
+        self.max_concurrency = max_concurrency
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.budget = budget
+        self.provider = provider
+
+        self._lock = threading.Lock()
+        self._penalty = 0.0
+        self._paused_until = 0.0
+
+    def run(
+        self,
+        batches: List[List[str]],
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        desc: Optional[str] = "Processing batches"
+    ) -> List[List[float]]:
+        """Embed batches concurrently and return the flattened embeddings in input order.
+
+        Raises:
+            EmbeddingError: If any batch cannot be embedded after all retries
+        """
+        results: List[Optional[List[List[float]]]] = [None] * len(batches)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            # Workers run in a copy of the caller's context so batches are reported to the caller's run telemetry
+            futures = {
+                executor.submit(contextvars.copy_context().run, self.embed_batch, batch, embed_fn, idx): idx
+                for idx, batch in enumerate(batches)
+            }
+
+            try:
+                for future in tqdm(as_completed(futures), total=len(futures), desc=desc, disable=desc is None):
+                    results[futures[future]] = future.result()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        return [embedding for batch_embeddings in results for embedding in batch_embeddings]
+
+    def embed_batch(
+        self,
+        batch: List[str],
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        batch_idx: int = 0
+    ) -> List[List[float]]:
+        """Embed a single batch, pacing and retrying it according to the scheduler's budgets.
+
+        Raises:
+            EmbeddingError: If the batch cannot be embedded after all retries
+        """
+        with self._track(batch):
+            for attempt in range(self.max_retries):
+                self._wait_for_budget(batch)
+                try:
+                    with self.budget.slot(estimate_tokens(batch)) if self.budget else nullcontext():
+                        embeddings = embed_fn(batch)
+                    if len(embeddings) != len(batch) or not all(embeddings):
+                        raise EmbeddingError(f"Provider returned {len(embeddings)} embeddings for {len(batch)} texts")
+                    self._on_success()
+                    return embeddings
+                except Exception as e:
+                    if attempt == self.max_retries - 1:
+                        raise EmbeddingError(
+                            f"Failed to embed batch {batch_idx} ({len(batch)} texts) after {self.max_retries} attempts: {str(e)}"
+                        ) from e
+
+                    note_retry()
+                    if is_rate_limit_error(e):
+                        self._on_rate_limit()
+                    else:
+                        wait_time = min(self.max_backoff, self.base_backoff * 2 ** attempt)
+                        print(f"Attempt {attempt + 1}/{self.max_retries} failed: {str(e)}. Retrying in {wait_time}s...")
+                        time.sleep(wait_time)
+
+    async def arun(
+        self,
+        batches: List[List[str]],
+        aembed_fn: Callable[[List[str]], Awaitable[List[List[float]]]]
+    ) -> List[List[float]]:
+        """Async counterpart of run(), keeping up to `max_concurrency` batches in flight on the event loop."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def embed_bounded(batch: List[str], batch_idx: int) -> List[List[float]]:
+            async with semaphore:
+                return await self.aembed_batch(batch, aembed_fn, batch_idx)
+
+        results = await asyncio.gather(*(embed_bounded(batch, idx) for idx, batch in enumerate(batches)))
+        return [embedding for batch_embeddings in results for embedding in batch_embeddings]
+
+    async def aembed_batch(
+        self,
+        batch: List[str],
+        aembed_fn: Callable[[List[str]], Awaitable[List[List[float]]]],
+        batch_idx: int = 0
+    ) -> List[List[float]]:
+        """Async counterpart of embed_batch()."""
+        with self._track(batch):
+            for attempt in range(self.max_retries):
+                await self._wait_for_budget_async(batch)
+                try:
+                    if self.budget:
+                        async with self.budget.aslot(estimate_tokens(batch)):
+                            embeddings = await aembed_fn(batch)
+                    else:
+                        embeddings = await aembed_fn(batch)
+                    if len(embeddings) != len(batch) or not all(embeddings):
+                        raise EmbeddingError(f"Provider returned {len(embeddings)} embeddings for {len(batch)} texts")
+                    self._on_success()
+                    return embeddings
+                except Exception as e:
+                    if attempt == self.max_retries - 1:
+                        raise EmbeddingError(
+                            f"Failed to embed batch {batch_idx} ({len(batch)} texts) after {self.max_retries} attempts: {str(e)}"
+                        ) from e
+
+                    note_retry()
+                    if is_rate_limit_error(e):
+                        self._on_rate_limit()
+                    else:
+                        wait_time = min(self.max_backoff, self.base_backoff * 2 ** attempt)
+                        print(f"Attempt {attempt + 1}/{self.max_retries} failed: {str(e)}. Retrying in {wait_time}s...")
+                        await asyncio.sleep(wait_time)
+
+    def _track(self, batch: List[str]) -> Any:
+        # One telemetry call per batch, covering its retries and backoff, when running inside an instrumented run
+        telemetry = active_telemetry()
+        if telemetry is None:
+            return nullcontext()
+        return telemetry.call("embed", self.provider, items=len(batch), bytes_sent=text_bytes(batch), tokens=estimate_tokens(batch))
+
+    def _pause_remaining(self) -> float:
+        with self._lock:
+            return self._paused_until - time.monotonic()
+
+    def _wait_for_budget(self, batch: List[str]) -> None:
+        while (wait_time := self._pause_remaining()) > 0:
+            time.sleep(wait_time)
+
+        if self.request_bucket:
+            self.request_bucket.acquire(1)
+        if self.token_bucket:
+            self.token_bucket.acquire(estimate_tokens(batch))
+
+    async def _wait_for_budget_async(self, batch: List[str]) -> None:
+        while (wait_time := self._pause_remaining()) > 0:
+            await asyncio.sleep(wait_time)
+
+        if self.request_bucket:
+            await self.request_bucket.acquire_async(1)
+        if self.token_bucket:
+            await self.token_bucket.acquire_async(estimate_tokens(batch))
+
+    def _on_rate_limit(self) -> None:
+        # Double the shared pause on every 429 so all in-flight workers slow down together
+        with self._lock:
+            self._penalty = min(self.max_backoff, max(self.base_backoff, self._penalty * 2))
+            self._paused_until = max(
+                self._paused_until,
+                time.monotonic() + self._penalty * (1 + random.random() * 0.1)
+            )
+
+    def _on_success(self) -> None:
+        with self._lock:
+            self._penalty /= 2
@@ -1,11 +1,14 @@
 from .base_embed import BaseEmbed
-from typing import List, Any, Dict
+from typing import List, Any, Dict, Mapping
 from .embedding_models import EmbeddingModel
 from .chroma import *
 from chromadb import Schema, SparseVectorIndexConfig, K, Knn, Search
 from chromadb.utils.embedding_functions import ChromaCloudSpladeEmbeddingFunction
 
-class SparseEmbed(BaseEmbed):    
+class SparseEmbed(BaseEmbed):
+    # Sparse vectors are computed server-side by Chroma's SPLADE embedding function
+    provider = "chroma"
+
     def __init__(self, client: Any, collection_name: str):
         super().__init__(client, collection_name)
         schema = Schema()
@@ -24,15 +27,18 @@ class SparseEmbed(BaseEmbed):
             self.collection = client.get_collection(collection_name)
             print(f"Collection {collection_name} already exists")
 
-    def add_to_collection(self, id_to_chunk: Dict[str, str]) -> None:
-        if self.collection.count() == 0:
-            add_to_chroma_collection(self.collection, list(id_to_chunk.keys()), list(id_to_chunk.values()))
+    def add_to_collection(self, id_to_chunk: Mapping[str, str], sync: bool = False) -> None:
+        if sync:
+            sync_chroma_collection(self.collection, id_to_chunk)
+        elif self.collection.count() == 0:
+            ingest_chroma_collection(self.collection, id_to_chunk)
     
-    def query_collection(self, id_to_query: Dict[str, str], n_results: int = 10) -> Dict[str, List[str]]:
+    def query_collection(self, id_to_query: Mapping[str, str], n_results: int = 10, show_progress: bool = True) -> Dict[str, List[str]]:
         return search_chroma_collection(
             self.collection,
             list(id_to_query.keys()),
             query_texts=list(id_to_query.values()),
             n_results=n_results,
-            embedding_key="sparse_embedding"
+            embedding_key="sparse_embedding",
+            show_progress=show_progress
         )
\ No newline at end of file
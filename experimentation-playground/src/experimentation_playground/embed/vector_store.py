@@ -0,0 +1,237 @@
+import contextlib
+import glob
+import json
+import os
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .config import DEFAULT_VECTOR_STORE_DIR
+from .embedding_cache import text_hash
+
+VECTORS_FILE = "vectors.f32"
+INDEX_FILE = "index.json"
+
+
+def vectors_file(compactions: int) -> str:
+    """Name of the matrix file after `compactions` deletes, vectors.f32 for a store never compacted."""
+    return VECTORS_FILE if not compactions else f"vectors.{compactions}.f32"
+
+
+class VectorStore:
+    """Float32 embedding matrix persisted as a memory-mapped file with an id index.
+
+    Row i of `vectors.f32` holds the embedding of `ids[i]`, stored row-major
+    as raw float32. `index.json` records the ids, the SHA-256 of each row's
+    text, the provider/model the vectors came from, and which matrix file is
+    current. Rows written after the last flush() are ignored (and truncated)
+    on the next open, so a crash never leaves ids pointing at missing vectors.
+    delete() writes the compacted matrix to a new file that only becomes
+    current when the index naming it replaces the old one, so a crash
+    mid-compaction leaves the previous file and index intact.
+
+    A 1M x 1536 store is ~6 GB on disk and is paged in by the OS as rows are
+    read, instead of living in memory as Python lists.
+
+    Args:
+        path: Directory holding the matrix file and index.json
+        provider: Embedding provider the vectors belong to
+        model_name: Embedding model the vectors belong to
+    """
+
+    def __init__(self, path: str, provider: str, model_name: str):
+        self.path = path
+        self.provider = provider
+        self.model_name = model_name
+        self.dim: Optional[int] = None
+        self.ids: List[str] = []
+        self.hashes: List[str] = []
+        self.compactions = 0
+        # Bumped on every put() and delete(), so caches derived from the rows can tell when they are stale
+        self.generation = 0
+        self._rows: Dict[str, int] = {}
+        self._matrix: Optional[np.memmap] = None
+        self._lock = threading.RLock()
+
+        os.makedirs(path, exist_ok=True)
+        self._index_path = os.path.join(path, INDEX_FILE)
+        self._load()
+
+    def _load(self) -> None:
+        if os.path.exists(self._index_path):
+            with open(self._index_path) as f:
+                index = json.load(f)
+            if (index["provider"], index["model_name"]) != (self.provider, self.model_name):
+                raise ValueError(
+                    f"Vector store {self.path} holds {index['provider']}:{index['model_name']} vectors, "
+                    f"not {self.provider}:{self.model_name}"
+                )
+            self.dim = index["dim"]
+            self.ids = index["ids"]
+            self.hashes = index["hashes"]
+            self.compactions = index.get("compactions", 0)
+
+        self._rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self._vectors_path = os.path.join(self.path, vectors_file(self.compactions))
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(len(self.ids) * (self.dim or 0) * 4)
+        # Matrices of earlier compactions, or of one interrupted before its index was written
+        for stale_path in glob.glob(os.path.join(self.path, "vectors*.f32")):
+            if stale_path != self._vectors_path:
+                os.remove(stale_path)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, doc_id: object) -> bool:
+        return doc_id in self._rows
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Read-only (len(self), dim) view over every stored vector."""
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[0] != len(self.ids):
+                if not self.ids:
+                    return np.empty((0, self.dim or 0), dtype=np.float32)
+                self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(len(self.ids), self.dim))
+            return self._matrix
+
+    def snapshot(self) -> Tuple[int, np.ndarray, List[str], List[str]]:
+        """(generation, matrix, ids, hashes) taken at one point in time, for structures derived from the rows."""
+        with self._lock:
+            return self.generation, self.matrix, list(self.ids), list(self.hashes)
+
+    def rows(self, ids: List[str]) -> np.ndarray:
+        """Row numbers of `ids` in the matrix. Raises KeyError for unknown ids."""
+        return np.fromiter((self._rows[doc_id] for doc_id in ids), dtype=np.int64, count=len(ids))
+
+    def get(self, ids: List[str]) -> np.ndarray:
+        """Copy the vectors of `ids` into a (len(ids), dim) float32 array."""
+        return np.asarray(self.matrix[self.rows(ids)])
+
+    def put(self, ids: List[str], vectors: np.ndarray, hashes: List[str]) -> None:
+        """Write vectors, overwriting the rows of known ids and appending new ones. Call flush() to persist the index."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if not len(ids):
+            return
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+
+            existing = [i for i, doc_id in enumerate(ids) if doc_id in self._rows]
+            if existing:
+                matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(len(self.ids), self.dim))
+                matrix[self.rows([ids[i] for i in existing])] = vectors[existing]
+                matrix.flush()
+                for i in existing:
+                    self.hashes[self._rows[ids[i]]] = hashes[i]
+
+            new = [i for i, doc_id in enumerate(ids) if doc_id not in self._rows]
+            if new:
+                with open(self._vectors_path, "ab") as f:
+                    f.write(vectors[new].tobytes())
+                for i in new:
+                    self._rows[ids[i]] = len(self.ids)
+                    self.ids.append(ids[i])
+                    self.hashes.append(hashes[i])
+            self.generation += 1
+
+    def delete(self, ids: List[str]) -> None:
+        """Drop the rows of `ids`, compacting the matrix into a new file and flushing the index that points to it."""
+        with self._lock:
+            deleted = {doc_id for doc_id in ids if doc_id in self._rows}
+            if not deleted:
+                return
+
+            keep = np.array([row for row, doc_id in enumerate(self.ids) if doc_id not in deleted], dtype=np.int64)
+            compacted_path = os.path.join(self.path, vectors_file(self.compactions + 1))
+            matrix = self.matrix
+            with open(compacted_path, "wb") as f:
+                for start in range(0, len(keep), 65536):
+                    f.write(np.asarray(matrix[keep[start:start + 65536]]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            old_path = self._vectors_path
+            self._matrix = None
+            self._vectors_path = compacted_path
+            self.compactions += 1
+            self.generation += 1
+            self.ids = [self.ids[row] for row in keep]
+            self.hashes = [self.hashes[row] for row in keep]
+            self._rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+            # Replacing the index is the commit point: until then, a reopen still reads the old file
+            self.flush()
+            # Views handed out earlier may still map the old file, e.g. on Windows; the next open removes it then
+            with contextlib.suppress(OSError):
+                os.remove(old_path)
+
+    def flush(self) -> None:
+        """Persist the id index, making every row written so far visible to the next open."""
+        with self._lock:
+            index = {
+                "provider": self.provider,
+                "model_name": self.model_name,
+                "dim": self.dim,
+                "ids": self.ids,
+                "hashes": self.hashes,
+                "compactions": self.compactions,
+            }
+            tmp_path = self._index_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, self._index_path)
+
+    def get_or_embed(self, ids: List[str], texts: List[str], embed_fn: Callable[[List[str]], List[List[float]]]) -> np.ndarray:
+        """Vectors for `ids`, reading rows whose stored text hash matches and embedding (and storing) the rest."""
+        hashes = [text_hash(text) for text in texts]
+        with self._lock:
+            current = [
+                i for i, (doc_id, hash_) in enumerate(zip(ids, hashes))
+                if doc_id in self._rows and self.hashes[self._rows[doc_id]] == hash_
+            ]
+            stale = sorted(set(range(len(ids))) - set(current))
+
+            vectors = np.empty((len(ids), self.dim or 0), dtype=np.float32)
+            if current:
+                vectors[current] = self.get([ids[i] for i in current])
+
+        if stale:
+            embedded = np.asarray(embed_fn([texts[i] for i in stale]), dtype=np.float32)
+            if not current:
+                vectors = embedded
+            else:
+                vectors[stale] = embedded
+            self.put([ids[i] for i in stale], embedded, [hashes[i] for i in stale])
+        return vectors
+
+
+_STORES: Dict[str, VectorStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def vector_store_path(collection_name: str, provider: str, model_name: str, root: Optional[str] = None) -> str:
+    """Directory of a collection's vectors for one model, `{root}/{collection}/{provider}__{model}`."""
+    root = root or os.getenv("VECTOR_STORE_PATH", DEFAULT_VECTOR_STORE_DIR)
+    # Model names may contain "/" (e.g. Hugging Face ids), which must not nest directories
+    model_dir = re.sub(r"[^\w.-]", "-", f"{provider}__{model_name}")
+    return os.path.join(root, collection_name, model_dir)
+
+
+def get_vector_store(collection_name: str, provider: str, model_name: str, root: Optional[str] = None) -> VectorStore:
+    """Get the process-wide vector store of a collection and model, stored under `root` (default: VECTOR_STORE_PATH or .cache/vectors).
+
+    Each provider/model gets its own directory, so embedders of different
+    models sharing a collection name never overwrite each other's vectors.
+    """
+    path = vector_store_path(collection_name, provider, model_name, root)
+    with _STORES_LOCK:
+        store = _STORES.get(path)
+        if store is None:
+            store = _STORES[path] = VectorStore(path, provider, model_name)
+        return store
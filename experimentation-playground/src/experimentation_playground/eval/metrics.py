@@ -0,0 +1,144 @@
+from itertools import chain, repeat
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .qrels import Qrels
+
+DEFAULT_K_VALUES = [1, 5, 10]
+
+
+def encode_results(
+    query_results: Mapping[str, List[str]],
+    query_ids: List[str],
+    doc_codes: Mapping[str, int],
+    depth: Optional[int] = None
+) -> np.ndarray:
+    """(queries x depth) matrix of integer doc codes, -1 for padding and docs without a code.
+
+    Doc ids are looked up once each, every metric afterwards works on the matrix.
+    """
+    results = [query_results[qid] for qid in query_ids]
+    lengths = np.fromiter(map(len, results), dtype=np.int64, count=len(results))
+    if depth is None:
+        depth = int(lengths.max()) if len(lengths) else 0
+    elif (lengths > depth).any():
+        results = [doc_ids[:depth] for doc_ids in results]
+        lengths = np.minimum(lengths, depth)
+
+    # map() over the flattened ids keeps the one lookup per doc out of the Python interpreter loop
+    codes = np.fromiter(
+        map(doc_codes.get, chain.from_iterable(results), repeat(-1)),
+        dtype=np.int64,
+        count=int(lengths.sum())
+    )
+    rows = np.repeat(np.arange(len(query_ids)), lengths)
+    cols = np.arange(len(codes)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+    matrix = np.full((len(query_ids), depth), -1, dtype=np.int64)
+    matrix[rows, cols] = codes
+    return matrix
+
+
+def mask_repeats(codes: np.ndarray) -> np.ndarray:
+    """Copy of a (queries x depth) code matrix with every repeat of a code within a row set to -1.
+
+    The first occurrence is kept, so a doc retrieved twice counts once, at its best rank.
+    """
+    if codes.shape[1] < 2:
+        return codes
+    # Equal codes are adjacent after a stable sort of each row, first occurrence first
+    order = np.argsort(codes, axis=1, kind="stable")
+    ordered = np.take_along_axis(codes, order, axis=1)
+    repeated = np.zeros(codes.shape, dtype=bool)
+    repeated[:, 1:] = (ordered[:, 1:] == ordered[:, :-1]) & (ordered[:, 1:] >= 0)
+    masked = codes.copy()
+    masked[np.nonzero(repeated)[0], order[repeated]] = -1
+    return masked
+
+
+def judge(
+    query_results: Mapping[str, List[str]],
+    qrels: Qrels,
+    query_ids: Optional[List[str]] = None
+) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Grade of every retrieved doc of every judged query, 0 for non-relevant docs.
+
+    Queries without judgments are left out. A doc repeated in a result list
+    is graded 0 after its first occurrence.
+
+    Returns:
+        The evaluated query ids, their qrels rows, and a (queries x depth) matrix of grades
+    """
+    query_ids = [qid for qid in (query_ids or query_results) if qid in qrels.query_index]
+    rows = np.fromiter(map(qrels.query_index.__getitem__, query_ids), dtype=np.int64, count=len(query_ids))
+    codes = mask_repeats(encode_results(query_results, query_ids, qrels.doc_codes))
+    return query_ids, rows, qrels.grade(rows[:, None], codes)
+
+
+def hit_ranks(gains: np.ndarray) -> np.ndarray:
+    """1-based rank of the first relevant doc of each query, 0 if none was retrieved."""
+    if not gains.shape[1]:
+        # Every result list was empty
+        return np.zeros(len(gains), dtype=np.int64)
+    relevant = gains > 0
+    return np.where(relevant.any(axis=1), relevant.argmax(axis=1) + 1, 0)
+
+
+def per_query_metrics(
+    gains: np.ndarray,
+    rows: np.ndarray,
+    qrels: Qrels,
+    k_values: List[int] = DEFAULT_K_VALUES
+) -> Dict[str, np.ndarray]:
+    """Recall@k, Precision@k, nDCG@k, reciprocal rank and average precision of every query.
+
+    Takes the grade matrix returned by judge(). nDCG uses the grade as gain.
+    With a single relevant doc per query these reduce to a hit flag, 1/k on a
+    hit, 1/log2(rank + 1) and reciprocal rank.
+    """
+    if not gains.shape[1]:
+        gains = np.zeros((len(rows), 1))
+
+    depth = gains.shape[1]
+    relevant = gains > 0
+    n_relevant = qrels.n_relevant[rows]
+    hits = np.cumsum(relevant, axis=1)
+    dcg = np.cumsum(gains / np.log2(np.arange(depth) + 2.0), axis=1)
+
+    values = {f"Recall@{k}": hits[:, min(k, depth) - 1] / n_relevant for k in k_values}
+    values.update({f"Precision@{k}": hits[:, min(k, depth) - 1] / k for k in k_values})
+    values.update({f"nDCG@{k}": dcg[:, min(k, depth) - 1] / qrels.ideal_dcg(k)[rows] for k in k_values})
+
+    ranks = hit_ranks(gains)
+    values["MRR"] = np.where(ranks > 0, 1.0 / np.maximum(ranks, 1), 0.0)
+    precision_at_hits = np.where(relevant, hits / np.arange(1, depth + 1), 0.0)
+    values["MAP"] = precision_at_hits.sum(axis=1) / n_relevant
+    return values
+
+
+def graded_metrics(
+    gains: np.ndarray,
+    rows: np.ndarray,
+    qrels: Qrels,
+    k_values: List[int] = DEFAULT_K_VALUES
+) -> Dict[str, float]:
+    """Mean of every per_query_metrics() value over the evaluated queries."""
+    if not len(rows):
+        return {}
+    return {name: float(values.mean()) for name, values in per_query_metrics(gains, rows, qrels, k_values).items()}
+
+
+def hit_rank_histogram(ranks: np.ndarray, depth: int) -> List[int]:
+    """Number of queries per hit rank: index 0 counts misses, index r counts hits at rank r."""
+    return np.bincount(ranks, minlength=depth + 1).tolist()
+
+
+def evaluate(
+    query_results: Mapping[str, List[str]],
+    qrels: Qrels,
+    k_values: List[int] = DEFAULT_K_VALUES
+) -> Dict[str, float]:
+    """All metrics of a run in one pass over its results."""
+    _, rows, gains = judge(query_results, qrels)
+    return graded_metrics(gains, rows, qrels, k_values)
@@ -0,0 +1,120 @@
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class Qrels:
+    """Graded relevance judgments (query -> {doc_id: grade}) held as flat sorted arrays.
+
+    Judgments are stored once as int64 keys `query_row * n_docs + doc_code`,
+    sorted, with their grades alongside, so looking up the grade of every
+    retrieved doc of every query is a single np.searchsorted. Judgments with a
+    grade of 0 or less are dropped, since they count as non-relevant anyway.
+    A (query, doc) pair judged more than once keeps its last grade.
+
+    Args:
+        query_ids: Query id of each judgment
+        doc_ids: Judged doc id of each judgment
+        grades: Relevance grade of each judgment
+    """
+
+    def __init__(self, query_ids: Sequence[str], doc_ids: Sequence[str], grades: Sequence[float]):
+        grades = np.asarray(grades, dtype=np.float64)
+        relevant = grades > 0
+        query_values, query_rows = np.unique(np.asarray(query_ids, dtype=str)[relevant], return_inverse=True)
+        doc_values, doc_codes = np.unique(np.asarray(doc_ids, dtype=str)[relevant], return_inverse=True)
+
+        self.query_ids: List[str] = query_values.tolist()
+        self.doc_ids: List[str] = doc_values.tolist()
+        self.query_index: Dict[str, int] = {qid: row for row, qid in enumerate(self.query_ids)}
+        self.doc_codes: Dict[str, int] = {doc_id: code for code, doc_id in enumerate(self.doc_ids)}
+
+        keys = query_rows.astype(np.int64) * len(self.doc_ids) + doc_codes
+        order = np.argsort(keys, kind="stable")
+        # A (query, doc) pair judged more than once keeps its last judgment
+        last = np.r_[keys[order][1:] != keys[order][:-1], True] if len(order) else np.zeros(0, dtype=bool)
+        order = order[last]
+        self.keys = keys[order]
+        self.grades = grades[relevant][order]
+        self.rows = query_rows[order]
+        self.n_relevant = np.bincount(self.rows, minlength=len(self.query_ids))
+        self._ideal_dcg: Dict[int, np.ndarray] = {}
+        self._ideal_gains: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @classmethod
+    def from_mapping(cls, qrels: Mapping[str, Mapping[str, float]]) -> "Qrels":
+        """Build from nested {query_id: {doc_id: grade}} judgments."""
+        query_ids, doc_ids, grades = [], [], []
+        for qid, judgments in qrels.items():
+            query_ids.extend([qid] * len(judgments))
+            doc_ids.extend(judgments.keys())
+            grades.extend(judgments.values())
+        return cls(query_ids, doc_ids, grades)
+
+    @classmethod
+    def from_labels(cls, query_to_chunk: Mapping[str, str]) -> "Qrels":
+        """Build from single-label query -> chunk pairs, each with grade 1."""
+        query_ids = [qid for qid in query_to_chunk if query_to_chunk[qid]]
+        return cls(query_ids, [query_to_chunk[qid] for qid in query_ids], np.ones(len(query_ids)))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def relevant(self, qid: str) -> Dict[str, float]:
+        """Judged relevant docs of one query and their grades."""
+        row = self.query_index.get(qid)
+        if row is None:
+            return {}
+        start, end = np.searchsorted(self.rows, [row, row + 1])
+        codes = self.keys[start:end] - row * len(self.doc_ids)
+        return {self.doc_ids[code]: grade for code, grade in zip(codes.tolist(), self.grades[start:end].tolist())}
+
+    def relevant_many(self, query_ids: Sequence[str]) -> Tuple[np.ndarray, List[str], np.ndarray]:
+        """Judged relevant docs of many queries at once, as CSR: the docs of query i are doc_ids[offsets[i]:offsets[i + 1]].
+
+        Returns:
+            (offsets, doc_ids, grades)
+        """
+        rows = np.fromiter((self.query_index.get(qid, -1) for qid in query_ids), dtype=np.int64, count=len(query_ids))
+        starts = np.searchsorted(self.rows, rows)
+        counts = np.where(rows >= 0, np.searchsorted(self.rows, rows + 1) - starts, 0)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        # Positions of every judgment of every query, in query order
+        positions = np.repeat(starts - offsets[:-1], counts) + np.arange(offsets[-1])
+        codes = self.keys[positions] - self.rows[positions] * len(self.doc_ids)
+        return offsets, [self.doc_ids[code] for code in codes.tolist()], self.grades[positions]
+
+    def top_docs(self) -> Dict[str, str]:
+        """Highest-graded doc of every query, for code that expects a single label."""
+        order = np.lexsort((-self.grades, self.rows))
+        first = order[np.r_[0, np.flatnonzero(np.diff(self.rows[order])) + 1]] if len(order) else order
+        return {
+            self.query_ids[row]: self.doc_ids[code]
+            for row, code in zip(self.rows[first].tolist(), (self.keys[first] % max(len(self.doc_ids), 1)).tolist())
+        }
+
+    def grade(self, rows: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Grades of (query row, doc code) pairs of any shape, 0 for unjudged pairs and codes of -1."""
+        keys = rows * len(self.doc_ids) + codes
+        if not len(self.keys):
+            return np.zeros(keys.shape)
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        found = (codes >= 0) & (self.keys[positions] == keys)
+        return np.where(found, self.grades[positions], 0.0)
+
+    def ideal_dcg(self, k: Optional[int] = None) -> np.ndarray:
+        """Best achievable DCG@k of every query row (all judgments when k is None)."""
+        key = k or 0
+        if key not in self._ideal_dcg:
+            if self._ideal_gains is None:
+                # Judgments sorted by grade within each query, discounted by their position in that order
+                order = np.lexsort((-self.grades, self.rows))
+                positions = np.arange(len(order)) - np.searchsorted(self.rows, self.rows[order])
+                self._ideal_gains = (self.grades[order] / np.log2(positions + 2.0), positions)
+
+            gains, positions = self._ideal_gains
+            if k is not None:
+                gains = np.where(positions < k, gains, 0.0)
+            # The grade ordering only permutes judgments within a query, so self.rows still labels them
+            self._ideal_dcg[key] = np.bincount(self.rows, weights=gains, minlength=len(self.query_ids))
+        return self._ideal_dcg[key]
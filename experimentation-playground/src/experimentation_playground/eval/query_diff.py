@@ -0,0 +1,199 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ..run_log import UNJUDGED, log_hit_ranks
+
+QUERY_DIFF_FILE = "query_diff.npz"
+DIFF_K_VALUES = [1, 5, 10]
+DIFF_KINDS = ["improved", "regressed", "both_fail"]
+
+# State of a query in one run, within a hit pattern
+NOT_JUDGED, MISS, HIT = -1, 0, 1
+
+# States of (run, other run) in the patterns of each kind of difference
+KIND_STATES = {"improved": (HIT, MISS), "regressed": (MISS, HIT), "both_fail": (MISS, MISS)}
+
+PatternIndex = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+class QueryDiff:
+    """Hit ranks of every query in every run of a sweep, indexed to compare runs query by query.
+
+    For each k, queries are grouped by their hit pattern over all runs:
+    whether each run hits the query at k, misses it, or did not judge it. The
+    runs of a sweep mostly agree, so there are far fewer distinct patterns
+    than queries. The queries one run improves or regresses against another,
+    or that both fail, are the groups of the matching patterns. Any pair of
+    runs is then looked up in O(patterns + result), without a pass over the
+    rank matrix.
+
+    Args:
+        run_ids: Runs, in column order
+        query_ids: Every query of any run, in row order
+        ranks: (queries x runs) hit ranks, 0 for a miss and UNJUDGED where a run did not judge the query or lacks it
+        positions: (queries x runs) position of each query in each run's log, -1 where the run lacks it
+        k_values: Cutoffs to index
+        index: Pattern index of each k as (patterns, order, offsets), built from `ranks` if not given
+    """
+
+    def __init__(
+        self,
+        run_ids: Sequence[str],
+        query_ids: Sequence[str],
+        ranks: np.ndarray,
+        positions: np.ndarray,
+        k_values: Sequence[int] = DIFF_K_VALUES,
+        index: Optional[Dict[int, PatternIndex]] = None
+    ):
+        self.run_ids: List[str] = list(run_ids)
+        self.query_ids: List[str] = list(query_ids)
+        self.ranks = ranks
+        self.positions = positions
+        self.k_values: List[int] = list(k_values)
+        self.index = index if index is not None else {k: self._build_index(k) for k in self.k_values}
+
+    @classmethod
+    def from_runs(cls, run_ids: Sequence[str], runs: Sequence[Tuple[List[str], np.ndarray]], k_values: Sequence[int] = DIFF_K_VALUES) -> "QueryDiff":
+        """Build from each run's (query ids, hit ranks), in log order."""
+        query_rows: Dict[str, int] = {}
+        run_rows = []
+        for query_ids, _ in runs:
+            run_rows.append(np.fromiter((query_rows.setdefault(qid, len(query_rows)) for qid in query_ids), dtype=np.int64, count=len(query_ids)))
+
+        ranks = np.full((len(query_rows), len(runs)), UNJUDGED, dtype=np.int32)
+        positions = np.full((len(query_rows), len(runs)), -1, dtype=np.int32)
+        for column, (rows, (_, run_ranks)) in enumerate(zip(run_rows, runs)):
+            ranks[rows, column] = run_ranks
+            positions[rows, column] = np.arange(len(rows))
+        return cls(run_ids, list(query_rows), ranks, positions, k_values)
+
+    def _build_index(self, k: int) -> PatternIndex:
+        """(patterns x runs) states, rows grouped by pattern, and the offsets of each pattern's group in them."""
+        states = np.where(self.ranks == UNJUDGED, NOT_JUDGED, (self.ranks > 0) & (self.ranks <= k)).astype(np.int8)
+        if not len(states):
+            return np.zeros((0, states.shape[1]), dtype=np.int8), np.zeros(0, dtype=np.int32), np.zeros(1, dtype=np.int64)
+        patterns, inverse = np.unique(states, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        order = np.argsort(inverse, kind="stable").astype(np.int32)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(inverse, minlength=len(patterns)))])
+        return patterns, order, offsets
+
+    def _column(self, run_id: str) -> int:
+        if run_id not in self.run_ids:
+            raise ValueError(f"Unknown run: {run_id}, expected one of {self.run_ids}")
+        return self.run_ids.index(run_id)
+
+    def _matching(self, run_id: str, other_id: str, kind: str, k: int) -> np.ndarray:
+        if kind not in KIND_STATES:
+            raise ValueError(f"Unknown difference: {kind}, expected one of {DIFF_KINDS}")
+        if k not in self.index:
+            raise ValueError(f"Cutoff {k} is not indexed, expected one of {self.k_values}")
+        patterns = self.index[k][0]
+        state, other_state = KIND_STATES[kind]
+        return np.flatnonzero((patterns[:, self._column(run_id)] == state) & (patterns[:, self._column(other_id)] == other_state))
+
+    def select(self, run_id: str, other_id: str, kind: str, k: int) -> np.ndarray:
+        """Rows of the queries `run_id` improves or regresses against `other_id` at k, or that both fail.
+
+        Only queries both runs judged are considered. Rows are in ascending order.
+        """
+        groups = self._matching(run_id, other_id, kind, k)
+        _, order, offsets = self.index[k]
+        if not len(groups):
+            return np.zeros(0, dtype=np.int32)
+        return np.sort(np.concatenate([order[offsets[group]:offsets[group + 1]] for group in groups.tolist()]))
+
+    def count(self, run_id: str, other_id: str, kind: str, k: int) -> int:
+        """Size of select(), from the group sizes alone."""
+        groups = self._matching(run_id, other_id, kind, k)
+        offsets = self.index[k][2]
+        return int((offsets[groups + 1] - offsets[groups]).sum())
+
+    def summary(self, baseline_id: str) -> Dict[str, Any]:
+        """Counts shown in the sweep report.
+
+        Returns:
+            `runs`: per run in column order, the number of queries it shares
+            with the baseline and how many it improves or regresses at each k,
+            None for the baseline itself. `agreement`: per k, how many queries
+            judged in every run are missed by all of them and hit by all of them.
+        """
+        runs: List[Optional[Dict[str, Any]]] = []
+        baseline = self._column(baseline_id)
+        judged = self.ranks != UNJUDGED
+        for column, run_id in enumerate(self.run_ids):
+            if column == baseline:
+                runs.append(None)
+                continue
+            runs.append({
+                "queries": int((judged[:, column] & judged[:, baseline]).sum()),
+                "by_k": {
+                    f"Recall@{k}": {kind: self.count(run_id, baseline_id, kind, k) for kind in ["improved", "regressed"]}
+                    for k in self.k_values
+                }
+            })
+
+        agreement: Dict[str, Any] = {"queries": int(judged.all(axis=1).sum())}
+        for k in self.k_values:
+            patterns, _, offsets = self.index[k]
+            sizes = offsets[1:] - offsets[:-1]
+            agreement[f"Recall@{k}"] = {
+                "missed_by_all": int(sizes[(patterns == MISS).all(axis=1)].sum()),
+                "hit_by_all": int(sizes[(patterns == HIT).all(axis=1)].sum())
+            }
+        return {"baseline": baseline_id, "runs": runs, "agreement": agreement}
+
+    def save(self, path: Union[str, Path]) -> None:
+        arrays = {
+            "run_ids": np.array(self.run_ids, dtype=str),
+            "query_ids": np.array(self.query_ids, dtype=str),
+            "ranks": self.ranks,
+            "positions": self.positions,
+            "k_values": np.array(self.k_values, dtype=np.int64),
+        }
+        for k, (patterns, order, offsets) in self.index.items():
+            arrays[f"patterns_{k}"], arrays[f"order_{k}"], arrays[f"offsets_{k}"] = patterns, order, offsets
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "QueryDiff":
+        with np.load(path) as data:
+            k_values = data["k_values"].tolist()
+            index = {k: (data[f"patterns_{k}"], data[f"order_{k}"], data[f"offsets_{k}"]) for k in k_values}
+            return cls(data["run_ids"].tolist(), data["query_ids"].tolist(), data["ranks"], data["positions"], k_values, index)
+
+
+def build_query_diff(sweep_dir: Union[str, Path]) -> QueryDiff:
+    """Index the hit ranks of every results file in a sweep directory, in file order, and save it there."""
+    sweep_dir = Path(sweep_dir)
+    run_ids, runs = [], []
+    for json_file in sorted(sweep_dir.glob("*.json")):
+        with open(json_file) as f:
+            data = json.load(f)
+        run_ids.append(data.get("results", {}).get("run_id", json_file.name))
+        runs.append(log_hit_ranks(str(json_file), data))
+
+    query_diff = QueryDiff.from_runs(run_ids, runs)
+    query_diff.save(sweep_dir / QUERY_DIFF_FILE)
+    return query_diff
+
+
+def load_query_diff(sweep_dir: Union[str, Path], run_ids: Optional[Sequence[str]] = None) -> QueryDiff:
+    """The saved index of a sweep directory.
+
+    It is rebuilt if any results file changed since it was saved, or if it
+    does not have exactly `run_ids` as its runs.
+    """
+    sweep_dir = Path(sweep_dir)
+    path = sweep_dir / QUERY_DIFF_FILE
+    if path.exists():
+        saved = os.path.getmtime(path)
+        if all(os.path.getmtime(json_file) <= saved for json_file in sweep_dir.glob("*.json")):
+            query_diff = QueryDiff.load(path)
+            if run_ids is None or query_diff.run_ids == list(run_ids):
+                return query_diff
+    return build_query_diff(sweep_dir)
@@ -0,0 +1,137 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+DEFAULT_RESAMPLES = 1000
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_SEED = 0
+
+# Resamples are drawn in blocks of at most this many (resample, query) cells to bound memory
+RESAMPLE_BLOCK_CELLS = 4_000_000
+
+
+def _blocks(n_resamples: int, n_queries: int) -> List[int]:
+    block = max(1, RESAMPLE_BLOCK_CELLS // max(n_queries, 1))
+    return [min(block, n_resamples - start) for start in range(0, n_resamples, block)]
+
+
+def bootstrap_ci(
+    values: np.ndarray,
+    n_resamples: int = DEFAULT_RESAMPLES,
+    confidence: float = DEFAULT_CONFIDENCE,
+    seed: int = DEFAULT_SEED
+) -> np.ndarray:
+    """Percentile bootstrap confidence interval of the mean of each row of `values`.
+
+    Every resample is a vector of how often each query was drawn, so the
+    resampled means of all metrics are one (resamples x queries) @ (queries x
+    metrics) matrix product per block.
+
+    Args:
+        values: (metrics x queries) per-query metric values
+        n_resamples: Number of bootstrap resamples (default: 1000)
+        confidence: Coverage of the interval (default: 0.95)
+        seed: Seed for the resampling RNG, so reports are reproducible
+
+    Returns:
+        (metrics x 2) array of lower and upper bounds
+    """
+    n_queries = values.shape[1]
+    if not n_queries:
+        return np.zeros((values.shape[0], 2))
+
+    rng = np.random.default_rng(seed)
+    means = []
+    for block in _blocks(n_resamples, n_queries):
+        draws = rng.integers(0, n_queries, size=(block, n_queries))
+        offsets = np.arange(block)[:, None] * n_queries
+        counts = np.bincount((draws + offsets).ravel(), minlength=block * n_queries).reshape(block, n_queries)
+        means.append(counts @ values.T / n_queries)
+
+    alpha = (1 - confidence) / 2
+    return np.quantile(np.concatenate(means), [alpha, 1 - alpha], axis=0).T
+
+
+def paired_permutation_test(
+    values: np.ndarray,
+    baseline: np.ndarray,
+    n_resamples: int = DEFAULT_RESAMPLES,
+    seed: int = DEFAULT_SEED
+) -> np.ndarray:
+    """Two-sided paired randomization test of the mean difference of each metric.
+
+    Under the null hypothesis the two runs are exchangeable on every query, so
+    each resample flips the sign of a random subset of per-query differences.
+    All metrics of a block of resamples are one sign-matrix product.
+
+    Args:
+        values: (metrics x queries) per-query values of the run
+        baseline: (metrics x queries) per-query values of the baseline, same query order
+        n_resamples: Number of random sign flips (default: 1000)
+        seed: Seed for the resampling RNG
+
+    Returns:
+        p-value of each metric
+    """
+    differences = values - baseline
+    n_queries = differences.shape[1]
+    if not n_queries:
+        return np.ones(differences.shape[0])
+
+    observed = np.abs(differences.mean(axis=1))
+    total = differences.sum(axis=1)
+    rng = np.random.default_rng(seed)
+    extreme = np.zeros(differences.shape[0], dtype=np.int64)
+    for block in _blocks(n_resamples, n_queries):
+        # One random bit per query from packed bytes; a sign of 2 * bit - 1 flips the difference when bit is 0
+        packed = rng.integers(0, 256, size=(block, (n_queries + 7) // 8), dtype=np.uint8)
+        bits = np.unpackbits(packed, axis=1, count=n_queries).astype(np.float64)
+        resampled = np.abs((2 * (bits @ differences.T) - total) / n_queries)
+        # Tolerance keeps ties from float rounding on the extreme side
+        extreme += (resampled >= observed - 1e-12).sum(axis=0)
+
+    return (extreme + 1) / (n_resamples + 1)
+
+
+def confidence_intervals(
+    per_query: Dict[str, np.ndarray],
+    n_resamples: int = DEFAULT_RESAMPLES,
+    confidence: float = DEFAULT_CONFIDENCE
+) -> Dict[str, List[float]]:
+    """Bootstrap interval of every metric, as {metric: [lower, upper]}."""
+    names = list(per_query)
+    if not names:
+        return {}
+    bounds = bootstrap_ci(np.stack([per_query[name] for name in names]), n_resamples, confidence)
+    return {name: [float(lower), float(upper)] for name, (lower, upper) in zip(names, bounds)}
+
+
+def compare_runs(
+    query_ids: List[str],
+    per_query: Dict[str, np.ndarray],
+    baseline_query_ids: List[str],
+    baseline_per_query: Dict[str, np.ndarray],
+    n_resamples: int = DEFAULT_RESAMPLES
+) -> Optional[Dict[str, Dict[str, float]]]:
+    """Mean difference and permutation p-value of every metric the two runs share, over their common queries.
+
+    Returns None if the runs have no queries in common.
+    """
+    index = {qid: i for i, qid in enumerate(query_ids)}
+    baseline_index = {qid: i for i, qid in enumerate(baseline_query_ids)}
+    common = [qid for qid in baseline_query_ids if qid in index]
+    names = [name for name in per_query if name in baseline_per_query]
+    if not common or not names:
+        return None
+
+    rows = np.fromiter(map(index.__getitem__, common), dtype=np.int64, count=len(common))
+    baseline_rows = np.fromiter(map(baseline_index.__getitem__, common), dtype=np.int64, count=len(common))
+    values = np.stack([per_query[name][rows] for name in names])
+    baseline = np.stack([baseline_per_query[name][baseline_rows] for name in names])
+
+    p_values = paired_permutation_test(values, baseline, n_resamples)
+    differences = (values - baseline).mean(axis=1)
+    return {
+        name: {"difference": float(difference), "p_value": float(p_value)}
+        for name, difference, p_value in zip(names, differences, p_values)
+    }
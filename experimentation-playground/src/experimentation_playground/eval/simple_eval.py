@@ -1,22 +1,12 @@
-from typing import Dict, List
+from typing import Dict, List, Mapping
+
+from .metrics import evaluate
+from .qrels import Qrels
 
 def get_recall(
     query_results: Dict[str, List[str]],
-    query_to_chunk: Dict[str, str],
+    query_to_chunk: Mapping[str, str],
     k_values: List[int] = [1, 5, 10]
 ) -> Dict[str, float]:
-    recall = {}
-
-    for k in k_values:
-        recall[f"Recall@{k}"] = 0
-    
-    for query_id, retrieved_ids in query_results.items():
-        matching_chunk_id = query_to_chunk[query_id]
-        for k in k_values:
-            if matching_chunk_id in retrieved_ids[:k]:
-                recall[f"Recall@{k}"] += 1
-
-    for k, v in recall.items():
-        recall[k] = v / len(query_results)
-
-    return recall
\ No newline at end of file
+    metrics = evaluate(query_results, Qrels.from_labels(query_to_chunk), k_values)
+    return {f"Recall@{k}": metrics[f"Recall@{k}"] for k in k_values}
@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+from .telemetry import note_retry
+
+FAKE_PROVIDER_KINDS = ["embed", "llm", "rerank"]
+FAKE_MAX_RETRIES = 5
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+
+def stable_seed(*parts: str) -> bytes:
+    """Seed derived from the content of a request, so fake outputs never depend on call order."""
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).digest()
+
+
+class FakeBehavior:
+    """Latency and failures injected into every request to one kind of fake provider.
+
+    Outputs of the fake providers are derived from the request content alone,
+    so runs are reproducible; only whether a request fails is random. Failures
+    are drawn from a seeded generator, and requests over `requests_per_minute`
+    within the last minute are rejected with a 429, like a provider's server
+    side limit would.
+
+    Args:
+        latency: Seconds each request takes
+        error_rate: Fraction of requests failing with a server error
+        rate_limit_rate: Fraction of requests failing with a 429
+        requests_per_minute: Optional limit on requests accepted per minute
+        retry_backoff: Seconds before the first retry of a failed request, doubled on each retry
+        seed: Seed of the failure draws, None for a fresh one
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        requests_per_minute: Optional[float] = None,
+        retry_backoff: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self._lock = threading.Lock()
+        self.configure(latency, error_rate, rate_limit_rate, requests_per_minute, retry_backoff, seed)
+
+    def configure(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        requests_per_minute: Optional[float] = None,
+        retry_backoff: float = 0.0,
+        seed: Optional[int] = None
+    ) -> None:
+        """Replace the settings in place, so providers holding this behavior pick them up."""
+        with self._lock:
+            self.latency = latency
+            self.error_rate = error_rate
+            self.rate_limit_rate = rate_limit_rate
+            self.requests_per_minute = requests_per_minute
+            self.retry_backoff = retry_backoff
+            self._rng = random.Random(seed)
+            self._accepted: Deque[float] = deque()
+
+    def settings(self) -> Dict[str, Any]:
+        return {
+            "latency": self.latency,
+            "error_rate": self.error_rate,
+            "rate_limit_rate": self.rate_limit_rate,
+            "requests_per_minute": self.requests_per_minute,
+            "retry_backoff": self.retry_backoff,
+        }
+
+    def check(self) -> None:
+        """Fail the current request as configured.
+
+        Raises:
+            FakeRateLimitError: If the request is over the rate limit or drew a 429
+            RuntimeError: If the request drew a server error
+        """
+        with self._lock:
+            if self.requests_per_minute:
+                now = time.monotonic()
+                while self._accepted and now - self._accepted[0] >= 60.0:
+                    self._accepted.popleft()
+                if len(self._accepted) >= self.requests_per_minute:
+                    raise FakeRateLimitError("Fake provider requests per minute exceeded")
+                self._accepted.append(now)
+            roll = self._rng.random()
+
+        if roll < self.rate_limit_rate:
+            raise FakeRateLimitError("Fake provider rate limit exceeded")
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise RuntimeError("Fake provider error")
+
+    def call(self, fn: Callable[[], Any], max_retries: int = FAKE_MAX_RETRIES) -> Any:
+        """Run one request through the injected latency and failures, retrying it like a provider SDK would."""
+        for attempt in range(max_retries):
+            if self.latency:
+                time.sleep(self.latency)
+            try:
+                self.check()
+                return fn()
+            except (FakeRateLimitError, RuntimeError):
+                if attempt == max_retries - 1:
+                    raise
+                note_retry()
+                if self.retry_backoff:
+                    time.sleep(self.retry_backoff * 2 ** attempt)
+
+    async def acall(self, fn: Callable[[], Any], max_retries: int = FAKE_MAX_RETRIES) -> Any:
+        """Async counterpart of call(), waiting on the event loop."""
+        for attempt in range(max_retries):
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            try:
+                self.check()
+                return fn()
+            except (FakeRateLimitError, RuntimeError):
+                if attempt == max_retries - 1:
+                    raise
+                note_retry()
+                if self.retry_backoff:
+                    await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+
+
+# One behavior per kind of provider, shared by every fake model and run in the process
+FAKE_BEHAVIORS: Dict[str, FakeBehavior] = {kind: FakeBehavior() for kind in FAKE_PROVIDER_KINDS}
+
+
+def get_fake_behavior(kind: str) -> FakeBehavior:
+    if kind not in FAKE_BEHAVIORS:
+        raise ValueError(f"Unknown fake provider kind: {kind}. Available: {FAKE_PROVIDER_KINDS}")
+    return FAKE_BEHAVIORS[kind]
+
+
+def configure_fake_providers(settings: Dict[str, Dict[str, Any]]) -> None:
+    """Set the behavior of fake providers, e.g. {"rerank": {"latency": 0.05, "rate_limit_rate": 0.01}}.
+
+    Kinds that are not given keep their settings. Settings that are not given
+    for a kind are reset to their defaults.
+    """
+    for kind, kind_settings in settings.items():
+        get_fake_behavior(kind).configure(**kind_settings)
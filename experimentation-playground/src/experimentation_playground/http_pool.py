@@ -0,0 +1,81 @@
+import gzip
+import json
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from .pipeline import LoopLocal
+
+# Connections kept per host, calls beyond this wait for a free connection
+DEFAULT_MAX_CONNECTIONS = 32
+DEFAULT_TIMEOUT = 60.0
+
+# Small bodies are sent as-is, gzip only pays off on large payloads
+GZIP_MIN_BYTES = 1024
+
+
+@lru_cache(maxsize=None)
+def get_session(max_connections: int = DEFAULT_MAX_CONNECTIONS) -> requests.Session:
+    """Process-wide keep-alive session, one per pool size.
+
+    Each host gets its own pool of up to `max_connections` sockets. The pool
+    blocks when exhausted rather than opening (and discarding) extra
+    connections. Gzip responses are decoded transparently.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=max_connections, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+@lru_cache(maxsize=None)
+def _async_clients(host: str, max_connections: int) -> LoopLocal[httpx.AsyncClient]:
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    return LoopLocal(lambda: httpx.AsyncClient(limits=limits, timeout=DEFAULT_TIMEOUT))
+
+
+def get_async_client(url: str, max_connections: int = DEFAULT_MAX_CONNECTIONS) -> httpx.AsyncClient:
+    """Keep-alive async client for the host of `url`, one per host and running event loop."""
+    return _async_clients(urlsplit(url).netloc, max_connections).get()
+
+
+def encode_json(payload: Dict[str, Any], headers: Dict[str, str], compress: bool = False) -> Tuple[bytes, Dict[str, str]]:
+    body = json.dumps(payload).encode("utf-8")
+    headers = {**headers, "Content-Type": "application/json"}
+    if compress and len(body) >= GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
+
+
+def post_json(
+    url: str,
+    payload: Dict[str, Any],
+    headers: Dict[str, str],
+    compress: bool = False,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS
+) -> requests.Response:
+    """POST a JSON payload over the shared session, raising on HTTP errors."""
+    body, headers = encode_json(payload, headers, compress)
+    response = get_session(max_connections).post(url, data=body, headers=headers, timeout=DEFAULT_TIMEOUT)
+    response.raise_for_status()
+    return response
+
+
+async def apost_json(
+    url: str,
+    payload: Dict[str, Any],
+    headers: Dict[str, str],
+    compress: bool = False,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS
+) -> httpx.Response:
+    """Async counterpart of post_json()."""
+    body, headers = encode_json(payload, headers, compress)
+    response = await get_async_client(url, max_connections).post(url, content=body, headers=headers)
+    response.raise_for_status()
+    return response
@@ -0,0 +1,72 @@
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+
+class RunJournal:
+    """Append-only JSONL record of each query's completed stage outputs.
+
+    The first line identifies the run configuration, every following line is
+    one {"qid", "stage", "value"} record flushed as soon as the stage finishes.
+    Reopening a journal with `resume=True` loads the completed records so the
+    run can skip them; a record cut off by a crash is ignored.
+
+    Args:
+        path: Path to the journal file
+        header: JSON-serializable description of the run, checked on resume
+        resume: Load an existing journal instead of starting a new one (default: False)
+    """
+
+    def __init__(self, path: str, header: Dict[str, Any], resume: bool = False):
+        self.path = path
+        self.completed: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if resume and os.path.exists(path):
+            needs_newline = self._load(header)
+            self._file = open(path, "a")
+            if needs_newline:
+                self._file.write("\n")
+        else:
+            self._file = open(path, "w")
+            self._file.write(json.dumps({"header": header}) + "\n")
+        self._file.flush()
+
+    def _load(self, header: Dict[str, Any]) -> bool:
+        with open(self.path) as f:
+            first = f.readline()
+            if first and json.loads(first).get("header") != json.loads(json.dumps(header)):
+                raise ValueError(f"Journal {self.path} was written for a different run configuration")
+
+            line = first
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self.completed.setdefault(record["qid"], {})[record["stage"]] = record["value"]
+
+        # Terminate a partially written last line so the next record starts cleanly
+        return bool(line) and not line.endswith("\n")
+
+    def get(self, qid: str, stage: str) -> Optional[Any]:
+        return self.completed.get(qid, {}).get(stage)
+
+    def record(self, qid: str, stage: str, value: Any) -> None:
+        line = json.dumps({"qid": qid, "stage": stage, "value": value}) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def remove(self) -> None:
+        self.close()
+        os.remove(self.path)
@@ -1,11 +1,15 @@
 import os
 from typing import List, Dict
 from dotenv import load_dotenv
-from anthropic import Anthropic
+from anthropic import Anthropic, AsyncAnthropic
 from .base_llm import BaseLLM
+from ..pipeline import LoopLocal
 
 load_dotenv()
 
+# The Messages API requires an explicit output limit
+DEFAULT_MAX_TOKENS = 1024
+
 
 class AnthropicLLM(BaseLLM):
     def __init__(
@@ -14,15 +18,30 @@ class AnthropicLLM(BaseLLM):
     ):
         super().__init__(provider="anthropic", model_name=model_name)
         self.client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        self.async_clients = LoopLocal(lambda: AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY")))
 
     def generate(
         self,
         messages: List[Dict[str, str]],
         **kwargs
     ) -> str:
-        response = self.client.responses.create(
+        kwargs.setdefault("max_tokens", DEFAULT_MAX_TOKENS)
+        response = self.client.messages.create(
+            model=self.model_name,
+            messages=messages,
+            **kwargs
+        )
+        return response.content[0].text
+
+    async def agenerate(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs
+    ) -> str:
+        kwargs.setdefault("max_tokens", DEFAULT_MAX_TOKENS)
+        response = await self.async_clients.get().messages.create(
             model=self.model_name,
             messages=messages,
             **kwargs
         )
-        return response.content[0].text
\ No newline at end of file
+        return response.content[0].text
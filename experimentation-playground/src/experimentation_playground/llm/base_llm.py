@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
 
@@ -17,4 +18,12 @@ class BaseLLM(ABC):
         Returns:
             Generated text response
         """
-        pass
\ No newline at end of file
+        pass
+
+    async def agenerate(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        """Async counterpart of generate().
+
+        Providers with an async client override this; the default runs
+        generate() in a worker thread.
+        """
+        return await asyncio.to_thread(self.generate, messages, **kwargs)
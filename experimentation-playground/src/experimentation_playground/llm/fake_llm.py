@@ -0,0 +1,41 @@
+import random
+from typing import List, Dict
+from .base_llm import BaseLLM
+from ..fake_providers import get_fake_behavior, stable_seed
+
+FAKE_LLM_WORDS = 8
+
+
+class FakeLLM(BaseLLM):
+    """Local LLM answering with words drawn deterministically from the last message.
+
+    Requests go through the shared "llm" fake behavior, so their latency,
+    errors and rate limits are set with configure_fake_providers().
+    """
+
+    def __init__(
+        self,
+        model_name: str = "fake-llm"
+    ):
+        super().__init__(provider="fake", model_name=model_name)
+        self.behavior = get_fake_behavior("llm")
+
+    def _answer(self, messages: List[Dict[str, str]]) -> str:
+        content = messages[-1]["content"] if messages else ""
+        words = content.split()
+        rng = random.Random(stable_seed(self.model_name, content))
+        return " ".join(rng.sample(words, min(FAKE_LLM_WORDS, len(words))))
+
+    def generate(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs
+    ) -> str:
+        return self.behavior.call(lambda: self._answer(messages))
+
+    async def agenerate(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs
+    ) -> str:
+        return await self.behavior.acall(lambda: self._answer(messages))
@@ -1,15 +1,20 @@
+from functools import lru_cache
 from typing import Dict, Type
 from .base_llm import BaseLLM
 from .openai_llm import OpenAILLM
 from .anthropic_llm import AnthropicLLM
+from .fake_llm import FakeLLM
 
 
 LLM_PROVIDER_MAP: Dict[str, Type[BaseLLM]] = {
     "openai": OpenAILLM,
     "anthropic": AnthropicLLM,
+    "fake": FakeLLM,
 }
 
 
+# Clients are reused across calls so their connection pools are too
+@lru_cache(maxsize=None)
 def get_llm(provider: str, model_name: str) -> BaseLLM:
     if provider not in LLM_PROVIDER_MAP:
         raise ValueError(f"Unknown provider: {provider}. Available: {list(LLM_PROVIDER_MAP.keys())}")
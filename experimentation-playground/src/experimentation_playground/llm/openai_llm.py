@@ -1,8 +1,9 @@
 import os
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from .base_llm import BaseLLM
+from ..pipeline import LoopLocal
 
 load_dotenv()
 
@@ -14,6 +15,7 @@ class OpenAILLM(BaseLLM):
     ):
         super().__init__(provider="openai", model_name=model_name)
         self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.async_clients = LoopLocal(lambda: AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY")))
 
     def generate(
         self,
@@ -25,4 +27,16 @@ class OpenAILLM(BaseLLM):
             input=messages,
             **kwargs
         )
-        return response.output[0].content[0].text
\ No newline at end of file
+        return response.output[0].content[0].text
+
+    async def agenerate(
+        self,
+        messages: List[Dict[str, str]],
+        **kwargs
+    ) -> str:
+        response = await self.async_clients.get().responses.create(
+            model=self.model_name,
+            input=messages,
+            **kwargs
+        )
+        return response.output[0].content[0].text
@@ -0,0 +1,250 @@
+import asyncio
+import queue
+import threading
+import weakref
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Any, Awaitable, Callable, Generic, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Sentinel passed down a queue once its producers have finished
+DONE = object()
+
+POLL_INTERVAL = 0.1
+
+
+def put_item(q: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Put an item on a bounded queue, giving up if the pipeline is stopped."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def get_item(q: queue.Queue, stop: threading.Event) -> Any:
+    """Get an item from a queue, returning DONE if the pipeline is stopped."""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            continue
+    return DONE
+
+
+class StreamStage:
+    """Pool of worker threads applying `fn` to items flowing between two queues.
+
+    Each worker takes up to `batch_size` items that are already waiting, so
+    stages that benefit from batching (e.g. search) still do so without
+    waiting for a full batch. When the last worker sees DONE it forwards DONE
+    downstream. The first exception stops the whole pipeline and is kept on
+    `error`.
+
+    Args:
+        name: Stage name used in thread names and error messages
+        fn: Function mapping a list of input items to an iterable of output items
+        in_queue: Queue the stage consumes from
+        out_queue: Queue the stage produces to
+        stop: Event shared by all stages of the pipeline
+        workers: Number of worker threads (default: 1)
+        batch_size: Maximum number of items passed to `fn` at once (default: 1)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[List[Any]], Iterable[Any]],
+        in_queue: queue.Queue,
+        out_queue: queue.Queue,
+        stop: threading.Event,
+        workers: int = 1,
+        batch_size: int = 1
+    ):
+        self.name = name
+        self.fn = fn
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.stop = stop
+        self.workers = workers
+        self.batch_size = batch_size
+        self.error: Optional[BaseException] = None
+
+        self._live_workers = workers
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _take_batch(self) -> List[Any]:
+        item = get_item(self.in_queue, self.stop)
+        if item is DONE:
+            return []
+
+        items = [item]
+        while len(items) < self.batch_size:
+            try:
+                item = self.in_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is DONE:
+                # Leave DONE for the next get so the batch is still processed
+                self.in_queue.put(DONE)
+                break
+            items.append(item)
+        return items
+
+    def _work(self) -> None:
+        try:
+            while not self.stop.is_set():
+                items = self._take_batch()
+                if not items:
+                    # Let sibling workers see DONE as well
+                    self.in_queue.put(DONE)
+                    break
+
+                for output in self.fn(items):
+                    if not put_item(self.out_queue, output, self.stop):
+                        return
+        except BaseException as e:
+            self.error = e
+            self.stop.set()
+        finally:
+            with self._lock:
+                self._live_workers -= 1
+                last_worker = self._live_workers == 0
+            if last_worker:
+                put_item(self.out_queue, DONE, self.stop)
+
+
+def map_bounded(
+    executor: Executor,
+    fn: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_in_flight: int
+) -> Iterator[Tuple[Any, Future]]:
+    """Submit `fn(item)` for each item, keeping at most `max_in_flight` calls pending.
+
+    A new call is submitted as soon as any pending one finishes, so a single
+    slow call never holds back the rest. Yields (item, future) pairs in
+    completion order; call `future.result()` to get the value or exception.
+    """
+    pending = {}
+    items = iter(items)
+    exhausted = False
+
+    try:
+        while True:
+            while not exhausted and len(pending) < max_in_flight:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(fn, item)] = item
+
+            if not pending:
+                return
+
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future
+    finally:
+        # Consumer stopped early (e.g. on an error), drop work that has not started
+        for future in pending:
+            future.cancel()
+
+
+class LoopLocal(Generic[T]):
+    """Lazily creates one value per running event loop.
+
+    Async HTTP clients hold connections bound to the loop they were created
+    on, so a client must not be shared across separate asyncio.run() calls.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self.factory = factory
+        self._values: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, T]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._values:
+                self._values[loop] = self.factory()
+            return self._values[loop]
+
+
+class AsyncBatcher:
+    """Coalesces concurrent single-item calls into batched calls.
+
+    Items submitted while a batch is filling are sent together once
+    `batch_size` items are waiting or `max_delay` seconds have passed. At most
+    `max_concurrency` batches run at once.
+
+    Args:
+        fn: Coroutine function mapping a list of items to a list of results
+        batch_size: Maximum number of items per call
+        max_concurrency: Maximum number of batched calls in flight
+        max_delay: Seconds to wait for a batch to fill (default: 0.01)
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], Awaitable[List[Any]]],
+        batch_size: int,
+        max_concurrency: int,
+        max_delay: float = 0.01
+    ):
+        self.fn = fn
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+    async def submit(self, item: Any) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.max_delay, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+        if self._pending:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.max_delay, self._flush)
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            # Keep a reference so the task is not garbage collected mid-flight
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        async with self._semaphore:
+            try:
+                results = await self.fn([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -1,10 +1,18 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional
 
 class BaseRerank(ABC):
+    # Name used to look up the shared provider budget, None for local rerankers
+    provider: Optional[str] = None
+
     def __init__(self, model_name: str):
         self.model_name = model_name
 
     @abstractmethod
     def rerank(self, query: str, documents: List[str], docids: List[str], **kwargs) -> List[str]:
         pass
+
+    async def arerank(self, query: str, documents: List[str], docids: List[str], **kwargs) -> List[str]:
+        # Providers with an async client override this; the default runs rerank() in a worker thread
+        return await asyncio.to_thread(self.rerank, query, documents, docids, **kwargs)
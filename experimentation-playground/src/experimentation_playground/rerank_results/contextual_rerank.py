@@ -1,26 +1,37 @@
 import requests
+import httpx
+import asyncio
 import os
 import time
 from dotenv import load_dotenv
-from typing import List
+from typing import List, Dict, Any
 from .base_rerank import BaseRerank
+from ..http_pool import DEFAULT_MAX_CONNECTIONS, post_json, apost_json
+from ..telemetry import note_retry
 
 load_dotenv()
 
+CONTEXTUAL_RERANK_URL = "https://api.app.contextual.ai/v1/rerank"
+
 class ContextualReranker(BaseRerank):
-    def __init__(self, model_name: str):
+    provider = "contextual"
+
+    def __init__(self, model_name: str, max_connections: int = DEFAULT_MAX_CONNECTIONS, compress_requests: bool = False):
         super().__init__(model_name)
         self.api_key = os.getenv("CONTEXTUAL_API_KEY")
+        self.max_connections = max_connections
+        self.compress_requests = compress_requests
 
-    def rerank(self, query: str, documents: List[str], docids: List[str], **kwargs) -> List[str]:
-        url = "https://api.app.contextual.ai/v1/rerank"
-
-        headers = {
-            "Content-Type": "application/json",
+    def _headers(self) -> Dict[str, str]:
+        return {
             "Authorization": f"Bearer {self.api_key}"
         }
 
-        payload = {
+    def _post_kwargs(self) -> Dict[str, Any]:
+        return {"compress": self.compress_requests, "max_connections": self.max_connections}
+
+    def _payload(self, query: str, documents: List[str], **kwargs) -> Dict[str, Any]:
+        return {
             "query": query,
             "documents": documents,
             "model": self.model_name,
@@ -29,30 +40,57 @@ class ContextualReranker(BaseRerank):
             "metadata": ["" for _ in range(len(documents))]
         }
 
+    def _parse_response(self, response_data: Dict[str, Any], docids: List[str]) -> List[str]:
+        reranked_results = response_data.get('results')
+        if not reranked_results:
+            raise ValueError(f"Reranker returned empty or no results. Response: {response_data}")
+
+        sorted_results = sorted(reranked_results, key=lambda x: x.get('relevance_score', 0), reverse=True)
+        return [docids[result['index']] for result in sorted_results]
+
+    def _final_error(self, e: Exception, max_retries: int) -> Exception:
+        if isinstance(e, (requests.exceptions.RequestException, httpx.HTTPError)):
+            return RuntimeError(f"API request failed after {max_retries} attempts: {str(e)}")
+        elif isinstance(e, (KeyError, IndexError)):
+            return ValueError(f"Failed to parse reranking response: {str(e)}")
+        return e
+
+    def rerank(self, query: str, documents: List[str], docids: List[str], **kwargs) -> List[str]:
+        payload = self._payload(query, documents, **kwargs)
+
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                response = requests.post(url, json=payload, headers=headers)
-                response.raise_for_status()
-                response_data = response.json()
-
-                reranked_results = response_data.get('results')
-                if not reranked_results:
-                    raise ValueError(f"Reranker returned empty or no results. Response: {response_data}")
+                response = post_json(CONTEXTUAL_RERANK_URL, payload, self._headers(), **self._post_kwargs())
+                return self._parse_response(response.json(), docids)
+            except Exception as e:
+                if attempt < max_retries - 1:
+                    note_retry()
+                    wait_time = 2 ** attempt
+                    print(f"Attempt {attempt + 1}/{max_retries} failed: {str(e)}. Retrying in {wait_time}s...")
+                    time.sleep(wait_time)
+                else:
+                    error = self._final_error(e, max_retries)
+                    if error is e:
+                        raise
+                    raise error from e
 
-                sorted_results = sorted(reranked_results, key=lambda x: x.get('relevance_score', 0), reverse=True)
-                reranked_docids = [docids[result['index']] for result in sorted_results]
+    async def arerank(self, query: str, documents: List[str], docids: List[str], **kwargs) -> List[str]:
+        payload = self._payload(query, documents, **kwargs)
 
-                return reranked_docids
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                response = await apost_json(CONTEXTUAL_RERANK_URL, payload, self._headers(), **self._post_kwargs())
+                return self._parse_response(response.json(), docids)
             except Exception as e:
                 if attempt < max_retries - 1:
+                    note_retry()
                     wait_time = 2 ** attempt
                     print(f"Attempt {attempt + 1}/{max_retries} failed: {str(e)}. Retrying in {wait_time}s...")
-                    time.sleep(wait_time)
+                    await asyncio.sleep(wait_time)
                 else:
-                    if isinstance(e, requests.exceptions.RequestException):
-                        raise RuntimeError(f"API request failed after {max_retries} attempts: {str(e)}") from e
-                    elif isinstance(e, (KeyError, IndexError)):
-                        raise ValueError(f"Failed to parse reranking response: {str(e)}") from e
-                    else:
+                    error = self._final_error(e, max_retries)
+                    if error is e:
                         raise
+                    raise error from e
@@ -0,0 +1,31 @@
+import hashlib
+from typing import List
+from .base_rerank import BaseRerank
+from ..fake_providers import get_fake_behavior
+
+
+class FakeReranker(BaseRerank):
+    """Local reranker ordering documents by a hash of the query and each document.
+
+    Requests go through the shared "rerank" fake behavior, so their latency,
+    errors and rate limits are set with configure_fake_providers().
+    """
+
+    provider = "fake"
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        self.behavior = get_fake_behavior("rerank")
+
+    def _order(self, query: str, documents: List[str], docids: List[str]) -> List[str]:
+        scores = [
+            hashlib.sha256(f"{self.model_name}\0{query}\0{document}".encode("utf-8")).digest()
+            for document in documents
+        ]
+        return [docids[idx] for idx in sorted(range(len(docids)), key=lambda idx: scores[idx], reverse=True)]
+
+    def rerank(self, query: str, documents: List[str], docids: List[str], **kwargs) -> List[str]:
+        return self.behavior.call(lambda: self._order(query, documents, docids))
+
+    async def arerank(self, query: str, documents: List[str], docids: List[str], **kwargs) -> List[str]:
+        return await self.behavior.acall(lambda: self._order(query, documents, docids))
@@ -1,9 +1,11 @@
 from .voyage_rerank import VoyageReranker
 from .contextual_rerank import ContextualReranker
+from .fake_rerank import FakeReranker
 
 RERANK_REGISTRY = {
     "voyage": VoyageReranker,
     "contextual": ContextualReranker,
+    "fake": FakeReranker,
 }
 
 def get_reranker(rerank_type: str, model_name: str):
@@ -1,16 +1,22 @@
 import voyageai
+import asyncio
 import time
 from typing import List
 import os
 from dotenv import load_dotenv
 from .base_rerank import BaseRerank
+from ..pipeline import LoopLocal
+from ..telemetry import note_retry
 
 load_dotenv()
 
 class VoyageReranker(BaseRerank):
+    provider = "voyage"
+
     def __init__(self, model_name: str):
         super().__init__(model_name)
         self.client = voyageai.Client(api_key=os.getenv("VOYAGE_API_KEY"))
+        self.async_clients = LoopLocal(lambda: voyageai.AsyncClient(api_key=os.getenv("VOYAGE_API_KEY")))
 
     def rerank(self, query: str, documents: List[str], docids: List[str], **kwargs) -> List[str]:
         max_retries = 3
@@ -27,8 +33,29 @@ class VoyageReranker(BaseRerank):
                 return reranked_docids
             except Exception as e:
                 if attempt < max_retries - 1:
+                    note_retry()
                     wait_time = 2 ** attempt
                     print(f"Attempt {attempt + 1}/{max_retries} failed: {str(e)}. Retrying in {wait_time}s...")
                     time.sleep(wait_time)
                 else:
-                    raise RuntimeError(f"Voyage reranking failed after {max_retries} attempts: {str(e)}") from e
\ No newline at end of file
+                    raise RuntimeError(f"Voyage reranking failed after {max_retries} attempts: {str(e)}") from e
+
+    async def arerank(self, query: str, documents: List[str], docids: List[str], **kwargs) -> List[str]:
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                reranking = await self.async_clients.get().rerank(query, documents, model=self.model_name, top_k=len(documents))
+
+                if not reranking.results:
+                    raise ValueError("Reranker returned empty results")
+
+                reranked_results = sorted(reranking.results, key=lambda x: x.relevance_score, reverse=True)
+                return [docids[result.index] for result in reranked_results]
+            except Exception as e:
+                if attempt < max_retries - 1:
+                    note_retry()
+                    wait_time = 2 ** attempt
+                    print(f"Attempt {attempt + 1}/{max_retries} failed: {str(e)}. Retrying in {wait_time}s...")
+                    await asyncio.sleep(wait_time)
+                else:
+                    raise RuntimeError(f"Voyage reranking failed after {max_retries} attempts: {str(e)}") from e
@@ -0,0 +1,151 @@
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_RESULT_CACHE_PATH = ".cache/results.sqlite"
+DEFAULT_RESULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Buffered access times written at once when this many hits are pending
+ACCESS_FLUSH_SIZE = 1000
+
+
+def result_key(key_parts: List[Any]) -> str:
+    return hashlib.sha256(json.dumps(key_parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Persistent cache for rewrite and rerank outputs.
+
+    Results are keyed on (stage, method, model_name, sha256(key_parts)), where
+    key_parts holds the stage inputs (e.g. the query, or the query plus the
+    candidate doc ids and texts), and stored as JSON in a SQLite database.
+    Once the stored values exceed `max_bytes`, the least recently used entries
+    are evicted. Access times of hits are buffered in memory and written in
+    one batch on the next put, every ACCESS_FLUSH_SIZE hits, and on close, so
+    a hit costs a single SELECT.
+
+    Args:
+        path: Path to the SQLite database file (default: .cache/results.sqlite)
+        max_bytes: Maximum total size of stored values (default: 512 MB)
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = DEFAULT_RESULT_CACHE_MAX_BYTES):
+        self.path = path or os.getenv("RESULT_CACHE_PATH", DEFAULT_RESULT_CACHE_PATH)
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._accessed: Dict[Tuple[str, str, str, str], float] = {}
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # A crash can lose the last commits, but never corrupts the database in WAL mode
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                stage TEXT NOT NULL,
+                method TEXT NOT NULL,
+                model_name TEXT NOT NULL,
+                key_hash TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (stage, method, model_name, key_hash)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def get(self, stage: str, method: str, model_name: str, key_parts: List[Any]) -> Optional[Any]:
+        """Look up a cached result, returning None on a miss."""
+        key = (stage, method, model_name, result_key(key_parts))
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM results WHERE stage = ? AND method = ? AND model_name = ? AND key_hash = ?",
+                key
+            ).fetchone()
+            if row is None:
+                return None
+
+            self._accessed[key] = time.time()
+            if len(self._accessed) >= ACCESS_FLUSH_SIZE:
+                self._write_accessed()
+                self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, stage: str, method: str, model_name: str, key_parts: List[Any], value: Any) -> None:
+        """Store a JSON-serializable result, evicting old entries if the cache is full."""
+        key = (stage, method, model_name, result_key(key_parts))
+        encoded = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            # Written first, so eviction orders entries by their latest hits
+            self._write_accessed()
+            row = self._conn.execute(
+                "SELECT size FROM results WHERE stage = ? AND method = ? AND model_name = ? AND key_hash = ?",
+                key
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results "
+                "(stage, method, model_name, key_hash, value, size, accessed) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*key, encoded, len(encoded), time.time())
+            )
+            self._total_bytes += len(encoded) - (row[0] if row else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _write_accessed(self) -> None:
+        if not self._accessed:
+            return
+        self._conn.executemany(
+            "UPDATE results SET accessed = ? WHERE stage = ? AND method = ? AND model_name = ? AND key_hash = ?",
+            [(accessed, *key) for key, accessed in self._accessed.items()]
+        )
+        self._accessed.clear()
+
+    def _evict(self) -> None:
+        # Free an extra 10% so eviction does not run on every insert once the cache is full
+        target = self._total_bytes - int(self.max_bytes * 0.9)
+        freed = 0
+        rowids = []
+        for rowid, size in self._conn.execute("SELECT rowid, size FROM results ORDER BY accessed"):
+            rowids.append((rowid,))
+            freed += size
+            if freed >= target:
+                break
+
+        self._conn.executemany("DELETE FROM results WHERE rowid = ?", rowids)
+        self._total_bytes -= freed
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                self._write_accessed()
+                self._conn.commit()
+            except sqlite3.ProgrammingError:
+                # Already closed
+                pass
+            self._conn.close()
+
+
+_CACHES: Dict[str, ResultCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_result_cache(path: Optional[str] = None) -> ResultCache:
+    """Get the process-wide result cache for a database path, creating it on first use."""
+    path = path or os.getenv("RESULT_CACHE_PATH", DEFAULT_RESULT_CACHE_PATH)
+    with _CACHES_LOCK:
+        if path not in _CACHES:
+            _CACHES[path] = ResultCache(path)
+            # Persist the access times of hits buffered since the last put
+            atexit.register(_CACHES[path].close)
+        return _CACHES[path]
@@ -1,9 +1,8 @@
+from typing import Dict, List
 from ..llm.llm_mapping import get_llm
 
-def expand_query(provider: str, model_name: str, query: str) -> str:
-    llm = get_llm(provider=provider, model_name=model_name)
-
-    messages = [
+def expand_query_messages(query: str) -> List[Dict[str, str]]:
+    return [
         {
             "role": "user",
             "content": f"""Your task is to expand the query to be more specific and increase recall. Keep the query concise, just add a few extra keywords.
@@ -13,4 +12,10 @@ def expand_query(provider: str, model_name: str, query: str) -> str:
         }
     ]
 
-    return llm.generate(messages)
\ No newline at end of file
+def expand_query(provider: str, model_name: str, query: str) -> str:
+    llm = get_llm(provider=provider, model_name=model_name)
+    return llm.generate(expand_query_messages(query))
+
+async def aexpand_query(provider: str, model_name: str, query: str) -> str:
+    llm = get_llm(provider=provider, model_name=model_name)
+    return await llm.agenerate(expand_query_messages(query))
\ No newline at end of file
@@ -1,10 +1,34 @@
-from .expand_query import expand_query
+import hashlib
+import json
+from typing import Callable
+from .expand_query import expand_query, aexpand_query, expand_query_messages
 
 REWRITE_REGISTRY = {
     "expand": expand_query,
 }
 
+ASYNC_REWRITE_REGISTRY = {
+    "expand": aexpand_query,
+}
+
+# Prompt of each rewrite type, so cached rewrites are keyed on the prompt that produced them
+REWRITE_PROMPTS = {
+    "expand": expand_query_messages,
+}
+
 def get_rewriter(rewrite_type: str):
     if rewrite_type not in REWRITE_REGISTRY:
         raise ValueError(f"Unknown rewrite type: {rewrite_type}")
     return REWRITE_REGISTRY[rewrite_type]
+
+def get_async_rewriter(rewrite_type: str):
+    """Get the async rewriter for a type, or None if it only has a sync implementation."""
+    return ASYNC_REWRITE_REGISTRY.get(rewrite_type)
+
+def rewrite_prompt_hash(rewriter: Callable) -> str:
+    """Hash of the prompt a rewriter sends, rendered with a placeholder query, or '' if it has no registered prompt."""
+    for rewrite_type, fn in REWRITE_REGISTRY.items():
+        if fn is rewriter and rewrite_type in REWRITE_PROMPTS:
+            prompt = json.dumps(REWRITE_PROMPTS[rewrite_type]("{query}"), sort_keys=True)
+            return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+    return ""
@@ -1,25 +1,62 @@
-from typing import Dict, List, Any, Optional, Callable
+from typing import Dict, List, Any, Optional, Callable, Iterable, Mapping, Tuple
+import asyncio
 import json
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import queue
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from tqdm import tqdm
 from .embed.base_embed import BaseEmbed
 from .rerank_results.base_rerank import BaseRerank
-from .eval.simple_eval import get_recall
+from .rewrite_query.rewrite_mapping import rewrite_prompt_hash
+from .eval.metrics import hit_ranks, hit_rank_histogram, judge, per_query_metrics
+from .eval.significance import confidence_intervals
+from .eval.qrels import Qrels
+from .budget import get_provider_budget
+from .result_cache import ResultCache, get_result_cache
+from .journal import RunJournal
+from .run_log import LOG_SHARD_SIZE, RunLog, RunLogWriter, open_run_log
+from .pipeline import DONE, StreamStage, AsyncBatcher, get_item, put_item, map_bounded
+from .telemetry import Telemetry, text_bytes
+from .embed.scheduler import estimate_tokens
+
+PIPELINES = ["staged", "streaming", "async"]
+DEFAULT_REWRITE_CONCURRENCY = 32
+DEFAULT_RERANK_CONCURRENCY = 5 # change based on rate limits
+
+# Per-stage outputs keyed by qid: queries to search with, retrieved ids, reranked ids (None without a reranker)
+StageOutputs = Tuple[Mapping[str, str], Dict[str, List[str]], Optional[Dict[str, List[str]]]]
 
 class Run:
     def __init__(
         self,
         run_id: str,
         embedder: BaseEmbed,
-        id_to_chunk: Dict[str, str],
-        id_to_query: Dict[str, str],
-        query_to_chunk: Dict[str, str],
+        id_to_chunk: Mapping[str, str],
+        id_to_query: Mapping[str, str],
+        query_to_chunk: Mapping[str, str],
         config: Dict[str, Any],
         rewriter: Optional[Callable] = None,
+        async_rewriter: Optional[Callable] = None,
         rewriter_args: Optional[Dict[str, Any]] = None,
         reranker: Optional[BaseRerank] = None,
+        pipeline: str = "staged",
+        queue_size: int = 100,
+        rewrite_concurrency: int = DEFAULT_REWRITE_CONCURRENCY,
+        rerank_concurrency: int = DEFAULT_RERANK_CONCURRENCY,
+        search_workers: int = 4,
+        search_batch_size: int = 50,
+        result_cache: Optional[ResultCache] = None,
+        use_result_cache: bool = True,
+        resume: bool = False,
+        sync_collection: bool = False,
+        qrels: Optional[Qrels] = None,
     ):
+        if pipeline not in PIPELINES:
+            raise ValueError(f"Unknown pipeline: {pipeline}. Available: {PIPELINES}")
+
         self.run_id = run_id
         self.embedder = embedder
         self.id_to_chunk = id_to_chunk
@@ -27,121 +64,528 @@ class Run:
         self.query_to_chunk = query_to_chunk
         self.config = config
         self.rewriter = rewriter
+        self.async_rewriter = async_rewriter
         self.rewriter_args = rewriter_args or {}
+        # Part of the cache key of rewrites, so editing a prompt invalidates the rewrites made with the old one
+        self.rewrite_prompt = rewrite_prompt_hash(rewriter) if rewriter else ""
         self.reranker = reranker
+        self.pipeline = pipeline
+        self.queue_size = queue_size
+        self.rewrite_concurrency = rewrite_concurrency
+        self.rerank_concurrency = rerank_concurrency
+        self.search_workers = search_workers
+        self.search_batch_size = search_batch_size
+        self.result_cache = (result_cache or get_result_cache()) if use_result_cache else None
+        self.resume = resume
+        self.sync_collection = sync_collection
+        # Graded judgments, when the dataset has them, otherwise query_to_chunk labels with grade 1
+        self.qrels = qrels
+        self._label_qrels: Optional[Qrels] = None
+        self.journal: Optional[RunJournal] = None
+        # Per-stage call timings, written into the results. In a planned sweep a shared stage is timed by the run that executes it.
+        self.telemetry = Telemetry()
+
+        # Provider budgets are shared with any other runs in the process
+        self.rewrite_budget = get_provider_budget(self.rewriter_args.get("provider"))
+        self.rerank_budget = get_provider_budget(reranker.provider if reranker else None)
 
     def run(self, n_results: int = 10, output_dir: str = "results") -> Dict[str, Any]:
-        self.embedder.add_to_collection(self.id_to_chunk)
+        if self.resume and self.is_complete(output_dir):
+            print(f"Run {self.run_id} already complete, skipping")
+            return self.load_results(output_dir)
 
-        debug_log = {}
-        for qid in self.id_to_query:
-            debug_log[qid] = {
-                "original_query": self.id_to_query[qid],
-                "rewritten_query": None,
-                "retrieved_results": [],
-                "reranked_results": [],
-                "expected_doc_id": self.query_to_chunk.get(qid),
-                "recall": {}
-            }
-
-        queries_to_execute = self.id_to_query.copy()
-        if self.rewriter:
-            queries_to_execute = {}
-            query_items = list(self.id_to_query.items())
-            batch_size = 100
-
-            with tqdm(total=len(query_items), desc="Rewriting queries") as pbar:
-                for i in range(0, len(query_items), batch_size):
-                    batch = query_items[i:i + batch_size]
-
-                    with ThreadPoolExecutor() as executor:
-                        futures = {
-                            executor.submit(self.rewriter, **self.rewriter_args, query=query): qid
-                            for qid, query in batch
-                        }
-
-                        for future in as_completed(futures):
-                            qid = futures[future]
-                            rewritten = future.result()
-                            queries_to_execute[qid] = rewritten
-                            debug_log[qid]["rewritten_query"] = rewritten
-                            pbar.update(1)
-
-        query_results = self.embedder.query_collection(queries_to_execute, n_results=n_results)
-
-        for qid, doc_ids in query_results.items():
-            debug_log[qid]["retrieved_results"] = [
-                {
-                    "doc_id": doc_id,
-                    "content": self.id_to_chunk[doc_id]
-                }
-                for doc_id in doc_ids
-            ]
+        self.ingest()
+        self.open_journal(output_dir, n_results)
 
-        if self.reranker:
-            reranked_results = {}
-            query_result_items = list(query_results.items())
-            batch_size = 5 # change based on rate limits
-
-            def rerank_query(qid, doc_ids):
-                original_query = self.id_to_query[qid]
-                documents = [self.id_to_chunk[doc_id] for doc_id in doc_ids]
-                reranked_docids = self.reranker.rerank(original_query, documents, doc_ids)
-                return qid, reranked_docids
-
-            with tqdm(total=len(query_result_items), desc="Reranking results") as pbar:
-                for i in range(0, len(query_result_items), batch_size):
-                    batch = query_result_items[i:i + batch_size]
-
-                    with ThreadPoolExecutor() as executor:
-                        futures = {
-                            executor.submit(rerank_query, qid, doc_ids): qid
-                            for qid, doc_ids in batch
-                        }
-
-                        for future in as_completed(futures):
-                            try:
-                                qid, reranked_docids = future.result()
-                                reranked_results[qid] = reranked_docids
-                                # Log reranked results
-                                debug_log[qid]["reranked_results"] = [
-                                    {
-                                        "doc_id": doc_id,
-                                        "content": self.id_to_chunk[doc_id]
-                                    }
-                                    for doc_id in reranked_docids
-                                ]
-                            except Exception as e:
-                                error_msg = f"Reranking failed for query {futures[future]}: {str(e)}"
-                                print(f"\nERROR: {error_msg}")
-                                debug_log[futures[future]]["rerank_error"] = str(e)
-                                raise
-                            finally:
-                                pbar.update(1)
-
-            query_results = reranked_results
-
-        eval_results = get_recall(query_results, self.query_to_chunk)
-
-        for qid, retrieved_ids in query_results.items():
-            expected_chunk_id = self.query_to_chunk.get(qid)
-            if expected_chunk_id:
-                for k in [1, 5, 10]:
-                    debug_log[qid]["recall"][f"Recall@{k}"] = expected_chunk_id in retrieved_ids[:k]
-
-        results = {
+        if self.pipeline == "streaming":
+            queries, retrieved, reranked = self._run_streaming(n_results)
+        elif self.pipeline == "async":
+            queries, retrieved, reranked = asyncio.run(self._run_async(n_results))
+        else:
+            queries = self.rewrite_queries()
+            retrieved = self.retrieve(queries, n_results)
+            reranked = self.rerank_all(retrieved) if self.reranker else None
+
+        return self.save_results(queries, retrieved, reranked, output_dir)
+
+    def ingest(self) -> None:
+        """Fill (or with sync_collection, sync) the embedder's collection with every chunk."""
+        with self.telemetry.call("index", self.embedder.provider, items=len(self.id_to_chunk)):
+            self.embedder.add_to_collection(self.id_to_chunk, sync=self.sync_collection)
+
+    def _output_path(self, output_dir: str) -> str:
+        return f"{output_dir}/{self.run_id}.json"
+
+    def _per_query_path(self, output_dir: str) -> str:
+        return f"{output_dir}/{self.run_id}.per_query.npz"
+
+    def _log_path(self, output_dir: str) -> str:
+        return f"{output_dir}/{self.run_id}.log"
+
+    def _journal_path(self, output_dir: str) -> str:
+        return f"{output_dir}/{self.run_id}.journal.jsonl"
+
+    def is_complete(self, output_dir: str) -> bool:
+        """Whether this run's results were written and no newer partial journal exists."""
+        return os.path.exists(self._output_path(output_dir)) and not os.path.exists(self._journal_path(output_dir))
+
+    def load_results(self, output_dir: str) -> Dict[str, Any]:
+        with open(self._output_path(output_dir)) as f:
+            return json.load(f)["results"]
+
+    def load_per_query(self, output_dir: str) -> Optional[Tuple[List[str], Dict[str, np.ndarray]]]:
+        """Query ids and per-query metric values saved with the results, None for runs saved without them."""
+        path = self._per_query_path(output_dir)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            names = data["metrics"].tolist()
+            return data["query_ids"].tolist(), dict(zip(names, data["values"]))
+
+    def load_log(self, output_dir: str) -> Optional[RunLog]:
+        """Per-query log saved with the results, None for results written with the log inline."""
+        return open_run_log(self._output_path(output_dir))
+
+    def _write_results_file(self, path: str, results: Dict[str, Any], log_manifest: Dict[str, Any]) -> None:
+        with open(path + ".tmp", "w") as f:
+            f.write('{\n    "results": ')
+            f.write(json.dumps(results, indent=4).replace("\n", "\n    "))
+            f.write(f',\n    "log_shards": {json.dumps(log_manifest)}\n}}\n')
+        os.replace(path + ".tmp", path)
+
+    def update_results(self, output_dir: str, updates: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge `updates` into the saved results."""
+        path = self._output_path(output_dir)
+        with open(path) as f:
+            header = []
+            for line in f:
+                if line == '    "log": {\n':
+                    break
+                header.append(line)
+            else:
+                # Sharded results: the file only holds the results and the log manifest
+                data = json.loads("".join(header))
+                data["results"].update(updates)
+                self._write_results_file(path, data["results"], data["log_shards"])
+                return data["results"]
+
+            # Results written with the log inline: the header is '{', then "results": {...} up to
+            # the comma before the log, which is copied across unparsed
+            results = json.loads("".join(header).rstrip().rstrip(",") + "\n}")["results"]
+            results.update(updates)
+
+            with open(path + ".tmp", "w") as out:
+                out.write('{\n    "results": ')
+                out.write(json.dumps(results, indent=4).replace("\n", "\n    "))
+                out.write(',\n    "log": {\n')
+                shutil.copyfileobj(f, out)
+
+        os.replace(path + ".tmp", path)
+        return results
+
+    def open_journal(self, output_dir: str, n_results: int = 10) -> None:
+        """Start recording stage outputs, picking up a previous journal if resuming."""
+        header = {"run_id": self.run_id, "config": self.config, "n_results": n_results}
+        self.journal = RunJournal(self._journal_path(output_dir), header, resume=self.resume)
+        if self.journal.completed:
+            print(f"Resuming {self.run_id}: {len(self.journal.completed)} queries have completed stages")
+
+    def _journaled(self, qid: str, stage: str) -> Optional[Any]:
+        return self.journal.get(qid, stage) if self.journal else None
+
+    def _record(self, qid: str, stage: str, value: Any) -> None:
+        if self.journal:
+            self.journal.record(qid, stage, value)
+
+    def _evaluation_qrels(self) -> Qrels:
+        if self.qrels is not None:
+            return self.qrels
+        if self._label_qrels is None:
+            self._label_qrels = Qrels.from_labels(self.query_to_chunk)
+        return self._label_qrels
+
+    def _results(self, per_query: Dict[str, np.ndarray], ranks: Any, depth: int) -> Dict[str, Any]:
+        return {
             "run_id": self.run_id,
             "config": self.config,
-            "metrics": eval_results,
+            "metrics": {name: float(values.mean()) for name, values in per_query.items()},
+            "confidence_intervals": confidence_intervals(per_query),
+            "hit_rank_histogram": hit_rank_histogram(ranks, depth),
         }
 
-        to_save = {
-            "results": results,
-            "log": debug_log,
-        }
-        
+    def _rewrite_key(self, query: str) -> Tuple[str, str, str, List[Any]]:
+        method = f"{self.rewriter.__name__}@{self.rewrite_prompt}" if self.rewrite_prompt else self.rewriter.__name__
+        return ("rewrite", method, json.dumps(self.rewriter_args, sort_keys=True), [query])
+
+    def _rerank_key(self, query: str, documents: List[str], doc_ids: List[str]) -> Tuple[str, str, str, List[Any]]:
+        return ("rerank", type(self.reranker).__name__, self.reranker.model_name, [query, doc_ids, documents])
+
+    def _cache_get(self, key: Tuple[str, str, str, List[Any]]) -> Optional[Any]:
+        return self.result_cache.get(*key) if self.result_cache else None
+
+    def _cache_put(self, key: Tuple[str, str, str, List[Any]], value: Any) -> None:
+        if self.result_cache:
+            self.result_cache.put(*key, value)
+
+    async def _acache_get(self, key: Tuple[str, str, str, List[Any]]) -> Optional[Any]:
+        # Cache hits also write their access time, so SQLite is only touched from a worker thread, off the event loop
+        return await asyncio.to_thread(self.result_cache.get, *key) if self.result_cache else None
+
+    async def _acache_put(self, key: Tuple[str, str, str, List[Any]], value: Any) -> None:
+        if self.result_cache:
+            await asyncio.to_thread(self.result_cache.put, *key, value)
+
+    def _rewrite_provider(self) -> Optional[str]:
+        return self.rewriter_args.get("provider")
+
+    def _track_call(self, stage: str, provider: Optional[str], texts: List[str], items: Optional[int] = None) -> Any:
+        """Time a provider call of `stage` that sends `texts`, reporting `items` (default: one per text)."""
+        return self.telemetry.call(
+            stage,
+            provider,
+            items=len(texts) if items is None else items,
+            bytes_sent=text_bytes(texts),
+            tokens=estimate_tokens(texts)
+        )
+
+    def _rewrite(self, query: str) -> str:
+        key = self._rewrite_key(query)
+        rewritten = self._cache_get(key)
+        if rewritten is None:
+            with self.rewrite_budget.slot(), self._track_call("rewrite", self._rewrite_provider(), [query]):
+                rewritten = self.rewriter(**self.rewriter_args, query=query)
+            self._cache_put(key, rewritten)
+        else:
+            self.telemetry.cache_hit("rewrite", self._rewrite_provider())
+        return rewritten
+
+    async def _arewrite(self, query: str) -> str:
+        key = self._rewrite_key(query)
+        rewritten = await self._acache_get(key)
+        if rewritten is None:
+            async with self.rewrite_budget.aslot():
+                with self._track_call("rewrite", self._rewrite_provider(), [query]):
+                    if self.async_rewriter:
+                        rewritten = await self.async_rewriter(**self.rewriter_args, query=query)
+                    else:
+                        rewritten = await asyncio.to_thread(self.rewriter, **self.rewriter_args, query=query)
+            await self._acache_put(key, rewritten)
+        else:
+            self.telemetry.cache_hit("rewrite", self._rewrite_provider())
+        return rewritten
+
+    def _rerank_query(self, qid: str, doc_ids: List[str]) -> List[str]:
+        original_query = self.id_to_query[qid]
+        documents = [self.id_to_chunk[doc_id] for doc_id in doc_ids]
+        key = self._rerank_key(original_query, documents, doc_ids)
+        reranked = self._cache_get(key)
+        if reranked is None:
+            with self.rerank_budget.slot(), self._track_call("rerank", self.reranker.provider, [original_query, *documents], len(doc_ids)):
+                reranked = self.reranker.rerank(original_query, documents, doc_ids)
+            self._cache_put(key, reranked)
+        else:
+            self.telemetry.cache_hit("rerank", self.reranker.provider)
+        return reranked
+
+    async def _arerank_query(self, qid: str, doc_ids: List[str]) -> List[str]:
+        original_query = self.id_to_query[qid]
+        documents = [self.id_to_chunk[doc_id] for doc_id in doc_ids]
+        key = self._rerank_key(original_query, documents, doc_ids)
+        reranked = await self._acache_get(key)
+        if reranked is None:
+            async with self.rerank_budget.aslot():
+                with self._track_call("rerank", self.reranker.provider, [original_query, *documents], len(doc_ids)):
+                    reranked = await self.reranker.arerank(original_query, documents, doc_ids)
+            await self._acache_put(key, reranked)
+        else:
+            self.telemetry.cache_hit("rerank", self.reranker.provider)
+        return reranked
+
+    def record_outputs(self, stage: str, outputs: Mapping[str, Any]) -> None:
+        """Journal a stage's outputs computed by another run, e.g. a stage shared in a planned sweep."""
+        if stage == "rewrite" and not self.rewriter:
+            return
+        for qid, value in outputs.items():
+            self._record(qid, stage, value)
+
+    def _rewrite_one(self, qid: str) -> str:
+        if not self.rewriter:
+            return self.id_to_query[qid]
+        rewritten = self._journaled(qid, "rewrite")
+        if rewritten is None:
+            rewritten = self._rewrite(self.id_to_query[qid])
+            self._record(qid, "rewrite", rewritten)
+        return rewritten
+
+    def _rerank_one(self, qid: str, doc_ids: List[str]) -> List[str]:
+        reranked = self._journaled(qid, "rerank")
+        if reranked is None:
+            reranked = self._rerank_query(qid, doc_ids)
+            self._record(qid, "rerank", reranked)
+        return reranked
+
+    def rewrite_queries(self) -> Mapping[str, str]:
+        """Rewrite every query, returning qid -> query to search with."""
+        if not self.rewriter:
+            return self.id_to_query
+
+        queries = {}
+        pending = []
+        for qid in self.id_to_query:
+            rewritten = self._journaled(qid, "rewrite")
+            if rewritten is None:
+                pending.append(qid)
+            else:
+                queries[qid] = rewritten
+
+        with ThreadPoolExecutor(max_workers=self.rewrite_concurrency) as executor, \
+                tqdm(total=len(self.id_to_query), initial=len(queries), desc="Rewriting queries") as pbar:
+            for qid, future in map_bounded(executor, lambda qid: self._rewrite(self.id_to_query[qid]), pending, self.rewrite_concurrency):
+                queries[qid] = future.result()
+                self._record(qid, "rewrite", queries[qid])
+                pbar.update(1)
+        return queries
+
+    def retrieve(self, queries: Mapping[str, str], n_results: int = 10, show_progress: bool = True) -> Dict[str, List[str]]:
+        retrieved = {}
+        pending = {}
+        for qid, query in queries.items():
+            doc_ids = self._journaled(qid, "retrieve")
+            if doc_ids is None:
+                pending[qid] = query
+            else:
+                retrieved[qid] = doc_ids
+
+        if pending:
+            with self._track_call("retrieve", self.embedder.provider, list(pending.values())):
+                batch_results = self.embedder.query_collection(pending, n_results=n_results, show_progress=show_progress)
+            for qid, doc_ids in batch_results.items():
+                retrieved[qid] = doc_ids
+                self._record(qid, "retrieve", doc_ids)
+        return retrieved
+
+    def rerank_all(self, retrieved: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Rerank the retrieved doc ids of every query."""
+        reranked = {}
+        pending = []
+        for qid in retrieved:
+            doc_ids = self._journaled(qid, "rerank")
+            if doc_ids is None:
+                pending.append(qid)
+            else:
+                reranked[qid] = doc_ids
+
+        with ThreadPoolExecutor(max_workers=self.rerank_concurrency) as executor, \
+                tqdm(total=len(retrieved), initial=len(reranked), desc="Reranking results") as pbar:
+            for qid, future in map_bounded(executor, lambda qid: self._rerank_query(qid, retrieved[qid]), pending, self.rerank_concurrency):
+                try:
+                    reranked[qid] = future.result()
+                except Exception as e:
+                    print(f"\nERROR: Reranking failed for query {qid}: {str(e)}")
+                    raise
+                finally:
+                    pbar.update(1)
+                self._record(qid, "rerank", reranked[qid])
+        return reranked
+
+    def save_results(
+        self,
+        queries: Mapping[str, str],
+        retrieved: Dict[str, List[str]],
+        reranked: Optional[Dict[str, List[str]]],
+        output_dir: str = "results"
+    ) -> Dict[str, Any]:
+        """Evaluate the completed stage outputs and write the run JSON, then drop the journal."""
+        query_results = reranked if reranked is not None else retrieved
+        with self.telemetry.call("evaluate", None, items=len(query_results)):
+            qrels = self._evaluation_qrels()
+            query_ids, rows, gains = judge(query_results, qrels, list(self.id_to_query))
+            ranks = hit_ranks(gains)
+            per_query = per_query_metrics(gains, rows, qrels) if query_ids else {}
+            results = self._results(per_query, ranks, gains.shape[1])
+        results["timing"] = self.telemetry.summary()
+        rank_by_qid = dict(zip(query_ids, ranks.tolist()))
+
         os.makedirs(output_dir, exist_ok=True)
-        with open(f"{output_dir}/{self.run_id}.json", "w") as f:
-            json.dump(to_save, f, indent=4)
+        # Kept next to the results for paired significance tests between runs
+        np.savez(
+            self._per_query_path(output_dir),
+            query_ids=np.array(query_ids, dtype=str),
+            metrics=np.array(list(per_query), dtype=str),
+            values=np.stack(list(per_query.values())) if per_query else np.empty((0, 0))
+        )
+
+        # The log is written shard by shard, with doc ids as integer codes and each chunk's text stored once
+        writer = RunLogWriter(self._log_path(output_dir), self.id_to_chunk)
+        qids = list(self.id_to_query)
+        for start in range(0, len(qids), LOG_SHARD_SIZE):
+            shard = qids[start:start + LOG_SHARD_SIZE]
+            writer.add_shard(
+                shard,
+                original=[self.id_to_query[qid] for qid in shard],
+                rewritten=[queries[qid] for qid in shard] if self.rewriter else None,
+                retrieved=[retrieved[qid] for qid in shard],
+                reranked=[reranked[qid] for qid in shard] if reranked is not None else None,
+                expected=[self.query_to_chunk.get(qid) for qid in shard],
+                hit_ranks=[rank_by_qid.get(qid) for qid in shard],
+                relevant=self.qrels.relevant_many(shard) if self.qrels is not None else None
+            )
+        self._write_results_file(self._output_path(output_dir), results, writer.close())
+
+        if self.journal:
+            self.journal.remove()
+            self.journal = None
 
         return results
+
+    def _run_streaming(self, n_results: int) -> StageOutputs:
+        """Run each query through rewrite -> retrieve -> rerank independently.
+
+        Stages are connected by bounded queues, so provider latencies overlap
+        across stages. Each stage output is journaled as soon as it completes.
+        """
+        stop = threading.Event()
+        rewrite_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        search_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        rerank_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        done_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        # Items are (qid, payload) tuples; the payload changes per stage
+        def rewrite(items: List[str]) -> Iterable[Tuple[str, str]]:
+            for qid in items:
+                yield qid, self._rewrite_one(qid)
+
+        def retrieve(items: List[Tuple[str, str]]) -> Iterable[Tuple[str, List[str]]]:
+            batch_results = self.retrieve(dict(items), n_results=n_results, show_progress=False)
+            for qid, _ in items:
+                yield qid, batch_results[qid]
+
+        def rerank(items: List[Tuple[str, List[str]]]) -> Iterable[Tuple[str, List[str]]]:
+            for qid, doc_ids in items:
+                try:
+                    yield qid, self._rerank_one(qid, doc_ids)
+                except Exception as e:
+                    print(f"\nERROR: Reranking failed for query {qid}: {str(e)}")
+                    raise
+
+        queries: Dict[str, str] = {}
+        retrieved: Dict[str, List[str]] = {}
+        reranked: Dict[str, List[str]] = {}
+
+        def collect(stage_results: Dict[str, Any], fn: Callable[[List[Any]], Iterable[Tuple[str, Any]]]) -> Callable[[List[Any]], Iterable[Tuple[str, Any]]]:
+            # Keep each stage's output for the final results as it passes through
+            def wrapped(items: List[Any]) -> Iterable[Tuple[str, Any]]:
+                for qid, value in fn(items):
+                    stage_results[qid] = value
+                    yield qid, value
+            return wrapped
+
+        stages = [
+            StreamStage("rewrite", collect(queries, rewrite), rewrite_queue, search_queue, stop, workers=self.rewrite_concurrency),
+            StreamStage(
+                "retrieve",
+                collect(retrieved, retrieve),
+                search_queue,
+                rerank_queue if self.reranker else done_queue,
+                stop,
+                workers=self.search_workers,
+                batch_size=self.search_batch_size
+            ),
+        ]
+        if self.reranker:
+            stages.append(StreamStage("rerank", collect(reranked, rerank), rerank_queue, done_queue, stop, workers=self.rerank_concurrency))
+
+        def feed() -> None:
+            for qid in self.id_to_query:
+                if not put_item(rewrite_queue, qid, stop):
+                    return
+            put_item(rewrite_queue, DONE, stop)
+
+        threading.Thread(target=feed, name="feed", daemon=True).start()
+        for stage in stages:
+            stage.start()
+
+        with tqdm(total=len(self.id_to_query), desc="Processing queries") as pbar:
+            while get_item(done_queue, stop) is not DONE:
+                pbar.update(1)
+
+        for stage in stages:
+            if stage.error is not None:
+                raise stage.error
+
+        return queries, retrieved, reranked if self.reranker else None
+
+    async def _run_async(self, n_results: int) -> StageOutputs:
+        """Run each query through rewrite -> retrieve -> rerank as a coroutine.
+
+        Provider calls use the async clients where they exist, so concurrency
+        is bounded by semaphores rather than by thread counts. Concurrent
+        searches are coalesced into batches of `search_batch_size`.
+        """
+        rewrite_semaphore = asyncio.Semaphore(self.rewrite_concurrency)
+        rerank_semaphore = asyncio.Semaphore(self.rerank_concurrency)
+
+        async def search(items: List[Tuple[str, str]]) -> List[List[str]]:
+            with self._track_call("retrieve", self.embedder.provider, [query for _, query in items]):
+                batch_results = await self.embedder.aquery_collection(dict(items), n_results=n_results)
+            for qid, _ in items:
+                self._record(qid, "retrieve", batch_results[qid])
+            return [batch_results[qid] for qid, _ in items]
+
+        searcher = AsyncBatcher(search, batch_size=self.search_batch_size, max_concurrency=self.search_workers)
+
+        queries: Dict[str, str] = {}
+        retrieved: Dict[str, List[str]] = {}
+        reranked: Dict[str, List[str]] = {}
+
+        async def process(qid: str) -> None:
+            query = self.id_to_query[qid]
+            if self.rewriter:
+                query = self._journaled(qid, "rewrite")
+                if query is None:
+                    async with rewrite_semaphore:
+                        query = await self._arewrite(self.id_to_query[qid])
+                    self._record(qid, "rewrite", query)
+            queries[qid] = query
+
+            doc_ids = self._journaled(qid, "retrieve")
+            if doc_ids is None:
+                doc_ids = await searcher.submit((qid, query))
+            retrieved[qid] = doc_ids
+
+            if self.reranker:
+                reranked_ids = self._journaled(qid, "rerank")
+                if reranked_ids is None:
+                    async with rerank_semaphore:
+                        try:
+                            reranked_ids = await self._arerank_query(qid, doc_ids)
+                        except Exception as e:
+                            print(f"\nERROR: Reranking failed for query {qid}: {str(e)}")
+                            raise
+                    self._record(qid, "rerank", reranked_ids)
+                reranked[qid] = reranked_ids
+
+        # Enough queries in flight to keep every stage busy, without one task per query
+        max_in_flight = self.rewrite_concurrency + self.search_workers * self.search_batch_size + self.rerank_concurrency
+        qids = iter(self.id_to_query)
+        pending = set()
+
+        try:
+            with tqdm(total=len(self.id_to_query), desc="Processing queries") as pbar:
+                while True:
+                    for qid in qids:
+                        pending.add(asyncio.ensure_future(process(qid)))
+                        if len(pending) >= max_in_flight:
+                            break
+                    if not pending:
+                        break
+
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+                        pbar.update(1)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return queries, retrieved, reranked if self.reranker else None
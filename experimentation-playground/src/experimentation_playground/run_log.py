@@ -0,0 +1,353 @@
+import json
+import os
+import shutil
+from itertools import chain, repeat
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+LOG_FORMAT = "sharded-npz-v1"
+LOG_SHARD_SIZE = 10_000
+
+DOC_IDS_FILE = "doc_ids.npz"
+DOC_TEXTS_FILE = "docs.jsonl"
+
+# Values of a shard's hit_rank column: 1-based rank of the first relevant doc, 0 for a miss,
+# and UNJUDGED for queries that were not evaluated
+UNJUDGED = -1
+
+# Per-query columns of the visualizers' compact log payload, next to its doc table
+PAYLOAD_COLUMNS = ["query_ids", "original", "rewritten", "retrieved", "reranked", "expected", "hit_rank", "relevant"]
+
+
+def pack_codes(codes: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """(len(lengths) x longest) int32 matrix of consecutive runs of `codes`, padded with -1."""
+    depth = int(lengths.max()) if len(lengths) else 0
+    matrix = np.full((len(lengths), depth), -1, dtype=np.int32)
+    matrix[np.arange(depth) < lengths[:, None]] = codes
+    return matrix
+
+
+def unpack_rows(matrix: np.ndarray) -> List[List[int]]:
+    """Inverse of pack_codes(): rows with the -1 padding stripped."""
+    lengths = (matrix >= 0).sum(axis=1).tolist()
+    return [row[:length] for row, length in zip(matrix.tolist(), lengths)]
+
+
+class RunLogWriter:
+    """Writes the per-query log of a run as sharded, integer-coded columns.
+
+    Every doc id referenced by the log gets an integer code on first use. Shards
+    hold the retrieved and reranked lists as padded int32 matrices of codes,
+    and the query texts as JSON. Each chunk's text is written once, to
+    the log's doc table, however many queries retrieved it. The log is
+    written to a temporary directory that replaces `path` on close(), so an
+    interrupted write never leaves a half-written log behind.
+
+    Args:
+        path: Directory of the log, e.g. results/{run_id}.log
+        id_to_chunk: Chunk texts, looked up for the doc table on close()
+    """
+
+    def __init__(self, path: str, id_to_chunk: Mapping[str, str]):
+        self.path = path
+        self.id_to_chunk = id_to_chunk
+        self.doc_codes: Dict[str, int] = {}
+        self.shards: List[str] = []
+        self.n_queries = 0
+
+        self._tmp_path = path + ".tmp"
+        shutil.rmtree(self._tmp_path, ignore_errors=True)
+        os.makedirs(self._tmp_path)
+
+    def _codes(self, doc_ids: List[str]) -> np.ndarray:
+        """Code of every doc id, giving ids seen for the first time the next free codes."""
+        codes = np.fromiter(map(self.doc_codes.get, doc_ids, repeat(-1)), dtype=np.int32, count=len(doc_ids))
+        missing = np.flatnonzero(codes < 0).tolist()
+        if missing:
+            for doc_id in dict.fromkeys(doc_ids[i] for i in missing):
+                self.doc_codes[doc_id] = len(self.doc_codes)
+            codes[missing] = [self.doc_codes[doc_ids[i]] for i in missing]
+        return codes
+
+    def _encode(self, doc_id_lists: Sequence[Sequence[str]]) -> np.ndarray:
+        lengths = np.fromiter(map(len, doc_id_lists), dtype=np.int64, count=len(doc_id_lists))
+        return pack_codes(self._codes(list(chain.from_iterable(doc_id_lists))), lengths)
+
+    def add_shard(
+        self,
+        query_ids: List[str],
+        original: List[str],
+        rewritten: Optional[List[str]],
+        retrieved: List[List[str]],
+        reranked: Optional[List[List[str]]],
+        expected: List[Optional[str]],
+        hit_ranks: List[Optional[int]],
+        relevant: Optional[Tuple[np.ndarray, List[str], np.ndarray]] = None
+    ) -> None:
+        """Write the log of one shard of queries, e.g. LOG_SHARD_SIZE of them.
+
+        Lists are aligned with `query_ids`. `relevant` holds the judged docs of
+        the queries as (offsets, doc_ids, grades), see Qrels.relevant_many().
+        """
+        name = f"shard-{len(self.shards):05d}"
+        columns: Dict[str, np.ndarray] = {
+            "query_ids": np.array(query_ids, dtype=str),
+            "retrieved": self._encode(retrieved),
+            "expected": np.full(len(query_ids), -1, dtype=np.int32),
+            "hit_rank": np.array([UNJUDGED if rank is None else rank for rank in hit_ranks], dtype=np.int32),
+        }
+        labelled = [i for i, doc_id in enumerate(expected) if doc_id]
+        columns["expected"][labelled] = self._codes([expected[i] for i in labelled])
+        if reranked is not None:
+            columns["reranked"] = self._encode(reranked)
+        if relevant is not None:
+            offsets, doc_ids, grades = relevant
+            columns["relevant_offsets"] = offsets.astype(np.int64)
+            columns["relevant_codes"] = self._codes(doc_ids)
+            columns["relevant_grades"] = grades.astype(np.float64)
+
+        np.savez(os.path.join(self._tmp_path, name + ".npz"), **columns)
+        # Query texts are JSON, a single dump per shard
+        with open(os.path.join(self._tmp_path, name + ".json"), "w") as f:
+            json.dump({"original": original, "rewritten": rewritten}, f)
+
+        self.shards.append(name)
+        self.n_queries += len(query_ids)
+
+    def close(self) -> Dict[str, Any]:
+        """Write the doc table, move the log into place and return its manifest."""
+        doc_ids = list(self.doc_codes)
+        np.savez(os.path.join(self._tmp_path, DOC_IDS_FILE), doc_ids=np.array(doc_ids, dtype=str))
+        with open(os.path.join(self._tmp_path, DOC_TEXTS_FILE), "w") as f:
+            for doc_id in doc_ids:
+                f.write(json.dumps(self.id_to_chunk.get(doc_id, "")) + "\n")
+
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(self._tmp_path, self.path)
+        return {
+            "format": LOG_FORMAT,
+            "dir": os.path.basename(self.path),
+            "queries": self.n_queries,
+            "docs": len(doc_ids),
+            "shards": self.shards,
+        }
+
+
+class RunLog:
+    """Reader for a log written by RunLogWriter.
+
+    Shards are loaded one at a time, and the doc table only when a caller
+    needs chunk ids or texts.
+
+    Args:
+        path: Directory of the log
+        manifest: The `log_shards` entry of the run's results file
+    """
+
+    def __init__(self, path: str, manifest: Dict[str, Any]):
+        if manifest.get("format") != LOG_FORMAT:
+            raise ValueError(f"Unsupported run log format: {manifest.get('format')}")
+        self.path = path
+        self.manifest = manifest
+        self.shards: List[str] = manifest["shards"]
+        self._doc_ids: Optional[List[str]] = None
+        self._doc_texts: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return self.manifest["queries"]
+
+    @property
+    def doc_ids(self) -> List[str]:
+        if self._doc_ids is None:
+            with np.load(os.path.join(self.path, DOC_IDS_FILE)) as data:
+                self._doc_ids = data["doc_ids"].tolist()
+        return self._doc_ids
+
+    @property
+    def doc_texts(self) -> List[str]:
+        if self._doc_texts is None:
+            with open(os.path.join(self.path, DOC_TEXTS_FILE)) as f:
+                # One json.loads over the whole table is much faster than one per line
+                self._doc_texts = json.loads("[" + ",".join(line.rstrip("\n") for line in f) + "]")
+        return self._doc_texts
+
+    def shard(self, index: int) -> Dict[str, Any]:
+        """Columns of one shard: the npz arrays, plus `original` and `rewritten` (None without a rewriter) query texts."""
+        name = self.shards[index]
+        with np.load(os.path.join(self.path, name + ".npz")) as data:
+            columns: Dict[str, Any] = {key: data[key] for key in data.files}
+        with open(os.path.join(self.path, name + ".json")) as f:
+            texts = json.load(f)
+        columns["original"] = texts["original"]
+        columns["rewritten"] = texts["rewritten"]
+        return columns
+
+    def shard_payload(self, index: int) -> Dict[str, Any]:
+        """One shard as plain lists, in the compact form the visualizers load."""
+        columns = self.shard(index)
+        payload = {
+            "query_ids": columns["query_ids"].tolist(),
+            "original": columns["original"],
+            "rewritten": columns["rewritten"],
+            "retrieved": unpack_rows(columns["retrieved"]),
+            "reranked": unpack_rows(columns["reranked"]) if "reranked" in columns else None,
+            "expected": columns["expected"].tolist(),
+            "hit_rank": columns["hit_rank"].tolist(),
+            "relevant": None,
+        }
+        if "relevant_offsets" in columns:
+            offsets = columns["relevant_offsets"].tolist()
+            pairs = list(zip(columns["relevant_codes"].tolist(), columns["relevant_grades"].tolist()))
+            payload["relevant"] = [pairs[start:end] for start, end in zip(offsets, offsets[1:])]
+        return payload
+
+    def hit_ranks(self) -> Tuple[List[str], np.ndarray]:
+        """Query ids and hit ranks of the whole log, read without its doc lists or texts."""
+        query_ids: List[str] = []
+        ranks = []
+        for name in self.shards:
+            with np.load(os.path.join(self.path, name + ".npz")) as data:
+                query_ids.extend(data["query_ids"].tolist())
+                ranks.append(data["hit_rank"])
+        return query_ids, np.concatenate(ranks) if ranks else np.zeros(0, dtype=np.int32)
+
+    def entries(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """(qid, entry) pairs in the shape of the original inline log, with chunk texts filled in."""
+        doc_ids, doc_texts = self.doc_ids, self.doc_texts
+
+        def docs(codes: List[int]) -> List[Dict[str, str]]:
+            return [{"doc_id": doc_ids[code], "content": doc_texts[code]} for code in codes]
+
+        for index in range(len(self.shards)):
+            payload = self.shard_payload(index)
+            for i, qid in enumerate(payload["query_ids"]):
+                rank = payload["hit_rank"][i]
+                entry = {
+                    "original_query": payload["original"][i],
+                    "rewritten_query": payload["rewritten"][i] if payload["rewritten"] else None,
+                    "retrieved_results": docs(payload["retrieved"][i]),
+                    "reranked_results": docs(payload["reranked"][i]) if payload["reranked"] else [],
+                    "expected_doc_id": doc_ids[payload["expected"][i]] if payload["expected"][i] >= 0 else None,
+                    "hit_rank": None if rank == UNJUDGED else rank,
+                }
+                if payload["relevant"] is not None:
+                    entry["relevant_docs"] = {doc_ids[code]: grade for code, grade in payload["relevant"][i]}
+                yield qid, entry
+
+
+def open_run_log(results_path: str, data: Optional[Dict[str, Any]] = None) -> Optional[RunLog]:
+    """Log of a run results file, None for results written with the log inline."""
+    if data is None:
+        with open(results_path) as f:
+            data = json.load(f)
+    manifest = data.get("log_shards")
+    if manifest is None:
+        return None
+    return RunLog(str(Path(results_path).parent / manifest["dir"]), manifest)
+
+
+def log_hit_ranks(results_path: str, data: Optional[Dict[str, Any]] = None, k_values: Sequence[int] = (1, 5, 10)) -> Tuple[List[str], np.ndarray]:
+    """Query ids and hit ranks of a run's log, in log order, whether sharded or inline."""
+    if data is None:
+        with open(results_path) as f:
+            data = json.load(f)
+    run_log = open_run_log(results_path, data)
+    if run_log is not None:
+        return run_log.hit_ranks()
+    log = data.get("log", {})
+    return list(log), np.array([inline_hit_rank(entry, k_values) for entry in log.values()], dtype=np.int32)
+
+
+def log_pages(
+    results_path: Optional[str],
+    data: Dict[str, Any],
+    page_size: int,
+    k_values: Sequence[int] = (1, 5, 10)
+) -> Iterator[Tuple[Dict[str, Any], List[str]]]:
+    """Log of a run as consecutive pages of at most `page_size` queries.
+
+    Pages are in the compact form of inline_log_payload(), but instead of doc texts
+    each has `doc_codes`: the code of each of its docs in the run's doc table.
+    Pages never span shards, and only one shard is held in memory at a time.
+    `results_path` may be None for results with the log inline.
+
+    Yields:
+        Each page, and the texts of the run's doc table
+    """
+    run_log = open_run_log(results_path, data) if results_path else None
+    if run_log is None:
+        payload = inline_log_payload(data.get("log", {}), k_values)
+        for start in range(0, len(payload["query_ids"]), page_size):
+            yield slice_payload(payload, start, start + page_size, payload["doc_ids"]), payload["doc_texts"]
+        return
+
+    for index in range(len(run_log.shards)):
+        payload = run_log.shard_payload(index)
+        for start in range(0, len(payload["query_ids"]), page_size):
+            yield slice_payload(payload, start, start + page_size, run_log.doc_ids), run_log.doc_texts
+
+
+def slice_payload(payload: Dict[str, Any], start: int, end: int, doc_ids: List[str]) -> Dict[str, Any]:
+    """Queries [start, end) of a payload, renumbered into a doc table of just the docs they reference.
+
+    The page's `doc_codes` maps its doc codes back to those of `doc_ids`.
+    """
+    local: Dict[int, int] = {}
+
+    def recode(codes: List[int]) -> List[int]:
+        return [local.setdefault(code, len(local)) for code in codes]
+
+    page = {key: payload[key][start:end] if payload[key] is not None else None for key in PAYLOAD_COLUMNS}
+    page["retrieved"] = [recode(codes) for codes in page["retrieved"]]
+    if page["reranked"] is not None:
+        page["reranked"] = [recode(codes) for codes in page["reranked"]]
+    page["expected"] = [local.setdefault(code, len(local)) if code >= 0 else -1 for code in page["expected"]]
+    if page["relevant"] is not None:
+        page["relevant"] = [[[local.setdefault(code, len(local)), grade] for code, grade in pairs] for pairs in page["relevant"]]
+    page["doc_codes"] = list(local)
+    page["doc_ids"] = [doc_ids[code] for code in local]
+    return page
+
+
+def inline_log_payload(log: Mapping[str, Dict[str, Any]], k_values: Sequence[int] = (1, 5, 10)) -> Dict[str, Any]:
+    """Compact form of an inline {qid: entry} log."""
+    doc_codes: Dict[str, int] = {}
+    doc_texts: List[str] = []
+
+    def code(doc: Dict[str, str]) -> int:
+        if doc["doc_id"] not in doc_codes:
+            doc_codes[doc["doc_id"]] = len(doc_texts)
+            doc_texts.append(doc.get("content", ""))
+        return doc_codes[doc["doc_id"]]
+
+    def id_code(doc_id: Optional[str]) -> int:
+        return code({"doc_id": doc_id, "content": ""}) if doc_id else -1
+
+    entries = list(log.values())
+    payload = {
+        "query_ids": list(log),
+        "original": [entry.get("original_query") for entry in entries],
+        "rewritten": [entry.get("rewritten_query") for entry in entries] if any(entry.get("rewritten_query") for entry in entries) else None,
+        "retrieved": [[code(doc) for doc in entry.get("retrieved_results", [])] for entry in entries],
+        "reranked": [[code(doc) for doc in entry.get("reranked_results", [])] for entry in entries] if any(entry.get("reranked_results") for entry in entries) else None,
+        "expected": [id_code(entry.get("expected_doc_id")) for entry in entries],
+        "hit_rank": [inline_hit_rank(entry, k_values) for entry in entries],
+        "relevant": None,
+    }
+    if any("relevant_docs" in entry for entry in entries):
+        payload["relevant"] = [[[id_code(doc_id), grade] for doc_id, grade in entry.get("relevant_docs", {}).items()] for entry in entries]
+    payload["doc_ids"] = list(doc_codes)
+    payload["doc_texts"] = doc_texts
+    return payload
+
+
+def inline_hit_rank(entry: Dict[str, Any], k_values: Sequence[int]) -> int:
+    # Logs written before hit ranks were recorded only have Recall@k flags; the smallest k hit stands in for the rank
+    if entry.get("hit_rank") is not None:
+        return entry["hit_rank"]
+    recall = entry.get("recall") or {}
+    if not recall:
+        return UNJUDGED
+    return next((k for k in sorted(k_values) if recall.get(f"Recall@{k}")), 0)
@@ -0,0 +1,128 @@
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Tuple
+
+from .run import Run
+
+DEFAULT_SWEEP_WORKERS = 8
+
+NodeKey = Tuple[Any, ...]
+
+
+class SweepNode:
+    def __init__(self, key: NodeKey, fn: Callable[..., Any], deps: List[NodeKey]):
+        self.key = key
+        self.fn = fn
+        self.deps = deps
+
+
+class SweepPlan:
+    """Dependency graph of stage outputs shared between the runs of a sweep.
+
+    Nodes are keyed on everything that determines their output, so stages that
+    several runs have in common (e.g. ingesting the same collection, or the
+    same rewrites) are added once and executed once. A node runs as soon as
+    all of its dependencies have finished, independently of which run it was
+    first added for.
+    """
+
+    def __init__(self):
+        self.nodes: Dict[NodeKey, SweepNode] = {}
+        self.requested = 0
+
+    def add(self, key: NodeKey, fn: Callable[..., Any], deps: Tuple[NodeKey, ...] = ()) -> NodeKey:
+        """Add a node unless an identical one exists. `fn` is called with the outputs of `deps`."""
+        self.requested += 1
+        if key not in self.nodes:
+            self.nodes[key] = SweepNode(key, fn, list(deps))
+        return key
+
+    def stage_counts(self) -> Dict[str, int]:
+        return dict(Counter(key[0] for key in self.nodes))
+
+    def execute(self, max_workers: int = DEFAULT_SWEEP_WORKERS) -> Dict[NodeKey, Any]:
+        """Run every node once its dependencies are done, returning node key -> output."""
+        outputs: Dict[NodeKey, Any] = {}
+        waiting = dict(self.nodes)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                while waiting or running:
+                    for key, node in list(waiting.items()):
+                        if all(dep in outputs for dep in node.deps):
+                            future = executor.submit(node.fn, *(outputs[dep] for dep in node.deps))
+                            running[future] = key
+                            del waiting[key]
+
+                    done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        outputs[running.pop(future)] = future.result()
+            finally:
+                # Don't start anything new after a failure
+                for future in running:
+                    future.cancel()
+
+        return outputs
+
+
+def plan_sweep(runs: List[Run], n_results: int = 10, output_dir: str = "results") -> Tuple[SweepPlan, Dict[str, NodeKey]]:
+    """Build the stage graph for a list of staged runs.
+
+    Runs are expected to carry the sweep's `embed_method`, `collection`,
+    `rewrite_method` and `rerank_method` in their config. Query embedding is
+    part of the retrieve node, repeated texts are served by the embedding cache.
+    Opens every run's journal, resuming it if the run was created with resume=True.
+
+    Returns:
+        The plan and a mapping from run_id to the node that saves that run's results
+    """
+    plan = SweepPlan()
+    run_nodes = {}
+    # Every run depending on each per-query node, the first one being the run that executes it
+    sharers: Dict[NodeKey, List[Run]] = defaultdict(list)
+
+    def shared(key: NodeKey, stage: str, fn: Callable[..., Any], run: Run) -> Callable[..., Any]:
+        sharers[key].append(run)
+
+        def journaled(*args: Any) -> Any:
+            outputs = fn(*args)
+            # The executing run journaled these itself; the other runs need them too in case one of
+            # them fails after the executing run has saved its results and dropped its journal
+            for other in sharers[key][1:]:
+                other.record_outputs(stage, outputs)
+            return outputs
+        return journaled
+
+    for run in runs:
+        config = run.config
+        uncached = run.result_cache is None
+        # Per-query nodes journal into every run depending on them, so resumed sweeps skip finished queries
+        run.open_journal(output_dir, n_results)
+
+        ingest = plan.add(
+            ("ingest", config["embed_method"], config["collection"]),
+            run.ingest
+        )
+        rewrite_key = ("rewrite", config.get("rewrite_method"), uncached)
+        rewrite = plan.add(rewrite_key, shared(rewrite_key, "rewrite", run.rewrite_queries, run))
+        retrieve_key = ("retrieve", config["embed_method"], config["collection"], config.get("rewrite_method"), n_results)
+        retrieve = plan.add(
+            retrieve_key,
+            shared(retrieve_key, "retrieve", lambda _, queries, run=run: run.retrieve(queries, n_results), run),
+            deps=(ingest, rewrite)
+        )
+
+        deps = (rewrite, retrieve)
+        if run.reranker:
+            rerank_key = ("rerank", config["rerank_method"], uncached) + retrieve[1:]
+            rerank = plan.add(rerank_key, shared(rerank_key, "rerank", run.rerank_all, run), deps=(retrieve,))
+            deps += (rerank,)
+
+        run_nodes[run.run_id] = plan.add(
+            ("save", run.run_id),
+            lambda queries, retrieved, reranked=None, run=run: run.save_results(queries, retrieved, reranked, output_dir),
+            deps=deps
+        )
+
+    return plan, run_nodes
@@ -0,0 +1,158 @@
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+LATENCY_PERCENTILES = [50, 95, 99]
+
+# The telemetry of the run being executed and the call currently open in this context.
+# Nested code (e.g. the embedding scheduler) reports into them without being passed a handle.
+_active: ContextVar[Optional["Telemetry"]] = ContextVar("telemetry", default=None)
+_open_call: ContextVar[Optional["CallRecord"]] = ContextVar("telemetry_call", default=None)
+
+
+def text_bytes(texts: Iterable[str]) -> int:
+    """UTF-8 size of the texts sent in a request body."""
+    return sum(len(text.encode("utf-8")) for text in texts)
+
+
+class CallRecord:
+    """Counters of one call, filled in while the call is open."""
+
+    __slots__ = ("items", "bytes_sent", "tokens", "retries", "error")
+
+    def __init__(self, items: int = 1, bytes_sent: int = 0, tokens: int = 0):
+        self.items = items
+        self.bytes_sent = bytes_sent
+        self.tokens = tokens
+        self.retries = 0
+        self.error = False
+
+
+class StageStats:
+    """Every call of one (stage, provider) pair, as compact arrays of per-call values."""
+
+    def __init__(self):
+        self.seconds = array("d")
+        self.items = array("q")
+        self.first_start = float("inf")
+        self.last_end = 0.0
+        self.bytes_sent = 0
+        self.tokens = 0
+        self.retries = 0
+        self.errors = 0
+        self.cache_hits = 0
+
+    def add(self, start: float, end: float, record: CallRecord) -> None:
+        self.seconds.append(end - start)
+        self.items.append(record.items)
+        self.first_start = min(self.first_start, start)
+        self.last_end = max(self.last_end, end)
+        self.bytes_sent += record.bytes_sent
+        self.tokens += record.tokens
+        self.retries += record.retries
+        self.errors += record.error
+
+    def summary(self) -> Dict[str, Any]:
+        seconds = np.frombuffer(self.seconds, dtype=np.float64) if self.seconds else np.zeros(1)
+        items = int(np.frombuffer(self.items, dtype=np.int64).sum()) if self.items else 0
+        # Calls overlap when a stage runs concurrently, so throughput is over the stage's wall span
+        span = max(self.last_end - self.first_start, 0.0) if self.seconds else 0.0
+        percentiles = np.percentile(seconds, LATENCY_PERCENTILES)
+        return {
+            "calls": len(self.seconds),
+            "items": items,
+            "mean_batch_size": items / len(self.seconds) if self.seconds else 0.0,
+            "errors": self.errors,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "bytes_sent": self.bytes_sent,
+            "tokens": self.tokens,
+            "total_seconds": float(seconds.sum()) if self.seconds else 0.0,
+            "wall_seconds": span,
+            "mean_seconds": float(seconds.mean()),
+            **{f"p{p}_seconds": float(value) for p, value in zip(LATENCY_PERCENTILES, percentiles)},
+            "max_seconds": float(seconds.max()),
+            "items_per_second": items / span if span > 0 else 0.0,
+        }
+
+
+class Telemetry:
+    """Per-call latency, batch size, bytes, tokens and retries of every stage of a run.
+
+    Calls are grouped by (stage, provider). Only the per-call duration and
+    batch size are kept individually, so recording stays cheap for runs with
+    millions of calls, and percentiles are computed once in summary().
+
+    Example:
+        >>> telemetry = Telemetry()
+        >>> with telemetry.call("rerank", "voyage", items=len(documents), bytes_sent=text_bytes(documents)):
+        ...     reranked = reranker.rerank(query, documents, doc_ids)
+        >>> telemetry.summary()["stages"]
+    """
+
+    def __init__(self):
+        self._stats: Dict[Tuple[str, str], StageStats] = {}
+        self._lock = threading.Lock()
+
+    def _stage(self, stage: str, provider: Optional[str]) -> StageStats:
+        key = (stage, provider or "local")
+        stats = self._stats.get(key)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(key, StageStats())
+        return stats
+
+    def add(self, stage: str, provider: Optional[str], start: float, end: float, record: CallRecord) -> None:
+        stats = self._stage(stage, provider)
+        with self._lock:
+            stats.add(start, end, record)
+
+    def cache_hit(self, stage: str, provider: Optional[str]) -> None:
+        """Count a call answered from the result cache instead of the provider."""
+        stats = self._stage(stage, provider)
+        with self._lock:
+            stats.cache_hits += 1
+
+    @contextmanager
+    def call(self, stage: str, provider: Optional[str], items: int = 1, bytes_sent: int = 0, tokens: int = 0) -> Iterator[CallRecord]:
+        """Time one call of a stage. Retries noted inside it with note_retry() are added to it."""
+        record = CallRecord(items, bytes_sent, tokens)
+        active_token, call_token = _active.set(self), _open_call.set(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            record.error = True
+            raise
+        finally:
+            self.add(stage, provider, start, time.perf_counter(), record)
+            _open_call.reset(call_token)
+            _active.reset(active_token)
+
+    def summary(self) -> Dict[str, Any]:
+        """Aggregated stats of every (stage, provider) pair, and the wall time from the first call to the last."""
+        with self._lock:
+            stages: List[Dict[str, Any]] = [
+                {"stage": stage, "provider": provider, **stats.summary()}
+                for (stage, provider), stats in self._stats.items()
+            ]
+            timed = [stats for stats in self._stats.values() if stats.seconds]
+            wall = max(stats.last_end for stats in timed) - min(stats.first_start for stats in timed) if timed else 0.0
+        return {"wall_seconds": wall, "stages": stages}
+
+
+def active_telemetry() -> Optional[Telemetry]:
+    """Telemetry of the run executing in the current context, if any."""
+    return _active.get()
+
+
+def note_retry() -> None:
+    """Count a retry against the call currently open in this context, if any."""
+    record = _open_call.get()
+    if record is not None:
+        record.retries += 1
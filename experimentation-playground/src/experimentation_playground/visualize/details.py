@@ -0,0 +1,96 @@
+import json
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..run_log import log_pages
+
+# Queries per lazily loaded detail file, and chunk texts per file of the doc store
+DETAIL_PAGE_SIZE = 500
+DOC_CHUNK_SIZE = 100
+
+
+def details_dir(output_file: str) -> Path:
+    """Empty directory for the detail files of a report, `{output_file stem}_data/` next to it."""
+    path = Path(output_file).with_name(Path(output_file).stem + "_data")
+    shutil.rmtree(path, ignore_errors=True)
+    path.mkdir(parents=True)
+    return path
+
+
+def write_script(path: Path, callback: str, *args: Any) -> None:
+    # Detail files are scripts calling back into the page, which unlike fetch() also works for file:// URLs
+    with open(path, 'w') as f:
+        f.write(f"{callback}({', '.join(json.dumps(arg) for arg in args)});\n")
+
+
+class DocStore:
+    """Chunk texts of a report, written once each in files of DOC_CHUNK_SIZE texts.
+
+    Detail pages refer to texts by their code in this store instead of
+    repeating them, and the runs of a sweep mostly retrieve from the same
+    collection, so they share most of it.
+    """
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = data_dir
+        self.codes: Dict[str, int] = {}
+        self.pending: List[str] = []
+
+    def add(self, doc_ids: List[str], doc_codes: List[int], doc_texts: List[str]) -> List[int]:
+        """Store codes of a page's docs, adding the texts of docs not seen before."""
+        refs = []
+        for doc_id, code in zip(doc_ids, doc_codes):
+            ref = self.codes.get(doc_id)
+            if ref is None:
+                ref = self.codes[doc_id] = len(self.codes)
+                self.pending.append(doc_texts[code])
+                if len(self.pending) == DOC_CHUNK_SIZE:
+                    self.flush()
+            refs.append(ref)
+        return refs
+
+    def flush(self) -> None:
+        """Write the pending texts to the file of their chunk."""
+        if self.pending:
+            chunk = (len(self.codes) - 1) // DOC_CHUNK_SIZE
+            write_script(self.data_dir / f"docs-{chunk}.js", 'registerDocs', chunk, self.pending)
+            self.pending = []
+
+
+def write_run_details(
+    results_path: Optional[str],
+    data: Dict[str, Any],
+    run_idx: int,
+    data_dir: Path,
+    docs: DocStore
+) -> Tuple[List[str], np.ndarray, List[int]]:
+    """Write a run's log as detail pages, and its per-query hit ranks as the index used for filtering.
+
+    Args:
+        results_path: Path of the run's results file, None for results passed with the log inline
+        data: Contents of the results file
+        run_idx: Index of the run in the report, naming its `run-{run_idx}/` directory
+        data_dir: Directory of the report's detail files
+        docs: Doc store of the report
+
+    Returns:
+        The run's query ids, their hit ranks and the position of the first query of each page
+    """
+    run_dir = data_dir / f"run-{run_idx}"
+    run_dir.mkdir(parents=True)
+
+    query_ids: List[str] = []
+    hit_ranks: List[int] = []
+    page_starts: List[int] = []
+    for page_idx, (page, doc_texts) in enumerate(log_pages(results_path, data, DETAIL_PAGE_SIZE)):
+        page['doc_refs'] = docs.add(page['doc_ids'], page.pop('doc_codes'), doc_texts)
+        page_starts.append(len(query_ids))
+        query_ids.extend(page['query_ids'])
+        hit_ranks.extend(page['hit_rank'])
+        write_script(run_dir / f"page-{page_idx}.js", 'registerPage', run_idx, page_idx, page)
+
+    write_script(run_dir / "index.js", 'registerIndex', run_idx, hit_ranks)
+    return query_ids, np.array(hit_ranks, dtype=np.int32), page_starts
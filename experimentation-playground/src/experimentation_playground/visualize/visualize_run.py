@@ -3,19 +3,39 @@ import os
 import webbrowser
 from typing import Union, Dict, Any
 
+from .details import DOC_CHUNK_SIZE, DocStore, details_dir, write_run_details
+
 def visualize_run(input_data: Union[str, Dict[str, Any]], output_file: str = "visualization.html"):
     """
-    Generates a standalone HTML file to visualize the results of a run.
-    
+    Generates an HTML file to visualize the results of a run.
+
+    The HTML holds the run's results, and loads the per-query details from
+    `{output_file stem}_data/` next to it when they are viewed: an index of
+    hit ranks that filters run on, pages of queries, and chunk texts that are
+    only fetched when a query's results are shown. Keep the two together when
+    moving the report.
+
     Args:
-        input_data: Filepath to the results JSON or the results dictionary itself.
+        input_data: Filepath to the results JSON, or a results dictionary with its log inline.
         output_file: Path where the HTML file will be saved.
     """
     if isinstance(input_data, str):
         with open(input_data, 'r') as f:
             data = json.load(f)
+        results_path = input_data
+    elif 'log_shards' in input_data:
+        raise ValueError("Results with a sharded log must be visualized from their file path")
     else:
         data = input_data
+        results_path = None
+
+    abs_output_file = os.path.abspath(output_file)
+    data_dir = details_dir(abs_output_file)
+    docs = DocStore(data_dir)
+    query_ids, _, page_starts = write_run_details(results_path, data, 0, data_dir, docs)
+    docs.flush()
+
+    data = {'results': data.get('results', {}), 'queries': len(query_ids), 'page_starts': page_starts}
 
     html_template = """
 <!DOCTYPE html>
@@ -337,6 +357,58 @@ def visualize_run(input_data: Union[str, Dict[str, Any]], output_file: str = "vi
         .doc-card-content {
             flex: 1;
         }
+
+        .timing-table {
+            width: 100%;
+            border-collapse: collapse;
+            font-size: 0.85em;
+            margin-top: 10px;
+        }
+
+        .timing-table th, .timing-table td {
+            padding: 6px 8px;
+            border-bottom: 1px solid var(--border-color);
+            text-align: right;
+            white-space: nowrap;
+        }
+
+        .timing-table th:first-child, .timing-table td:first-child,
+        .timing-table th:nth-child(2), .timing-table td:nth-child(2) {
+            text-align: left;
+        }
+
+        .timing-bar {
+            display: inline-block;
+            height: 8px;
+            border-radius: 4px;
+            background: #495057;
+            vertical-align: middle;
+            margin-right: 6px;
+        }
+
+        .timing-table tr.hot-stage td {
+            background: var(--failure-color);
+        }
+
+        .pager {
+            display: flex;
+            gap: 8px;
+            align-items: center;
+            color: var(--text-secondary);
+        }
+
+        .load-error {
+            background: var(--failure-color);
+            color: var(--failure-text);
+            padding: 15px;
+            border-radius: 8px;
+        }
+
+        .timing-note {
+            color: var(--text-secondary);
+            font-size: 0.8em;
+            margin-top: 6px;
+        }
     </style>
 </head>
 <body>
@@ -347,11 +419,173 @@ def visualize_run(input_data: Union[str, Dict[str, Any]], output_file: str = "vi
     <script>
         // Inject data from Python
         const rawData = __DATA_PLACEHOLDER__;
+        const DATA_DIR = __DATA_DIR_PLACEHOLDER__;
+        const DOC_CHUNK_SIZE = __DOC_CHUNK_SIZE_PLACEHOLDER__;
+
+        // Query cards per page, and detail pages kept in memory
+        const VIEW_PAGE_SIZE = 50;
+        const MAX_CACHED_PAGES = 20;
 
         // Helper to safely access nested properties
         const results = rawData.results || {};
-        const logs = rawData.log || {};
-        const logArray = Object.entries(logs).map(([id, data]) => ({ id, ...data }));
+
+        // Per-query details are loaded from DATA_DIR when viewed: run-0/index.js has the hit rank of every
+        // query, used for filtering, run-0/page-N.js the log in pages that have their own doc table, and
+        // docs-N.js the chunk texts, referred to from the doc tables by their code. All are scripts calling
+        // registerIndex/registerPage/registerDocs, so they also load from file:// URLs.
+        let hitRanks = null;
+        const pageCache = new Map();
+        const docChunks = new Map();
+        let viewPage = 0;
+        let viewRequest = 0;
+        let shown = { start: 0, entries: [] };
+
+        function registerIndex(runIdx, ranks) {
+            hitRanks = Int32Array.from(ranks);
+        }
+
+        function registerPage(runIdx, pageIdx, page) {
+            cachePage(pageIdx, page);
+        }
+
+        function registerDocs(chunk, texts) {
+            docChunks.set(chunk, texts);
+        }
+
+        function cachePage(key, page) {
+            // Map order is insertion order, so re-inserting keeps the least recently used page first
+            pageCache.delete(key);
+            pageCache.set(key, page);
+            while (pageCache.size > MAX_CACHED_PAGES) {
+                pageCache.delete(pageCache.keys().next().value);
+            }
+        }
+
+        function loadScript(src) {
+            return new Promise((resolve, reject) => {
+                const script = document.createElement('script');
+                script.src = src;
+                script.onload = () => { script.remove(); resolve(); };
+                script.onerror = () => { script.remove(); reject(new Error(`Could not load ${src}`)); };
+                document.body.appendChild(script);
+            });
+        }
+
+        async function loadIndex() {
+            if (!hitRanks) {
+                await loadScript(`${DATA_DIR}/run-0/index.js`);
+            }
+            return hitRanks;
+        }
+
+        async function loadPage(pageIdx) {
+            let page = pageCache.get(pageIdx);
+            if (!page) {
+                await loadScript(`${DATA_DIR}/run-0/page-${pageIdx}.js`);
+                page = pageCache.get(pageIdx);
+            }
+            cachePage(pageIdx, page);
+            return page;
+        }
+
+        // Text of every doc code, loading the chunks they are in
+        async function loadTexts(refs) {
+            const texts = new Map();
+            for (const ref of refs) {
+                const chunk = Math.floor(ref / DOC_CHUNK_SIZE);
+                if (!docChunks.has(chunk)) {
+                    await loadScript(`${DATA_DIR}/docs-${chunk}.js`);
+                }
+                texts.set(ref, docChunks.get(chunk)[ref % DOC_CHUNK_SIZE]);
+            }
+            return texts;
+        }
+
+        // Index of the detail page holding a query, from the position of each page's first query
+        function pageOf(position) {
+            const pageStarts = rawData.page_starts;
+            let lo = 0, hi = pageStarts.length - 1;
+            while (lo < hi) {
+                const mid = (lo + hi + 1) >> 1;
+                if (pageStarts[mid] <= position) lo = mid; else hi = mid - 1;
+            }
+            return lo;
+        }
+
+        // One query of a detail page, in the shape the query cards render
+        function pageEntry(page, i) {
+            const docs = codes => codes.map(code => ({ doc_id: page.doc_ids[code], ref: page.doc_refs[code] }));
+            const rank = page.hit_rank[i];
+            const recall = {};
+            if (rank >= 0) {
+                [1, 5, 10].forEach(k => { recall[`Recall@${k}`] = rank > 0 && rank <= k; });
+            }
+            const entry = {
+                original_query: page.original[i],
+                rewritten_query: page.rewritten ? page.rewritten[i] : null,
+                retrieved_results: docs(page.retrieved[i]),
+                reranked_results: page.reranked ? docs(page.reranked[i]) : [],
+                expected_doc_id: page.expected[i] >= 0 ? page.doc_ids[page.expected[i]] : null,
+                recall
+            };
+            if (page.relevant) {
+                entry.relevant_docs = Object.fromEntries(page.relevant[i].map(([code, grade]) => [page.doc_ids[code], grade]));
+            }
+            return entry;
+        }
+
+        // Stages that time provider batches inside another stage, left out when picking the hot path
+        const NESTED_STAGES = ['embed'];
+
+        function formatSeconds(seconds) {
+            if (seconds === undefined || seconds === null) return 'N/A';
+            return seconds < 1 ? `${(seconds * 1000).toFixed(1)} ms` : `${seconds.toFixed(2)} s`;
+        }
+
+        function formatCount(value) {
+            if (value >= 1e9) return `${(value / 1e9).toFixed(1)}G`;
+            if (value >= 1e6) return `${(value / 1e6).toFixed(1)}M`;
+            if (value >= 1e3) return `${(value / 1e3).toFixed(1)}k`;
+            return `${Math.round(value)}`;
+        }
+
+        function renderTiming(timing) {
+            if (!timing || !timing.stages || !timing.stages.length) return '';
+            const wall = timing.wall_seconds || Math.max(...timing.stages.map(s => s.wall_seconds));
+            const topLevel = timing.stages.filter(s => !NESTED_STAGES.includes(s.stage));
+            const hot = topLevel.reduce((a, b) => (b.wall_seconds > a.wall_seconds ? b : a), topLevel[0] || timing.stages[0]);
+
+            const rows = timing.stages.map(s => `
+                <tr class="${s === hot ? 'hot-stage' : ''}">
+                    <td>${NESTED_STAGES.includes(s.stage) ? '&nbsp;&nbsp;↳ ' : ''}${s.stage}</td>
+                    <td>${s.provider}</td>
+                    <td><span class="timing-bar" style="width: ${wall ? Math.max(2, 80 * s.wall_seconds / wall) : 0}px"></span>${formatSeconds(s.wall_seconds)}</td>
+                    <td>${formatCount(s.calls)}</td>
+                    <td>${s.mean_batch_size.toFixed(1)}</td>
+                    <td>${formatSeconds(s.p50_seconds)}</td>
+                    <td>${formatSeconds(s.p95_seconds)}</td>
+                    <td>${formatSeconds(s.p99_seconds)}</td>
+                    <td>${s.items_per_second.toFixed(1)}</td>
+                    <td>${s.retries}</td>
+                    <td>${s.errors}</td>
+                    <td>${formatCount(s.cache_hits)}</td>
+                    <td>${formatCount(s.bytes_sent)}B</td>
+                    <td>${formatCount(s.tokens)}</td>
+                </tr>
+            `).join('');
+
+            return `
+                <table class="timing-table">
+                    <thead><tr>
+                        <th>Stage</th><th>Provider</th><th>Wall</th><th>Calls</th><th>Batch</th>
+                        <th>p50</th><th>p95</th><th>p99</th><th>Items/s</th>
+                        <th>Retries</th><th>Errors</th><th>Cached</th><th>Sent</th><th>Tokens</th>
+                    </tr></thead>
+                    <tbody>${rows}</tbody>
+                </table>
+                <div class="timing-note">Total ${formatSeconds(wall)}. Latencies are per call, and the slowest top-level stage is highlighted. Embed rows are the provider batches sent during index and retrieve.</div>
+            `;
+        }
 
         function render() {
             const app = document.getElementById('app');
@@ -372,6 +606,13 @@ def visualize_run(input_data: Union[str, Dict[str, Any]], output_file: str = "vi
                         `).join('')}
                     </div>
 
+                    ${results.timing ? `
+                        <div style="margin-top: 20px;">
+                            <h3>Stage Timing</h3>
+                            ${renderTiming(results.timing)}
+                        </div>
+                    ` : ''}
+
                     <div style="margin-top: 20px;">
                         <h3>Configuration</h3>
                         <div class="config-details">
@@ -412,6 +653,12 @@ def visualize_run(input_data: Union[str, Dict[str, Any]], output_file: str = "vi
                     </select>
 
                     <span id="count-display" style="margin-left: auto; color: var(--text-secondary);"></span>
+
+                    <div class="pager">
+                        <button onclick="changePage(-1)">Prev</button>
+                        <span id="pager"></span>
+                        <button onclick="changePage(1)">Next</button>
+                    </div>
                 </div>
             `;
 
@@ -433,56 +680,67 @@ def visualize_run(input_data: Union[str, Dict[str, Any]], output_file: str = "vi
                 statusFilter.disabled = false;
             }
 
+            viewPage = 0;
+            updateView();
+        }
+
+        function changePage(delta) {
+            viewPage = Math.max(0, viewPage + delta);
             updateView();
         }
 
-        function updateView() {
+        // Positions of the queries that pass the filters, null when every query does
+        function filteredPositions(ranks) {
             const recallKValue = document.getElementById('recall-k-filter').value;
             const statusValue = document.getElementById('status-filter').value;
-            const container = document.getElementById('logs-list');
-            const countDisplay = document.getElementById('count-display');
-
-            const filteredLogs = logArray.filter(log => {
-                if (recallKValue === 'all') return true;
+            if (recallKValue === 'all' || statusValue === 'all') return null;
 
-                const key = `Recall@${recallKValue}`;
-                const isSuccess = log.recall && log.recall[key];
+            const k = Number(recallKValue);
+            const wantSuccess = statusValue === 'success';
+            const positions = [];
+            ranks.forEach((rank, i) => {
+                if ((rank > 0 && rank <= k) === wantSuccess) positions.push(i);
+            });
+            return positions;
+        }
 
-                if (statusValue === 'all') {
-                    return true; // Show all when status filter is "all"
+        async function updateView() {
+            const container = document.getElementById('logs-list');
+            const countDisplay = document.getElementById('count-display');
+            const pager = document.getElementById('pager');
+            // Only the latest filter or page change gets rendered
+            const request = ++viewRequest;
+
+            let start, entries;
+            try {
+                const positions = filteredPositions(await loadIndex());
+                const total = positions ? positions.length : rawData.queries;
+                const pageCount = Math.max(1, Math.ceil(total / VIEW_PAGE_SIZE));
+                viewPage = Math.min(viewPage, pageCount - 1);
+                start = viewPage * VIEW_PAGE_SIZE;
+                const end = Math.min(start + VIEW_PAGE_SIZE, total);
+
+                entries = [];
+                for (let i = start; i < end; i++) {
+                    const position = positions ? positions[i] : i;
+                    const pageIdx = pageOf(position);
+                    const page = await loadPage(pageIdx);
+                    entries.push(pageEntry(page, position - rawData.page_starts[pageIdx]));
                 }
-                return statusValue === 'success' ? isSuccess : !isSuccess;
-            });
+                if (request !== viewRequest) return;
+
+                countDisplay.innerText = `Showing ${total ? start + 1 : 0}-${end} of ${total} queries${positions ? ` (${rawData.queries} in run)` : ''}`;
+                pager.innerText = `Page ${viewPage + 1} of ${pageCount}`;
+            } catch (error) {
+                if (request !== viewRequest) return;
+                container.innerHTML = `<div class="load-error">${escapeHtml(error.message)}. Query details are read from the ${escapeHtml(DATA_DIR)} directory next to this file.</div>`;
+                return;
+            }
 
-            countDisplay.innerText = `Showing ${filteredLogs.length} of ${logArray.length} logs`;
-
-            container.innerHTML = filteredLogs.map((log, idx) => {
-                const expectedId = log.expected_doc_id;
-                const resultsToggleId = `results-${idx}`;
-                const resultsCheckboxId = `results-checkbox-${idx}`;
-
-                // Helper to render doc list
-                const renderDocs = (docs, title) => {
-                    if (!docs || docs.length === 0) return '';
-                    return `
-                        <div class="result-column">
-                            <div class="column-header">${title}</div>
-                            <div>
-                                ${docs.map((doc, docIdx) => `
-                                    <div class="doc-card-wrapper ${doc.doc_id === expectedId ? 'expected' : ''}">
-                                        <div class="doc-card">
-                                            <span class="doc-number">${docIdx + 1}</span>
-                                            <div class="doc-card-content">
-                                                <div class="doc-id">${doc.doc_id}</div>
-                                                <div class="doc-content">${escapeHtml(doc.content)}</div>
-                                            </div>
-                                        </div>
-                                    </div>
-                                `).join('')}
-                            </div>
-                        </div>
-                    `;
-                };
+            shown = { start, entries };
+            container.innerHTML = entries.map((log, idx) => {
+                const resultsToggleId = `results-${start + idx}`;
+                const resultsCheckboxId = `results-checkbox-${start + idx}`;
 
                 // Sort recall badges by k value (1, 5, 10)
                 const recallOrder = ['Recall@1', 'Recall@5', 'Recall@10'];
@@ -516,22 +774,44 @@ def visualize_run(input_data: Union[str, Dict[str, Any]], output_file: str = "vi
                         <div class="results-toggle-container">
                             <span class="results-toggle-label">Show Results</span>
                             <label class="toggle-switch">
-                                <input type="checkbox" id="${resultsCheckboxId}" onchange="toggleResults('${resultsToggleId}', '${resultsCheckboxId}')">
+                                <input type="checkbox" id="${resultsCheckboxId}" onchange="toggleResults(${start + idx})">
                                 <span class="slider"></span>
                             </label>
                             <span class="toggle-label" id="label-${resultsCheckboxId}">Show</span>
                         </div>
 
-                        <div class="results-comparison retrieved-content" id="${resultsToggleId}">
-                            ${renderDocs(log.retrieved_results, 'Retrieved Results')}
-                            ${renderDocs(log.reranked_results, 'Reranked Results')}
-                        </div>
+                        <div class="results-comparison retrieved-content" id="${resultsToggleId}"></div>
                     </div>
                 `;
             }).join('');
         }
 
-        function toggleResults(contentId, checkboxId) {
+        function renderDocs(log, docs, title, texts) {
+            if (!docs || docs.length === 0) return '';
+            return `
+                <div class="result-column">
+                    <div class="column-header">${title}</div>
+                    <div>
+                        ${docs.map((doc, docIdx) => `
+                            <div class="doc-card-wrapper ${(log.relevant_docs ? doc.doc_id in log.relevant_docs : doc.doc_id === log.expected_doc_id) ? 'expected' : ''}">
+                                <div class="doc-card">
+                                    <span class="doc-number">${docIdx + 1}</span>
+                                    <div class="doc-card-content">
+                                        <div class="doc-id">${doc.doc_id}</div>
+                                        <div class="doc-content">${escapeHtml(texts.get(doc.ref))}</div>
+                                    </div>
+                                </div>
+                            </div>
+                        `).join('')}
+                    </div>
+                </div>
+            `;
+        }
+
+        // Chunk texts are rendered the first time a query's results are shown
+        async function toggleResults(position) {
+            const contentId = `results-${position}`;
+            const checkboxId = `results-checkbox-${position}`;
             const element = document.getElementById(contentId);
             const checkbox = document.getElementById(checkboxId);
             const label = document.getElementById(`label-${checkboxId}`);
@@ -540,6 +820,19 @@ def visualize_run(input_data: Union[str, Dict[str, Any]], output_file: str = "vi
                 if (checkbox.checked) {
                     element.style.display = 'flex';
                     label.textContent = 'Hide';
+                    if (!element.innerHTML.trim()) {
+                        const log = shown.entries[position - shown.start];
+                        element.innerHTML = '<div class="column-header">Loading results...</div>';
+                        try {
+                            const texts = await loadTexts([...log.retrieved_results, ...log.reranked_results].map(doc => doc.ref));
+                            element.innerHTML = `
+                                ${renderDocs(log, log.retrieved_results, 'Retrieved Results', texts)}
+                                ${renderDocs(log, log.reranked_results, 'Reranked Results', texts)}
+                            `;
+                        } catch (error) {
+                            element.innerHTML = `<div class="load-error">${escapeHtml(error.message)}</div>`;
+                        }
+                    }
                 } else {
                     element.style.display = 'none';
                     label.textContent = 'Show';
@@ -565,9 +858,8 @@ def visualize_run(input_data: Union[str, Dict[str, Any]], output_file: str = "vi
     """
 
     html_content = html_template.replace('__DATA_PLACEHOLDER__', json.dumps(data))
-
-    # Get absolute path for the output file
-    abs_output_file = os.path.abspath(output_file)
+    html_content = html_content.replace('__DATA_DIR_PLACEHOLDER__', json.dumps(data_dir.name))
+    html_content = html_content.replace('__DOC_CHUNK_SIZE_PLACEHOLDER__', json.dumps(DOC_CHUNK_SIZE))
 
     with open(abs_output_file, 'w') as f:
         f.write(html_content)
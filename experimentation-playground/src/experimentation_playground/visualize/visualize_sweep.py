@@ -4,9 +4,22 @@ import webbrowser
 from pathlib import Path
 from typing import Union
 
+from ..eval.query_diff import load_query_diff
+from .details import DOC_CHUNK_SIZE, DocStore, details_dir, write_run_details, write_script
+
+# Metrics listed with their confidence intervals and baseline comparison in the overview
+COMPARISON_METRICS = ['Recall@1', 'Recall@5', 'Recall@10', 'MRR', 'nDCG@10']
+
 def visualize_sweep(sweep_dir: Union[str, Path], output_file: str = "sweep_visualization.html"):
     """
-    Generates a standalone HTML file to visualize the results of a sweep.
+    Generates an HTML file to visualize the results of a sweep.
+
+    The HTML holds only a summary of each run and aggregates computed in one
+    pass over the run logs. The per-query details are written next to it, to
+    `{output_file stem}_data/`, as pages of queries that the page loads when
+    they are viewed. Keep the two together when moving the report. Per-query
+    differences between runs come from the sweep's saved QueryDiff index,
+    which is rebuilt in `sweep_dir` if it is missing or out of date.
 
     Args:
         sweep_dir: Directory containing the sweep result JSON files.
@@ -20,30 +33,64 @@ def visualize_sweep(sweep_dir: Union[str, Path], output_file: str = "sweep_visua
     if not json_files:
         raise ValueError(f"No JSON files found in {sweep_dir}")
 
-    # Load all data
+    abs_output_file = os.path.abspath(output_file)
+    data_dir = details_dir(abs_output_file)
+
+    # One run at a time: only its results and a shard of its log are in memory, and every
+    # run leaves behind just its summary
     all_data = []
-    for json_file in json_files:
+    overview_data = []
+    docs = DocStore(data_dir)
+    for run_idx, json_file in enumerate(json_files):
         with open(json_file, 'r') as f:
             data = json.load(f)
-            all_data.append({
-                'filename': json_file.name,
-                'data': data
-            })
+        results = data.get('results', {})
+        query_ids, _, page_starts = write_run_details(str(json_file), data, run_idx, data_dir, docs)
+        del data
+
+        all_data.append({
+            'filename': json_file.name,
+            'results': results,
+            'queries': len(query_ids),
+            'page_starts': page_starts
+        })
 
-    # Extract metrics for overview
-    overview_data = []
-    for item in all_data:
-        results = item['data'].get('results', {})
-        run_id = results.get('run_id', item['filename'])
+        run_id = results.get('run_id', json_file.name)
         metrics = results.get('metrics', {})
 
         overview_data.append({
             'run_id': run_id,
             'recall_1': metrics.get('Recall@1', 0),
             'recall_5': metrics.get('Recall@5', 0),
-            'recall_10': metrics.get('Recall@10', 0)
+            'recall_10': metrics.get('Recall@10', 0),
+            'metrics': {key: metrics[key] for key in COMPARISON_METRICS if key in metrics},
+            'confidence_intervals': results.get('confidence_intervals', {}),
+            'significance': results.get('significance'),
+            'timing': results.get('timing')
         })
 
+    docs.flush()
+
+    # The baseline of the sweep's significance tests, otherwise the first run
+    baseline_id = next((d['significance']['baseline'] for d in overview_data if d['significance']), None)
+    run_ids = [d['run_id'] for d in overview_data]
+    baseline_idx = run_ids.index(baseline_id) if baseline_id in run_ids else 0
+
+    # Per-query differences come from the sweep's saved hit-rank index. The page gets its pattern
+    # index, to look up the queries one run improves or regresses against another when asked
+    query_diff = load_query_diff(sweep_dir, run_ids)
+    summary = query_diff.summary(run_ids[baseline_idx])
+    for item, difference in zip(overview_data, summary['runs']):
+        item['query_diff'] = difference
+    query_summary = {'baseline': summary['baseline'], 'baseline_idx': baseline_idx, 'agreement': summary['agreement']}
+    write_script(data_dir / "query_diff.js", 'registerQueryDiff', {
+        'k_values': query_diff.k_values,
+        'patterns': [query_diff.index[k][0].tolist() for k in query_diff.k_values],
+        'order': [query_diff.index[k][1].tolist() for k in query_diff.k_values],
+        'offsets': [query_diff.index[k][2].tolist() for k in query_diff.k_values],
+        'positions': query_diff.positions.T.tolist()
+    })
+
     html_template = """
 <!DOCTYPE html>
 <html lang="en">
@@ -132,6 +179,76 @@ def visualize_sweep(sweep_dir: Union[str, Path], output_file: str = "sweep_visua
             justify-content: center;
         }
 
+        .comparison-section {
+            background: var(--card-bg);
+            padding: 20px 30px;
+            border-radius: 8px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.05);
+            margin-top: 20px;
+            overflow-x: auto;
+        }
+
+        .comparison-table {
+            width: 100%;
+            border-collapse: collapse;
+            font-size: 0.9em;
+        }
+
+        .comparison-table th, .comparison-table td {
+            padding: 8px 10px;
+            border-bottom: 1px solid var(--border-color);
+            text-align: left;
+            vertical-align: top;
+        }
+
+        .comparison-table .ci, .metric-card .ci {
+            color: var(--text-secondary);
+            font-size: 0.85em;
+        }
+
+        .comparison-table .significant, .timing-table .significant {
+            color: var(--success-text);
+            font-weight: bold;
+        }
+
+        .timing-table {
+            width: 100%;
+            border-collapse: collapse;
+            font-size: 0.85em;
+            margin-top: 10px;
+        }
+
+        .timing-table th, .timing-table td {
+            padding: 6px 8px;
+            border-bottom: 1px solid var(--border-color);
+            text-align: right;
+            white-space: nowrap;
+        }
+
+        .timing-table th:first-child, .timing-table td:first-child,
+        .timing-table th:nth-child(2), .timing-table td:nth-child(2) {
+            text-align: left;
+        }
+
+        .timing-bar {
+            display: inline-block;
+            height: 8px;
+            border-radius: 4px;
+            background: #495057;
+            vertical-align: middle;
+            margin-right: 6px;
+        }
+
+        .timing-table tr.hot-stage td {
+            background: var(--failure-color);
+        }
+
+        .timing-note {
+            color: var(--text-secondary);
+            font-size: 0.8em;
+            margin-top: 6px;
+        }
+
         .chart-selector {
             display: flex;
             flex-direction: column;
@@ -265,6 +382,28 @@ def visualize_sweep(sweep_dir: Union[str, Path], output_file: str = "sweep_visua
             font-size: 14px;
         }
 
+        .pager {
+            display: flex;
+            gap: 8px;
+            align-items: center;
+            color: var(--text-secondary);
+        }
+
+        .comparison-table .improved {
+            color: var(--success-text);
+        }
+
+        .comparison-table .regressed {
+            color: var(--failure-text);
+        }
+
+        .load-error {
+            background: var(--failure-color);
+            color: var(--failure-text);
+            padding: 15px;
+            border-radius: 8px;
+        }
+
         .log-item {
             background: var(--card-bg);
             padding: 20px;
@@ -487,15 +626,163 @@ def visualize_sweep(sweep_dir: Union[str, Path], output_file: str = "sweep_visua
         // Inject data from Python
         const allData = __ALL_DATA_PLACEHOLDER__;
         const overviewData = __OVERVIEW_DATA_PLACEHOLDER__;
+        const querySummary = __QUERY_SUMMARY_PLACEHOLDER__;
+        const DATA_DIR = __DATA_DIR_PLACEHOLDER__;
+
+        // Query cards per page of a run tab, and detail pages kept in memory over all runs
+        const VIEW_PAGE_SIZE = 50;
+        const MAX_CACHED_PAGES = 20;
+        const DOC_CHUNK_SIZE = __DOC_CHUNK_SIZE_PLACEHOLDER__;
 
         let charts = {};
 
+        // Per-query details are loaded from DATA_DIR when viewed. Each run has an index.js with the hit rank
+        // of every query, used for filtering, and page-N.js files with its log in pages that have their own doc table.
+        // Chunk texts of the whole sweep are in docs-N.js files, referred to from the doc tables by their code.
+        // All are scripts calling registerIndex/registerPage/registerDocs, so they also load from file:// URLs.
+        const runIndexes = {};
+        const pageCache = new Map();
+        const docChunks = new Map();
+        const viewPages = {};
+        const viewRequests = {};
+        const shownEntries = {};
+
+        function registerDocs(chunk, texts) {
+            docChunks.set(chunk, texts);
+        }
+
+        // Hit patterns of the queries over all runs, see QueryDiff: for each k, the (patterns x runs) states
+        // -1 (not judged), 0 (miss) and 1 (hit), query rows grouped by pattern, and each run's position of every row
+        let queryDiff = null;
+
+        function registerQueryDiff(diff) {
+            queryDiff = diff;
+        }
+
+        async function loadQueryDiff() {
+            if (!queryDiff) {
+                await loadScript(`${DATA_DIR}/query_diff.js`);
+            }
+            return queryDiff;
+        }
+
+        const DIFF_STATES = { improved: [1, 0], regressed: [0, 1], both_fail: [0, 0] };
+
+        // Positions in a run of the queries it improves or regresses against another run at k, or that both fail.
+        // Only the groups of matching patterns are read, so this takes time in the number of patterns and results.
+        async function comparisonPositions(runIdx, otherIdx, kind, k) {
+            const diff = await loadQueryDiff();
+            const ki = diff.k_values.indexOf(k);
+            const [patterns, order, offsets] = [diff.patterns[ki], diff.order[ki], diff.offsets[ki]];
+            const [state, otherState] = DIFF_STATES[kind];
+            const runPositions = diff.positions[runIdx];
+            const positions = [];
+            patterns.forEach((pattern, group) => {
+                if (pattern[runIdx] !== state || pattern[otherIdx] !== otherState) return;
+                for (let i = offsets[group]; i < offsets[group + 1]; i++) {
+                    positions.push(runPositions[order[i]]);
+                }
+            });
+            return positions.sort((a, b) => a - b);
+        }
+
+        function registerIndex(runIdx, hitRanks) {
+            runIndexes[runIdx] = Int32Array.from(hitRanks);
+        }
+
+        function registerPage(runIdx, pageIdx, page) {
+            cachePage(`${runIdx}/${pageIdx}`, page);
+        }
+
+        function cachePage(key, page) {
+            // Map order is insertion order, so re-inserting keeps the least recently used page first
+            pageCache.delete(key);
+            pageCache.set(key, page);
+            while (pageCache.size > MAX_CACHED_PAGES) {
+                pageCache.delete(pageCache.keys().next().value);
+            }
+        }
+
+        function loadScript(src) {
+            return new Promise((resolve, reject) => {
+                const script = document.createElement('script');
+                script.src = src;
+                script.onload = () => { script.remove(); resolve(); };
+                script.onerror = () => { script.remove(); reject(new Error(`Could not load ${src}`)); };
+                document.body.appendChild(script);
+            });
+        }
+
+        async function loadIndex(runIdx) {
+            if (!(runIdx in runIndexes)) {
+                await loadScript(`${DATA_DIR}/run-${runIdx}/index.js`);
+            }
+            return runIndexes[runIdx];
+        }
+
+        async function loadPage(runIdx, pageIdx) {
+            const key = `${runIdx}/${pageIdx}`;
+            let page = pageCache.get(key);
+            if (!page) {
+                await loadScript(`${DATA_DIR}/run-${runIdx}/page-${pageIdx}.js`);
+                page = pageCache.get(key);
+            }
+            cachePage(key, page);
+            return page;
+        }
+
+        // Text of every doc code, loading the chunks they are in
+        async function loadTexts(refs) {
+            const texts = new Map();
+            for (const ref of refs) {
+                const chunk = Math.floor(ref / DOC_CHUNK_SIZE);
+                if (!docChunks.has(chunk)) {
+                    await loadScript(`${DATA_DIR}/docs-${chunk}.js`);
+                }
+                texts.set(ref, docChunks.get(chunk)[ref % DOC_CHUNK_SIZE]);
+            }
+            return texts;
+        }
+
+        // Index of the detail page holding a query, from the position of each page's first query
+        function pageOf(pageStarts, position) {
+            let lo = 0, hi = pageStarts.length - 1;
+            while (lo < hi) {
+                const mid = (lo + hi + 1) >> 1;
+                if (pageStarts[mid] <= position) lo = mid; else hi = mid - 1;
+            }
+            return lo;
+        }
+
+        // One query of a detail page, in the shape the query cards render
+        function pageEntry(page, i) {
+            const docs = codes => codes.map(code => ({ doc_id: page.doc_ids[code], ref: page.doc_refs[code] }));
+            const rank = page.hit_rank[i];
+            const recall = {};
+            if (rank >= 0) {
+                [1, 5, 10].forEach(k => { recall[`Recall@${k}`] = rank > 0 && rank <= k; });
+            }
+            const entry = {
+                original_query: page.original[i],
+                rewritten_query: page.rewritten ? page.rewritten[i] : null,
+                retrieved_results: docs(page.retrieved[i]),
+                reranked_results: page.reranked ? docs(page.reranked[i]) : [],
+                expected_doc_id: page.expected[i] >= 0 ? page.doc_ids[page.expected[i]] : null,
+                recall
+            };
+            if (page.relevant) {
+                entry.relevant_docs = Object.fromEntries(page.relevant[i].map(([code, grade]) => [page.doc_ids[code], grade]));
+            }
+            return entry;
+        }
+
         function initializeTabs() {
             const tabsContainer = document.getElementById('tabs-container');
             const tabContents = document.getElementById('tab-contents');
 
             // Create Overview tab
             const overviewTab = document.createElement('div');
+            overviewTab.id = 'tab-button-overview';
             overviewTab.className = 'tab active';
             overviewTab.textContent = 'Overview';
             overviewTab.onclick = () => switchTab('overview');
@@ -510,9 +797,10 @@ def visualize_sweep(sweep_dir: Union[str, Path], output_file: str = "sweep_visua
 
             // Create tabs for each run
             allData.forEach((item, idx) => {
-                const runId = item.data.results?.run_id || item.filename;
+                const runId = item.results?.run_id || item.filename;
 
                 const tab = document.createElement('div');
+                tab.id = `tab-button-run-${idx}`;
                 tab.className = 'tab';
                 tab.textContent = runId;
                 tab.onclick = () => switchTab(`run-${idx}`);
@@ -521,7 +809,7 @@ def visualize_sweep(sweep_dir: Union[str, Path], output_file: str = "sweep_visua
                 const content = document.createElement('div');
                 content.id = `tab-run-${idx}`;
                 content.className = 'tab-content';
-                content.innerHTML = renderRunContent(item.data, idx);
+                content.innerHTML = renderRunContent(item, idx);
                 tabContents.appendChild(content);
             });
 
@@ -535,12 +823,21 @@ def visualize_sweep(sweep_dir: Union[str, Path], output_file: str = "sweep_visua
             // Update tab active state
             const tabs = document.querySelectorAll('.tab');
             tabs.forEach(tab => tab.classList.remove('active'));
-            event.target.classList.add('active');
+            document.getElementById(`tab-button-${tabId}`).classList.add('active');
 
             // Update content active state
             const contents = document.querySelectorAll('.tab-content');
             contents.forEach(content => content.classList.remove('active'));
             document.getElementById(`tab-${tabId}`).classList.add('active');
+
+            // Query details of a run are first loaded when its tab is opened
+            if (tabId.startsWith('run-')) {
+                const runIdx = Number(tabId.slice(4));
+                if (!(runIdx in viewPages)) {
+                    viewPages[runIdx] = 0;
+                    updateView(runIdx);
+                }
+            }
         }
 
         function renderOverview() {
@@ -563,6 +860,166 @@ def visualize_sweep(sweep_dir: Union[str, Path], output_file: str = "sweep_visua
                         <button onclick="switchChart('recall-10')">Recall@10</button>
                     </div>
                 </div>
+                ${renderComparison()}
+                ${renderQueryDifferences()}
+                ${renderTimingComparison()}
+            `;
+        }
+
+        function formatInterval(interval) {
+            return interval ? `[${interval[0].toFixed(4)}, ${interval[1].toFixed(4)}]` : '';
+        }
+
+        function renderComparison() {
+            const metricKeys = __COMPARISON_METRICS_PLACEHOLDER__;
+            const baseline = (overviewData.find(d => d.significance) || {}).significance;
+            const rows = overviewData.map(d => `
+                <tr>
+                    <td>${d.run_id}${baseline && baseline.baseline === d.run_id ? ' <span class="ci">(baseline)</span>' : ''}</td>
+                    ${metricKeys.map(key => {
+                        const value = d.metrics[key];
+                        const test = d.significance && d.significance.metrics[key];
+                        const delta = test ? `<div class="${test.p_value < 0.05 ? 'significant' : 'ci'}">${test.difference >= 0 ? '+' : ''}${test.difference.toFixed(4)} (p = ${test.p_value.toFixed(3)})</div>` : '';
+                        return `<td>${value !== undefined ? value.toFixed(4) : 'N/A'}<div class="ci">${formatInterval(d.confidence_intervals[key])}</div>${delta}</td>`;
+                    }).join('')}
+                </tr>
+            `).join('');
+
+            return `
+                <div class="comparison-section">
+                    <h3>Confidence Intervals${baseline ? ' and Paired Tests vs ' + baseline.baseline : ''}</h3>
+                    <table class="comparison-table">
+                        <thead><tr><th>Run</th>${metricKeys.map(key => `<th>${key}</th>`).join('')}</tr></thead>
+                        <tbody>${rows}</tbody>
+                    </table>
+                    <div class="ci" style="margin-top: 10px;">95% bootstrap intervals. Differences against the baseline come from paired permutation tests over shared queries, and p &lt; 0.05 is shown in bold.</div>
+                </div>
+            `;
+        }
+
+        function renderQueryDifferences() {
+            const keys = [1, 5, 10].map(k => `Recall@${k}`);
+            const agreement = querySummary.agreement;
+            const rows = overviewData.map((d, idx) => `
+                <tr>
+                    <td>${d.run_id}${d.run_id === querySummary.baseline ? ' <span class="ci">(baseline)</span>' : ''}</td>
+                    <td>${d.query_diff ? d.query_diff.queries : ''}</td>
+                    ${keys.map(key => {
+                        if (!d.query_diff) return '<td></td>';
+                        const diff = d.query_diff.by_k[key];
+                        const k = Number(key.split('@')[1]);
+                        const link = (kind, text, cls) => `<a href="#" class="${cls}" onclick="showComparison(${idx}, ${querySummary.baseline_idx}, '${kind}', ${k}); return false;">${text}</a>`;
+                        return `<td>${link('improved', `+${diff.improved}`, 'improved')} / ${link('regressed', `-${diff.regressed}`, 'regressed')}</td>`;
+                    }).join('')}
+                </tr>
+            `).join('');
+
+            return `
+                <div class="comparison-section">
+                    <h3>Per-Query Differences vs ${querySummary.baseline}</h3>
+                    <table class="comparison-table">
+                        <thead><tr><th>Run</th><th>Shared Queries</th>${keys.map(key => `<th>${key}</th>`).join('')}</tr></thead>
+                        <tbody>
+                            ${rows}
+                            <tr>
+                                <td colspan="2">Missed / hit by every run (of ${agreement.queries} queries)</td>
+                                ${keys.map(key => `<td>${agreement[key].missed_by_all} / ${agreement[key].hit_by_all}</td>`).join('')}
+                            </tr>
+                        </tbody>
+                    </table>
+                    <div class="ci" style="margin-top: 10px;">Queries each run hits at k that the baseline misses (+), and the reverse (-), over the queries both runs judged. Click a count to list its queries, or compare any two runs from a run's tab.</div>
+                </div>
+            `;
+        }
+
+        // Stages that time provider batches inside another stage, left out when picking the hot path
+        const NESTED_STAGES = ['embed'];
+
+        function formatSeconds(seconds) {
+            if (seconds === undefined || seconds === null) return 'N/A';
+            return seconds < 1 ? `${(seconds * 1000).toFixed(1)} ms` : `${seconds.toFixed(2)} s`;
+        }
+
+        function formatCount(value) {
+            if (value >= 1e9) return `${(value / 1e9).toFixed(1)}G`;
+            if (value >= 1e6) return `${(value / 1e6).toFixed(1)}M`;
+            if (value >= 1e3) return `${(value / 1e3).toFixed(1)}k`;
+            return `${Math.round(value)}`;
+        }
+
+        function renderTiming(timing) {
+            if (!timing || !timing.stages || !timing.stages.length) return '';
+            const wall = timing.wall_seconds || Math.max(...timing.stages.map(s => s.wall_seconds));
+            const topLevel = timing.stages.filter(s => !NESTED_STAGES.includes(s.stage));
+            const hot = topLevel.reduce((a, b) => (b.wall_seconds > a.wall_seconds ? b : a), topLevel[0] || timing.stages[0]);
+
+            const rows = timing.stages.map(s => `
+                <tr class="${s === hot ? 'hot-stage' : ''}">
+                    <td>${NESTED_STAGES.includes(s.stage) ? '&nbsp;&nbsp;↳ ' : ''}${s.stage}</td>
+                    <td>${s.provider}</td>
+                    <td><span class="timing-bar" style="width: ${wall ? Math.max(2, 80 * s.wall_seconds / wall) : 0}px"></span>${formatSeconds(s.wall_seconds)}</td>
+                    <td>${formatCount(s.calls)}</td>
+                    <td>${s.mean_batch_size.toFixed(1)}</td>
+                    <td>${formatSeconds(s.p50_seconds)}</td>
+                    <td>${formatSeconds(s.p95_seconds)}</td>
+                    <td>${formatSeconds(s.p99_seconds)}</td>
+                    <td>${s.items_per_second.toFixed(1)}</td>
+                    <td>${s.retries}</td>
+                    <td>${s.errors}</td>
+                    <td>${formatCount(s.cache_hits)}</td>
+                    <td>${formatCount(s.bytes_sent)}B</td>
+                    <td>${formatCount(s.tokens)}</td>
+                </tr>
+            `).join('');
+
+            return `
+                <table class="timing-table">
+                    <thead><tr>
+                        <th>Stage</th><th>Provider</th><th>Wall</th><th>Calls</th><th>Batch</th>
+                        <th>p50</th><th>p95</th><th>p99</th><th>Items/s</th>
+                        <th>Retries</th><th>Errors</th><th>Cached</th><th>Sent</th><th>Tokens</th>
+                    </tr></thead>
+                    <tbody>${rows}</tbody>
+                </table>
+                <div class="timing-note">Total ${formatSeconds(wall)}. Latencies are per call, and the slowest top-level stage is highlighted. Embed rows are the provider batches sent during index and retrieve.</div>
+            `;
+        }
+
+        function renderTimingComparison() {
+            const timed = overviewData.filter(d => d.timing && d.timing.stages && d.timing.stages.length);
+            if (!timed.length) return '';
+
+            // Top-level stages in the order they first appear, with every provider of a stage summed
+            const stageNames = [];
+            timed.forEach(d => d.timing.stages.forEach(s => {
+                if (!NESTED_STAGES.includes(s.stage) && !stageNames.includes(s.stage)) stageNames.push(s.stage);
+            }));
+            const stageWall = (d, name) => d.timing.stages
+                .filter(s => s.stage === name)
+                .reduce((total, s) => total + s.wall_seconds, 0);
+            const slowest = Math.max(...timed.map(d => d.timing.wall_seconds));
+
+            const rows = timed.map(d => {
+                const walls = stageNames.map(name => stageWall(d, name));
+                const hot = walls.indexOf(Math.max(...walls));
+                return `
+                    <tr>
+                        <td>${d.run_id}</td>
+                        <td><span class="timing-bar" style="width: ${slowest ? Math.max(2, 120 * d.timing.wall_seconds / slowest) : 0}px"></span>${formatSeconds(d.timing.wall_seconds)}</td>
+                        ${walls.map((wall, i) => `<td class="${i === hot ? 'significant' : ''}">${wall ? formatSeconds(wall) : '-'}</td>`).join('')}
+                    </tr>
+                `;
+            }).join('');
+
+            return `
+                <div class="comparison-section">
+                    <h3>Stage Timing</h3>
+                    <table class="timing-table">
+                        <thead><tr><th>Run</th><th>Total</th>${stageNames.map(name => `<th>${name}</th>`).join('')}</tr></thead>
+                        <tbody>${rows}</tbody>
+                    </table>
+                    <div class="timing-note">Wall time of each stage, and the slowest stage of each run is shown in bold. In a planned sweep, a stage shared by several runs is timed only in the run that executed it.</div>
+                </div>
             `;
         }
 
@@ -620,7 +1077,9 @@ def visualize_sweep(sweep_dir: Union[str, Path], output_file: str = "sweep_visua
                         tooltip: {
                             callbacks: {
                                 label: function(context) {
-                                    return (context.parsed.y * 100).toFixed(2) + '%';
+                                    const interval = overviewData[context.dataIndex].confidence_intervals[label];
+                                    const range = interval ? ` (95% CI ${(interval[0] * 100).toFixed(2)}–${(interval[1] * 100).toFixed(2)}%)` : '';
+                                    return (context.parsed.y * 100).toFixed(2) + '%' + range;
                                 }
                             }
                         },
@@ -657,7 +1116,6 @@ def visualize_sweep(sweep_dir: Union[str, Path], output_file: str = "sweep_visua
 
         function renderRunContent(data, runIdx) {
             const results = data.results || {};
-            const logs = data.log || {};
             const config = results.config || {};
             const configKeys = ['embed_method', 'rewrite_method', 'rerank_method', 'collection', 'data_dir'];
 
@@ -669,10 +1127,18 @@ def visualize_sweep(sweep_dir: Union[str, Path], output_file: str = "sweep_visua
                             <div class="metric-card">
                                 <div class="metric-label">${key}</div>
                                 <div class="metric-value">${typeof value === 'number' ? value.toFixed(4) : value}</div>
+                                <div class="ci">${formatInterval((results.confidence_intervals || {})[key])}</div>
                             </div>
                         `).join('')}
                     </div>
 
+                    ${results.timing ? `
+                        <div style="margin-top: 20px;">
+                            <h3>Stage Timing</h3>
+                            ${renderTiming(results.timing)}
+                        </div>
+                    ` : ''}
+
                     <div style="margin-top: 20px;">
                         <h3>Configuration</h3>
                         <div class="config-details">
@@ -709,7 +1175,26 @@ def visualize_sweep(sweep_dir: Union[str, Path], output_file: str = "sweep_visua
                         <option value="fail">Failure</option>
                     </select>
 
+                    <select id="compare-run-${runIdx}" onchange="updateComparison(${runIdx})">
+                        <option value="">No comparison</option>
+                        ${allData.map((other, otherIdx) => otherIdx === runIdx ? '' : `
+                            <option value="${otherIdx}">vs ${other.results?.run_id || other.filename}</option>
+                        `).join('')}
+                    </select>
+
+                    <select id="compare-kind-${runIdx}" onchange="updateComparison(${runIdx})" disabled>
+                        <option value="improved">Improved</option>
+                        <option value="regressed">Regressed</option>
+                        <option value="both_fail">Both fail</option>
+                    </select>
+
                     <span id="count-display-${runIdx}" style="margin-left: auto; color: var(--text-secondary);"></span>
+
+                    <div class="pager">
+                        <button onclick="changePage(${runIdx}, -1)">Prev</button>
+                        <span id="pager-${runIdx}"></span>
+                        <button onclick="changePage(${runIdx}, 1)">Next</button>
+                    </div>
                 </div>
 
                 <div id="logs-list-${runIdx}"></div>
@@ -719,67 +1204,103 @@ def visualize_sweep(sweep_dir: Union[str, Path], output_file: str = "sweep_visua
         function updateStatusFilter(runIdx) {
             const recallKValue = document.getElementById(`recall-k-filter-${runIdx}`).value;
             const statusFilter = document.getElementById(`status-filter-${runIdx}`);
+            const comparing = document.getElementById(`compare-run-${runIdx}`).value !== '';
 
-            if (recallKValue === 'all') {
+            if (recallKValue === 'all' || comparing) {
                 statusFilter.disabled = true;
                 statusFilter.value = 'all';
             } else {
                 statusFilter.disabled = false;
             }
 
+            viewPages[runIdx] = 0;
             updateView(runIdx);
         }
 
-        function updateView(runIdx) {
-            const data = allData[runIdx].data;
-            const logs = data.log || {};
-            const logArray = Object.entries(logs).map(([id, logData]) => ({ id, ...logData }));
+        // Comparing with another run replaces the status filter, at the selected Recall@k (10 for All)
+        function updateComparison(runIdx) {
+            const comparing = document.getElementById(`compare-run-${runIdx}`).value !== '';
+            const recallFilter = document.getElementById(`recall-k-filter-${runIdx}`);
+            document.getElementById(`compare-kind-${runIdx}`).disabled = !comparing;
+            if (comparing && recallFilter.value === 'all') {
+                recallFilter.value = '10';
+            }
+            updateStatusFilter(runIdx);
+        }
+
+        function showComparison(runIdx, otherIdx, kind, k) {
+            document.getElementById(`compare-run-${runIdx}`).value = String(otherIdx);
+            document.getElementById(`compare-kind-${runIdx}`).value = kind;
+            document.getElementById(`recall-k-filter-${runIdx}`).value = String(k);
+            updateComparison(runIdx);
+            switchTab(`run-${runIdx}`);
+        }
+
+        function changePage(runIdx, delta) {
+            viewPages[runIdx] = Math.max(0, (viewPages[runIdx] || 0) + delta);
+            updateView(runIdx);
+        }
 
+        // Positions of the run's queries that pass the tab's filters, null when every query does
+        async function filteredPositions(runIdx) {
             const recallKValue = document.getElementById(`recall-k-filter-${runIdx}`).value;
             const statusValue = document.getElementById(`status-filter-${runIdx}`).value;
+            const compareValue = document.getElementById(`compare-run-${runIdx}`).value;
+            if (compareValue !== '') {
+                const kind = document.getElementById(`compare-kind-${runIdx}`).value;
+                return comparisonPositions(runIdx, Number(compareValue), kind, recallKValue === 'all' ? 10 : Number(recallKValue));
+            }
+            if (recallKValue === 'all' || statusValue === 'all') return null;
+
+            const hitRanks = await loadIndex(runIdx);
+            const k = Number(recallKValue);
+            const wantSuccess = statusValue === 'success';
+            const positions = [];
+            hitRanks.forEach((rank, i) => {
+                if ((rank > 0 && rank <= k) === wantSuccess) positions.push(i);
+            });
+            return positions;
+        }
+
+        async function updateView(runIdx) {
+            const item = allData[runIdx];
             const container = document.getElementById(`logs-list-${runIdx}`);
             const countDisplay = document.getElementById(`count-display-${runIdx}`);
-
-            const filteredLogs = logArray.filter(log => {
-                if (recallKValue === 'all') return true;
-
-                const key = `Recall@${recallKValue}`;
-                const isSuccess = log.recall && log.recall[key];
-
-                if (statusValue === 'all') {
-                    return true;
+            const pager = document.getElementById(`pager-${runIdx}`);
+            // Only the latest filter or page change of a tab gets rendered
+            const request = (viewRequests[runIdx] || 0) + 1;
+            viewRequests[runIdx] = request;
+
+            let start, entries;
+            try {
+                const positions = await filteredPositions(runIdx);
+                const total = positions ? positions.length : item.queries;
+                const pageCount = Math.max(1, Math.ceil(total / VIEW_PAGE_SIZE));
+                viewPages[runIdx] = Math.min(viewPages[runIdx] || 0, pageCount - 1);
+                start = viewPages[runIdx] * VIEW_PAGE_SIZE;
+                const end = Math.min(start + VIEW_PAGE_SIZE, total);
+
+                entries = [];
+                for (let i = start; i < end; i++) {
+                    const position = positions ? positions[i] : i;
+                    const pageIdx = pageOf(item.page_starts, position);
+                    const page = await loadPage(runIdx, pageIdx);
+                    entries.push(pageEntry(page, position - item.page_starts[pageIdx]));
                 }
-                return statusValue === 'success' ? isSuccess : !isSuccess;
-            });
+                if (viewRequests[runIdx] !== request) return;
+
+                countDisplay.innerText = `Showing ${total ? start + 1 : 0}-${end} of ${total} queries${positions ? ` (${item.queries} in run)` : ''}`;
+                pager.innerText = `Page ${viewPages[runIdx] + 1} of ${pageCount}`;
+            } catch (error) {
+                if (viewRequests[runIdx] !== request) return;
+                container.innerHTML = `<div class="load-error">${escapeHtml(error.message)}. Query details are read from the ${escapeHtml(DATA_DIR)} directory next to this file.</div>`;
+                return;
+            }
 
-            countDisplay.innerText = `Showing ${filteredLogs.length} of ${logArray.length} logs`;
-
-            container.innerHTML = filteredLogs.map((log, idx) => {
-                const expectedId = log.expected_doc_id;
-                const resultsToggleId = `results-${runIdx}-${idx}`;
-                const resultsCheckboxId = `results-checkbox-${runIdx}-${idx}`;
-
-                const renderDocs = (docs, title) => {
-                    if (!docs || docs.length === 0) return '';
-                    return `
-                        <div class="result-column">
-                            <div class="column-header">${title}</div>
-                            <div>
-                                ${docs.map((doc, docIdx) => `
-                                    <div class="doc-card-wrapper ${doc.doc_id === expectedId ? 'expected' : ''}">
-                                        <div class="doc-card">
-                                            <span class="doc-number">${docIdx + 1}</span>
-                                            <div class="doc-card-content">
-                                                <div class="doc-id">${doc.doc_id}</div>
-                                                <div class="doc-content">${escapeHtml(doc.content)}</div>
-                                            </div>
-                                        </div>
-                                    </div>
-                                `).join('')}
-                            </div>
-                        </div>
-                    `;
-                };
+            shownEntries[runIdx] = { start, entries };
+            container.innerHTML = entries.map((log, idx) => {
+                const resultsToggleId = `results-${runIdx}-${start + idx}`;
+                const resultsCheckboxId = `results-checkbox-${runIdx}-${start + idx}`;
 
                 const recallOrder = ['Recall@1', 'Recall@5', 'Recall@10'];
                 const recallBadges = recallOrder
@@ -812,22 +1333,44 @@ def visualize_sweep(sweep_dir: Union[str, Path], output_file: str = "sweep_visua
                         <div class="results-toggle-container">
                             <span class="results-toggle-label">Show Results</span>
                             <label class="toggle-switch">
-                                <input type="checkbox" id="${resultsCheckboxId}" onchange="toggleResults('${resultsToggleId}', '${resultsCheckboxId}')">
+                                <input type="checkbox" id="${resultsCheckboxId}" onchange="toggleResults(${runIdx}, ${start + idx})">
                                 <span class="slider"></span>
                             </label>
                             <span class="toggle-label" id="label-${resultsCheckboxId}">Show</span>
                         </div>
 
-                        <div class="results-comparison retrieved-content" id="${resultsToggleId}">
-                            ${renderDocs(log.retrieved_results, 'Retrieved Results')}
-                            ${renderDocs(log.reranked_results, 'Reranked Results')}
-                        </div>
+                        <div class="results-comparison retrieved-content" id="${resultsToggleId}"></div>
                     </div>
                 `;
             }).join('');
         }
 
-        function toggleResults(contentId, checkboxId) {
+        function renderDocs(log, docs, title, texts) {
+            if (!docs || docs.length === 0) return '';
+            return `
+                <div class="result-column">
+                    <div class="column-header">${title}</div>
+                    <div>
+                        ${docs.map((doc, docIdx) => `
+                            <div class="doc-card-wrapper ${(log.relevant_docs ? doc.doc_id in log.relevant_docs : doc.doc_id === log.expected_doc_id) ? 'expected' : ''}">
+                                <div class="doc-card">
+                                    <span class="doc-number">${docIdx + 1}</span>
+                                    <div class="doc-card-content">
+                                        <div class="doc-id">${doc.doc_id}</div>
+                                        <div class="doc-content">${escapeHtml(texts.get(doc.ref))}</div>
+                                    </div>
+                                </div>
+                            </div>
+                        `).join('')}
+                    </div>
+                </div>
+            `;
+        }
+
+        // Chunk texts are rendered the first time a query's results are shown
+        async function toggleResults(runIdx, position) {
+            const contentId = `results-${runIdx}-${position}`;
+            const checkboxId = `results-checkbox-${runIdx}-${position}`;
             const element = document.getElementById(contentId);
             const checkbox = document.getElementById(checkboxId);
             const label = document.getElementById(`label-${checkboxId}`);
@@ -836,6 +1379,20 @@ def visualize_sweep(sweep_dir: Union[str, Path], output_file: str = "sweep_visua
                 if (checkbox.checked) {
                     element.style.display = 'flex';
                     label.textContent = 'Hide';
+                    if (!element.innerHTML.trim()) {
+                        const { start, entries } = shownEntries[runIdx];
+                        const log = entries[position - start];
+                        element.innerHTML = '<div class="column-header">Loading results...</div>';
+                        try {
+                            const texts = await loadTexts([...log.retrieved_results, ...log.reranked_results].map(doc => doc.ref));
+                            element.innerHTML = `
+                                ${renderDocs(log, log.retrieved_results, 'Retrieved Results', texts)}
+                                ${renderDocs(log, log.reranked_results, 'Reranked Results', texts)}
+                            `;
+                        } catch (error) {
+                            element.innerHTML = `<div class="load-error">${escapeHtml(error.message)}</div>`;
+                        }
+                    }
                 } else {
                     element.style.display = 'none';
                     label.textContent = 'Show';
@@ -855,11 +1412,6 @@ def visualize_sweep(sweep_dir: Union[str, Path], output_file: str = "sweep_visua
 
         // Initialize on load
         initializeTabs();
-
-        // Initialize views for all runs
-        allData.forEach((item, idx) => {
-            updateView(idx);
-        });
     </script>
 </body>
 </html>
@@ -868,9 +1420,10 @@ def visualize_sweep(sweep_dir: Union[str, Path], output_file: str = "sweep_visua
     # Replace placeholders
     html_content = html_template.replace('__ALL_DATA_PLACEHOLDER__', json.dumps(all_data))
     html_content = html_content.replace('__OVERVIEW_DATA_PLACEHOLDER__', json.dumps(overview_data))
-
-    # Get absolute path for the output file
-    abs_output_file = os.path.abspath(output_file)
+    html_content = html_content.replace('__QUERY_SUMMARY_PLACEHOLDER__', json.dumps(query_summary))
+    html_content = html_content.replace('__DATA_DIR_PLACEHOLDER__', json.dumps(data_dir.name))
+    html_content = html_content.replace('__DOC_CHUNK_SIZE_PLACEHOLDER__', json.dumps(DOC_CHUNK_SIZE))
+    html_content = html_content.replace('__COMPARISON_METRICS_PLACEHOLDER__', json.dumps(COMPARISON_METRICS))
 
     with open(abs_output_file, 'w') as f:
         f.write(html_content)